@@ -0,0 +1,180 @@
+"""
+Benchmark of concurrent quiz reads on one event loop (one worker): sync
+sessions against the async engine.
+
+Each of `--concurrency` coroutines reads quizzes for `--duration` seconds,
+the way `GET /api/quizzes/{id}` does on a response-cache miss
+(`get_quiz_version`, then `get_quiz`), with:
+
+- sync: a sync Session called from the coroutine, as the handlers used to
+  do; every query blocks the event loop
+- threaded: `database.ThreadedSession`, the fallback without an async driver
+- async: an AsyncSession on the async driver (`crud_async`)
+
+Each mode runs once alone and once next to a coroutine issuing a slow
+query in a loop (a 2M-row recursive CTE on SQLite, `pg_sleep` on
+PostgreSQL). A heartbeat task measures how long the event loop was
+stalled, which is what every other request on the worker waits.
+
+Usage:
+    python benchmarks/bench_async_db.py --concurrency 50 --duration 5
+    python benchmarks/bench_async_db.py --database-url postgresql://localhost/bench
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base, ThreadedSession, async_database_url  # noqa: E402
+from fixtures import load_sample_quizzes  # noqa: E402
+import crud  # noqa: E402
+import crud_async  # noqa: E402
+
+QUIZZES = 50
+SLOW_QUERIES = {
+    "sqlite": "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 2000000) "
+              "SELECT count(*) FROM c",
+    "postgresql": "SELECT pg_sleep(0.1)",
+}
+
+
+def seed(Session) -> list:
+    """Store QUIZZES copies of a sample quiz; returns their ids."""
+    quiz = load_sample_quizzes()[0]
+    ids = []
+    with Session() as db:
+        for i in range(QUIZZES):
+            ids.append(crud.create_quiz(
+                db=db, url=f"https://en.wikipedia.org/wiki/Bench_{i}", title=quiz["title"],
+                summary=quiz["summary"], key_entities=quiz["key_entities"], sections=quiz["sections"],
+                related_topics=quiz["related_topics"], questions=quiz["quiz"],
+            ).id)
+    return ids
+
+
+class Modes:
+    """Open a session and run a read or the slow query, per mode."""
+
+    def __init__(self, Session, AsyncSession, slow_query: str):
+        self.Session = Session
+        self.AsyncSession = AsyncSession
+        self.slow_query = text(slow_query)
+
+    async def read(self, mode: str, quiz_id: int) -> None:
+        if mode == "sync":
+            with self.Session() as db:
+                crud.get_quiz_version(db, quiz_id)
+                crud.get_quiz(db, quiz_id)
+            return
+        db = self.AsyncSession() if mode == "async" else ThreadedSession(self.Session())
+        try:
+            await crud_async.get_quiz_version(db, quiz_id)
+            await crud_async.get_quiz(db, quiz_id)
+        finally:
+            await db.close()
+
+    async def slow(self, mode: str) -> None:
+        if mode == "sync":
+            with self.Session() as db:
+                db.execute(self.slow_query)
+            return
+        db = self.AsyncSession() if mode == "async" else ThreadedSession(self.Session())
+        try:
+            await db.run_sync(lambda session: session.execute(self.slow_query))
+        finally:
+            await db.close()
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    """Record how late the loop wakes up compared to the requested interval."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_mode(modes: Modes, mode: str, quiz_ids: list, concurrency: int, duration: float, slow: bool) -> dict:
+    latencies = []
+    stop = asyncio.Event()
+    lags = []
+    deadline = time.perf_counter() + duration
+
+    async def reader(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await modes.read(mode, rng.choice(quiz_ids))
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)  # A sync read never yields on its own
+
+    async def slow_queries():
+        while time.perf_counter() < deadline:
+            await modes.slow(mode)
+            await asyncio.sleep(0)
+
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    start = time.perf_counter()
+    tasks = [reader(seed) for seed in range(concurrency)] + ([slow_queries()] if slow else [])
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "slow": slow,
+        "reads_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_stall_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main(args):
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_async_db.db"
+    async_url = async_database_url(url)
+    if async_url is None:
+        sys.exit(f"No async driver installed for {url.split(':')[0]}; install asyncpg or aiosqlite")
+
+    engine = create_engine(url, pool_size=args.concurrency, max_overflow=10)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS quiz_search"))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+    pool_options = {} if engine.dialect.name == "sqlite" else {"pool_size": args.concurrency, "max_overflow": 10}
+    async_engine = create_async_engine(async_url, **pool_options)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    quiz_ids = seed(Session)
+    modes = Modes(Session, AsyncSession, SLOW_QUERIES[engine.dialect.name])
+
+    results = []
+    for slow in (False, True):
+        for mode in ("sync", "threaded", "async"):
+            results.append(await run_mode(modes, mode, quiz_ids, args.concurrency, args.duration, slow))
+    await async_engine.dispose()
+
+    print(f"\n{engine.dialect.name}, {args.concurrency} concurrent readers, {args.duration:.0f} s per run\n")
+    print(f"{'mode':<10}{'slow query':>11}{'reads/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max stall ms':>14}")
+    for r in results:
+        print(f"{r['mode']:<10}{'yes' if r['slow'] else 'no':>11}{r['reads_per_s']:>10.0f}"
+              f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_stall_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    asyncio.run(main(parser.parse_args()))
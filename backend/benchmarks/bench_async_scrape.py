@@ -0,0 +1,126 @@
+"""
+Benchmark blocking vs async Wikipedia scraping under concurrency.
+
+Starts a local stand-in for en.wikipedia.org that answers every request after
+a fixed delay, then fires N concurrent scrapes from one event loop:
+
+- blocking: coroutines calling `scrape_wikipedia` (requests), as the
+  /api/quizzes/generate handler used to do
+- async: coroutines calling `scrape_wikipedia_async` on the pooled client
+
+A heartbeat task measures how long the event loop was stalled.
+
+Usage:
+    python benchmarks/bench_async_scrape.py --concurrency 50 --delay 0.2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import build_article_html  # noqa: E402
+from utils import scrape_wikipedia, scrape_wikipedia_async, close_http_client  # noqa: E402
+
+
+def _serve(delay: float, paragraphs: int, port_queue) -> None:
+    """Serve one article page after `delay` seconds per request (runs in a child process)."""
+    page = build_article_html("Alan Turing", paragraphs=paragraphs, nav_items=50).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=UTF-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stand_in_server(delay: float, paragraphs: int):
+    """
+    Start the stand-in server in its own process so it does not compete with
+    the benchmarked event loop for the GIL.
+
+    Returns:
+        Tuple of (process, port)
+    """
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(delay, paragraphs, port_queue), daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=10)
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    """Record how late the loop wakes up compared to the requested interval."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_scenario(name: str, url: str, concurrency: int) -> dict:
+    """Run `concurrency` scrapes at once and collect timing stats."""
+    if name == "blocking":
+        async def one():
+            return scrape_wikipedia(url)
+    else:
+        async def one():
+            return await scrape_wikipedia_async(url)
+
+    stop = asyncio.Event()
+    lags = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+
+    return {
+        "scenario": name,
+        "elapsed_s": elapsed,
+        "scrapes_per_s": concurrency / elapsed,
+        "max_loop_stall_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main(args):
+    server, port = start_stand_in_server(args.delay, args.paragraphs)
+    url = f"http://127.0.0.1:{port}/wiki/Alan_Turing"
+
+    # Warm up the pooled client so connection setup isn't measured
+    await scrape_wikipedia_async(url)
+
+    results = []
+    for name in ("blocking", "async"):
+        results.append(await run_scenario(name, url, args.concurrency))
+    await close_http_client()
+    server.terminate()
+
+    print(f"\n{args.concurrency} concurrent scrapes, {args.delay * 1000:.0f} ms server delay\n")
+    print(f"{'scenario':<10} {'elapsed (s)':>12} {'scrapes/s':>10} {'max loop stall (ms)':>20}")
+    for r in results:
+        print(f"{r['scenario']:<10} {r['elapsed_s']:>12.2f} {r['scrapes_per_s']:>10.1f} {r['max_loop_stall_ms']:>20.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="Server delay in seconds")
+    parser.add_argument("--paragraphs", type=int, default=5, help="Size of the served article")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,122 @@
+"""
+Benchmark of attempt persistence: one transaction per attempt against the
+write-behind buffer's batches.
+
+Stores the same attempts (10 answers each) both ways and reports attempts
+per second, then times reading a quiz's question stats, which comes from
+the running totals and stays flat however many answers are stored.
+
+Usage:
+    python benchmarks/bench_attempts.py --attempts 20000
+    python benchmarks/bench_attempts.py --database-url postgresql://localhost/bench
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+import crud  # noqa: E402
+import write_behind  # noqa: E402
+
+QUIZZES = 50
+QUESTIONS_PER_QUIZ = 10
+
+
+def seed(Session):
+    """Create the quizzes; returns quiz id -> answer key."""
+    keys = {}
+    with Session() as db:
+        for i in range(QUIZZES):
+            quiz = crud.create_quiz(
+                db=db, url=f"https://en.wikipedia.org/wiki/Bench_{i}", title=f"Bench {i}",
+                summary="Summary", key_entities={}, sections=[], related_topics=[],
+                questions=[
+                    {"question": f"Question {n} of quiz {i}?", "options": ["A", "B", "C", "D"], "answer": "A"}
+                    for n in range(QUESTIONS_PER_QUIZ)
+                ],
+            )
+            keys[quiz.id] = {q.id: q.answer for q in quiz.questions}
+    return keys
+
+
+def make_attempts(keys, count: int, rng: random.Random):
+    attempts = []
+    for _ in range(count):
+        quiz_id = rng.choice(list(keys))
+        answers = [
+            {"question_id": question_id, "selected": selected, "correct": selected == answer,
+             "time_ms": rng.randint(500, 20000)}
+            for question_id, answer in keys[quiz_id].items()
+            for selected in [rng.choice("AABCD")]
+        ]
+        attempts.append({
+            "id": str(uuid.uuid4()), "quiz_id": quiz_id, "user_id": f"user-{rng.randint(1, 1000)}",
+            "score": sum(a["correct"] for a in answers), "total": len(answers),
+            "duration_ms": None, "submitted_at": datetime.utcnow(), "answers": answers,
+        })
+    return attempts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=20000)
+    parser.add_argument("--flush-rows", type=int, default=500)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_attempts.db"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS quiz_search"))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+    keys = seed(Session)
+    rng = random.Random(3)
+
+    # A sample of the per-attempt path is enough; it is the slow one
+    direct = make_attempts(keys, min(args.attempts, 2000), rng)
+    start = time.perf_counter()
+    with Session() as db:
+        for attempt in direct:
+            crud.save_attempts(db, [attempt])
+    direct_rate = len(direct) / (time.perf_counter() - start)
+
+    buffer = write_behind.AttemptBuffer(args.flush_rows, 1000, max_rows=10 ** 9, session_factory=Session)
+    batched = make_attempts(keys, args.attempts, rng)
+    start = time.perf_counter()
+    for attempt in batched:
+        buffer.add(attempt)
+        if buffer.stats()["pending_rows"] >= args.flush_rows:
+            buffer.flush()
+    buffer.flush()
+    batched_rate = len(batched) / (time.perf_counter() - start)
+
+    samples = []
+    with Session() as db:
+        for quiz_id in keys:
+            start = time.perf_counter()
+            crud.get_question_stats(db, quiz_id)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    answers = (len(direct) + len(batched)) * QUESTIONS_PER_QUIZ
+    print(f"{engine.dialect.name}, {QUESTIONS_PER_QUIZ} answers per attempt")
+    print(f"  one transaction per attempt   {direct_rate:9.0f} attempts/s")
+    print(f"  write-behind, {args.flush_rows} rows/batch {batched_rate:9.0f} attempts/s "
+          f"({batched_rate / direct_rate:.1f}x, {buffer.flushed_batches} batches)")
+    print(f"  quiz stats read over {answers} answers: median {statistics.median(samples):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark of near-duplicate question detection.
+
+Generates quizzes whose questions are random, plus planted paraphrases of
+earlier questions (reworded, one word added or dropped), and measures:
+
+- insert time: `crud.create_quiz` latency with the duplicate lookup, and
+  how many planted paraphrases it flags (recall) against unrelated
+  questions it flags (false positives)
+- the offline job (`dedupe_questions.py`): run time at growing table
+  sizes, which should grow linearly, and the comparisons it makes against
+  the n^2/2 a pairwise scan would need
+
+Usage:
+    python benchmarks/bench_dedupe.py --quizzes 2000 --duplicate-rate 0.1
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import Question  # noqa: E402
+import crud  # noqa: E402
+import dedupe_questions  # noqa: E402
+
+QUESTIONS_PER_QUIZ = 10
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zi", "pe", "sa", "do", "bu", "ri", "ga", "fe", "ho"]
+FORMS = ["What did {} do?", "Which {} is described?", "According to the article, what {}?", "Who {}?"]
+
+
+def words(rng: random.Random, count: int) -> list:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def paraphrase(question: dict, rng: random.Random) -> dict:
+    content = question["content"][:]
+    if rng.random() < 0.5 and len(content) > 4:
+        content.pop(rng.randrange(len(content)))
+    else:
+        content.insert(rng.randrange(len(content) + 1), "notably")
+    rng.shuffle(content)
+    return dict(question, content=content, form=rng.choice(FORMS), original=question["id"])
+
+
+def render(question: dict) -> dict:
+    return {
+        "question": question["form"].format(" ".join(question["content"])),
+        "options": [question["answer"], "B", "C", "D"],
+        "answer": question["answer"],
+        "explanation": "From the article.",
+    }
+
+
+def build(Session, quizzes: int, duplicate_rate: float, seed: int = 1):
+    """Create the quizzes; returns create_quiz latencies (ms) and the planted pairs."""
+    rng = random.Random(seed)
+    stored = []  # planted question dicts with their database ids
+    planted = {}  # question id -> id of the question it paraphrases
+    latencies = []
+    next_id = 1
+    for i in range(quizzes):
+        questions = []
+        for _ in range(QUESTIONS_PER_QUIZ):
+            if stored and rng.random() < duplicate_rate:
+                questions.append(paraphrase(rng.choice(stored), rng))
+            else:
+                questions.append({
+                    "content": words(rng, rng.randint(5, 9)), "answer": " ".join(words(rng, 2)),
+                    "form": rng.choice(FORMS), "original": None,
+                })
+        with Session() as db:
+            start = time.perf_counter()
+            crud.create_quiz(
+                db=db, url=f"https://en.wikipedia.org/wiki/Bench_{i}", title=f"Bench {i}",
+                summary="Summary", key_entities={}, sections=[], related_topics=[],
+                questions=[render(q) for q in questions],
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+        # Questions get ascending ids in insert order
+        for question in questions:
+            question["id"] = next_id
+            if question["original"] is not None:
+                planted[next_id] = question["original"]
+            next_id += 1
+            stored.append(question)
+    return latencies, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quizzes", type=int, default=2000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for scale in (0.25, 0.5, 1.0):
+        quizzes = max(1, int(args.quizzes * scale))
+        engine = create_engine(f"sqlite:///{directory}/dedupe_{quizzes}.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+        latencies, planted = build(Session, quizzes, args.duplicate_rate)
+
+        with Session() as db:
+            flags = dict(db.query(Question.id, Question.duplicate_of).filter(Question.duplicate_of.isnot(None)))
+        found = sum(1 for question_id in planted if question_id in flags)
+        false_flags = sum(1 for question_id in flags if question_id not in planted)
+
+        start = time.perf_counter()
+        clusters, comparisons = dedupe_questions.find_clusters(engine)
+        job_seconds = time.perf_counter() - start
+
+        questions = quizzes * QUESTIONS_PER_QUIZ
+        print(f"{questions} questions, {len(planted)} planted paraphrases")
+        print(f"  create_quiz      median {statistics.median(latencies):.2f} ms, "
+              f"p95 {sorted(latencies)[int(len(latencies) * 0.95)]:.2f} ms")
+        print(f"  insert-time flags: {found}/{len(planted)} paraphrases, {false_flags} false positives")
+        print(f"  offline job      {job_seconds:.2f} s, {len(clusters)} clusters, "
+              f"{comparisons} comparisons (pairwise: {questions * (questions - 1) // 2})")
+
+
+if __name__ == "__main__":
+    main()
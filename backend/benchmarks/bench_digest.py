@@ -0,0 +1,135 @@
+"""
+Benchmark of the LLM article input: digest vs. truncation.
+
+For every fixture page, compares the first MAX_CONTENT_CHARS characters
+(LLM_CONTENT_MODE=truncate) with the extractive digest (digest mode) on:
+
+- prompt tokens (the whole QUIZ_PROMPT_TEMPLATE, counted like the digest
+  budget)
+- section coverage: article sections with at least one sentence in the input
+- reach: how far into the article the input extends
+- digest build time
+
+With --llm (needs an API key), also generates a quiz from both inputs and
+reports LLM latency and question coverage: the article sections the
+questions are about, matching each question to the section it shares the
+most terms with.
+
+Usage:
+    python benchmarks/bench_digest.py --tokens 2000
+    python benchmarks/bench_digest.py --tokens 2000 --llm
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import load_article_pages  # noqa: E402
+from config import settings  # noqa: E402
+from extractors import MAX_ARTICLE_CHARS, MAX_CONTENT_CHARS, get_extractor  # noqa: E402
+from summarizer import STOPWORDS, build_digest, count_tokens, split_sentences  # noqa: E402
+import utils  # noqa: E402
+
+TERM = re.compile(r"[a-z0-9]+")
+
+
+def terms(text: str) -> set:
+    return {t for t in TERM.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS}
+
+
+def article_sections(passages):
+    """Section heading -> sentences, in article order."""
+    sections = {}
+    for heading, text in passages:
+        sections.setdefault(heading, []).extend(split_sentences(text))
+    return sections
+
+
+def coverage(content: str, sections) -> float:
+    """Share of sections with at least one of their sentences in `content`."""
+    covered = sum(any(s in content for s in sentences) for sentences in sections.values())
+    return covered / len(sections)
+
+
+def reach(content: str, passages) -> float:
+    """Position of the last article sentence found in `content`, as a share of the article."""
+    sentences = [s for _, text in passages for s in split_sentences(text)]
+    last = max((i for i, s in enumerate(sentences) if s in content), default=0)
+    return (last + 1) / len(sentences)
+
+
+def question_coverage(quiz, sections) -> int:
+    """Distinct sections the questions are about."""
+    section_terms = {heading: terms(" ".join(sentences)) for heading, sentences in sections.items()}
+    about = set()
+    for question in quiz["quiz"]:
+        words = terms(" ".join([question["question"], question["answer"], question.get("explanation", "")]))
+        about.add(max(section_terms, key=lambda h: len(words & section_terms[h])))
+    return len(about)
+
+
+async def generate(title: str, content: str):
+    start = time.perf_counter()
+    quiz = await utils.generate_quiz_with_llm(title, content)
+    return quiz, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=settings.LLM_CONTENT_TOKENS,
+                        help="Digest budget in tokens")
+    parser.add_argument("--llm", action="store_true",
+                        help="Also call the configured LLM with both inputs")
+    args = parser.parse_args()
+    if args.llm:
+        settings.LLM_CACHE_ENABLED = False
+
+    extractor = get_extractor()
+    rows = []
+    for name, html in load_article_pages().items():
+        article = extractor.extract(html, max_chars=MAX_ARTICLE_CHARS)
+        passages = article["passages"]
+        sections = article_sections(passages)
+        truncated = extractor.extract(html, max_chars=MAX_CONTENT_CHARS)["content"]
+        start = time.perf_counter()
+        digest = build_digest(passages, args.tokens)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{name}: {count_tokens(chr(10).join(p for _, p in passages))} article tokens, "
+              f"{len(sections)} sections, digest built in {build_ms:.0f} ms")
+        for mode, content in (("truncate", truncated), ("digest", digest)):
+            prompt = utils.QUIZ_PROMPT_TEMPLATE.format(title=article["title"], content=content)
+            row = {
+                "mode": mode,
+                "prompt_tokens": count_tokens(prompt),
+                "coverage": coverage(content, sections),
+                "reach": reach(content, passages),
+            }
+            line = (f"  {mode:<9}{row['prompt_tokens']:>7} prompt tokens  "
+                    f"{row['coverage']:>5.0%} of sections  reaches {row['reach']:>4.0%} of article")
+            if args.llm:
+                quiz, latency = asyncio.run(generate(article["title"], content))
+                row["latency"] = latency
+                row["question_sections"] = question_coverage(quiz, sections)
+                line += (f"  LLM {latency:5.1f}s  questions cover "
+                         f"{row['question_sections']}/{len(sections)} sections")
+            print(line)
+            rows.append(row)
+
+    print("Mean:")
+    for mode in ("truncate", "digest"):
+        mode_rows = [r for r in rows if r["mode"] == mode]
+        line = (f"  {mode:<9}{statistics.mean(r['prompt_tokens'] for r in mode_rows):>7.0f} prompt tokens  "
+                f"{statistics.mean(r['coverage'] for r in mode_rows):>5.0%} of sections")
+        if args.llm:
+            line += f"  LLM {statistics.mean(r['latency'] for r in mode_rows):5.1f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the HTML extraction backends over article pages.
+
+Compares every installed backend in `extractors.py` with the original
+two-pass BeautifulSoup code, and checks that each backend returns the same
+title, content and sections as the BeautifulSoup backend.
+
+Pages come from `sample_data/html/` when present (see fixtures.py).
+
+Usage:
+    python benchmarks/bench_extractors.py --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from fixtures import load_article_pages  # noqa: E402
+from extractors import available_extractors, get_extractor  # noqa: E402
+
+
+def legacy_extract(html: str) -> dict:
+    """The pre-extractor scrape_wikipedia parsing: full tree, two find_all walks."""
+    soup = BeautifulSoup(html, "html.parser")
+    title_elem = soup.find("h1", class_="firstHeading")
+    title = title_elem.text.strip() if title_elem else "Unknown"
+    content_div = soup.find("div", id="mw-content-text")
+    paragraphs = content_div.find_all("p")
+    content = "\n".join([p.get_text().strip() for p in paragraphs])[:15000]
+    sections = []
+    for heading in content_div.find_all(["h2", "h3"]):
+        section_text = heading.get_text().strip().replace("[edit]", "").strip()
+        if section_text:
+            sections.append(section_text)
+    return {"title": title, "content": content, "sections": sections[:10]}
+
+
+def _legacy_fields(article: dict) -> dict:
+    """The fields the legacy code returned; backends also return passages and links."""
+    return {key: article[key] for key in ("title", "content", "sections")}
+
+
+def time_call(fn, html: str, repeat: int) -> list:
+    """Run `fn(html)` `repeat` times and return per-call durations in ms."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def main(args):
+    pages = load_article_pages()
+    backends = {"legacy (bs4 x2)": legacy_extract}
+    for name in available_extractors():
+        backends[name] = get_extractor(name).extract
+
+    print(f"{'page':<32} {'KB':>6} {'backend':<16} {'median ms':>10} {'min ms':>8} {'speedup':>8}  output")
+    for page, html in pages.items():
+        reference = get_extractor("beautifulsoup").extract(html)
+        baseline = None
+        for name, fn in backends.items():
+            durations = time_call(fn, html, args.repeat)
+            median = statistics.median(durations)
+            baseline = baseline or median
+            matches = "same" if _legacy_fields(fn(html)) == _legacy_fields(reference) else "DIFFERS"
+            print(f"{page[:32]:<32} {len(html) // 1024:>6} {name:<16} {median:>10.2f} "
+                  f"{min(durations):>8.2f} {baseline / median:>7.1f}x  {matches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    main(parser.parse_args())
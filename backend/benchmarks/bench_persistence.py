@@ -0,0 +1,125 @@
+"""
+Benchmark of quiz persistence: round trips and latency per create_quiz.
+
+Compares the original unit-of-work code (existence SELECT, one INSERT per
+question, refresh after commit) with the current `crud.create_quiz`, for new
+URLs and for URLs that are already stored.
+
+Runs on a SQLite file by default; pass --database-url to measure against
+PostgreSQL, where each round trip also pays network latency.
+
+Usage:
+    python benchmarks/bench_persistence.py --quizzes 200 --questions 10
+    python benchmarks/bench_persistence.py --database-url postgresql://localhost/bench
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base, count_queries  # noqa: E402
+from models import Quiz, Question, ArticleSnapshot  # noqa: E402
+from snapshots import compress_html, content_hash  # noqa: E402
+import crud  # noqa: E402
+
+RAW_HTML = "<html><body>" + "<p>Article text.</p>" * 2000 + "</body></html>"
+
+
+def legacy_create_quiz(db, url, title, summary, key_entities, sections,
+                       related_topics, questions, raw_html=None):
+    """create_quiz as it was before the bulk path."""
+    existing = crud.get_quiz_by_url(db, url)
+    if existing:
+        return existing
+    db_quiz = Quiz(
+        url=url, title=title, summary=summary, key_entities=key_entities,
+        sections=sections, related_topics=related_topics,
+    )
+    if raw_html is not None:
+        compressed, encoding = compress_html(raw_html)
+        db_quiz.snapshot = ArticleSnapshot(
+            content_hash=content_hash(raw_html), encoding=encoding,
+            html=compressed, size=len(raw_html.encode("utf-8")),
+        )
+    db.add(db_quiz)
+    db.flush()
+    for q in questions:
+        db.add(Question(
+            quiz_id=db_quiz.id, question=q["question"], options=q["options"],
+            answer=q["answer"], difficulty=q.get("difficulty", "medium"),
+            explanation=q.get("explanation", ""),
+        ))
+    db.commit()
+    db.refresh(db_quiz)
+    return db_quiz
+
+
+def make_questions(count: int) -> list:
+    return [
+        {
+            "question": f"Question {n}?",
+            "options": ["A", "B", "C", "D"],
+            "answer": "A",
+            "difficulty": "medium",
+            "explanation": "Because.",
+        }
+        for n in range(count)
+    ]
+
+
+def run(engine, create, prefix: str, args) -> dict:
+    """Create `args.quizzes` quizzes, then create them again (duplicates)."""
+    Session = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+    questions = make_questions(args.questions)
+    results = {}
+    for phase in ("new", "duplicate"):
+        durations, round_trips = [], []
+        for i in range(args.quizzes):
+            with Session() as db, count_queries(engine) as counter:
+                start = time.perf_counter()
+                create(
+                    db, url=f"https://en.wikipedia.org/wiki/{prefix}_{i}", title=f"Article {i}",
+                    summary="Summary", key_entities={"people": [], "organizations": [], "locations": []},
+                    sections=["History"], related_topics=["Topic"], questions=questions,
+                    raw_html=RAW_HTML,
+                )
+                durations.append((time.perf_counter() - start) * 1000)
+            # +1 for COMMIT, which is not a cursor execute
+            round_trips.append(counter.count + (phase == "new"))
+        results[phase] = (statistics.mean(round_trips), statistics.median(durations))
+    return results
+
+
+def main(args):
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        path = Path(tempfile.mkdtemp()) / "bench.db"
+        engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    print(f"{engine.dialect.name}, {args.quizzes} quizzes x {args.questions} questions")
+    print(f"{'path':<12} {'phase':<10} {'round trips':>12} {'median ms':>10}")
+    baseline = {}
+    for name, create in (("legacy", legacy_create_quiz), ("bulk", crud.create_quiz)):
+        for phase, (round_trips, median) in run(engine, create, name, args).items():
+            base = baseline.setdefault(phase, (round_trips, median))
+            print(f"{name:<12} {phase:<10} {round_trips:>12.1f} {median:>10.2f}"
+                  f"  ({base[0] / round_trips:.1f}x fewer, {base[1] / median:.1f}x faster)")
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--database-url", default=None)
+    main(parser.parse_args())
@@ -0,0 +1,142 @@
+"""
+Benchmark of quiz search latency on a large synthetic corpus.
+
+Builds quizzes with Zipf-distributed vocabulary (10 questions each by
+default), indexes them with `search.index_missing_quizzes` (the migration
+path), and times `search.search_quizzes` for common, mid-frequency, rare
+and two-word queries. For comparison, the same words are looked up with a
+LIKE scan over the question text, which is what search costs without an
+index.
+
+Runs on a SQLite file by default; pass --database-url to measure against
+PostgreSQL (tsvector + GIN).
+
+Usage:
+    python benchmarks/bench_search.py --questions 1000000
+    python benchmarks/bench_search.py --questions 100000 --database-url postgresql://localhost/bench
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import Quiz, Question  # noqa: E402
+import search  # noqa: E402
+
+VOCABULARY = 20000
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zi", "pe", "sa", "do", "bu", "ri", "ga", "fe", "ho"]
+BATCH = 1000
+
+
+def make_words(count: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def sentence(words, weights, rng: random.Random, length: int) -> str:
+    return " ".join(rng.choices(words, cum_weights=weights, k=length)).capitalize()
+
+
+def build(engine, quizzes: int, per_quiz: int, words) -> float:
+    """Insert the corpus and index it; returns the indexing time in seconds."""
+    rng = random.Random(42)
+    cumulative, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1 / rank
+        cumulative.append(total)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, quizzes, BATCH):
+            ids = range(start + 1, min(start + BATCH, quizzes) + 1)
+            conn.execute(insert(Quiz.__table__), [
+                {
+                    "id": i, "url": f"https://en.wikipedia.org/wiki/Bench_{i}",
+                    "url_hash": f"{i:064d}", "title": sentence(words, cumulative, rng, 3),
+                    "summary": sentence(words, cumulative, rng, 40), "key_entities": {},
+                    "sections": [], "related_topics": [], "created_at": now,
+                }
+                for i in ids
+            ])
+            conn.execute(insert(Question.__table__), [
+                {
+                    "quiz_id": i, "question": sentence(words, cumulative, rng, 12) + "?",
+                    "options": [sentence(words, cumulative, rng, 2) for _ in range(4)],
+                    "answer": "", "difficulty": "medium",
+                    "explanation": sentence(words, cumulative, rng, 15) + ".",
+                }
+                for i in ids for _ in range(per_quiz)
+            ])
+    start = time.perf_counter()
+    search.index_missing_quizzes(engine, batch_size=BATCH)
+    return time.perf_counter() - start
+
+
+def timed(run, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=1000000)
+    parser.add_argument("--per-quiz", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = f"sqlite:///{tempfile.mkdtemp()}/bench_search.db"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS quiz_search"))
+    Base.metadata.create_all(bind=engine)
+
+    words = make_words(VOCABULARY, random.Random(7))
+    quizzes = args.questions // args.per_quiz
+    print(f"Building {quizzes} quizzes, {quizzes * args.per_quiz} questions on {engine.dialect.name}...")
+    seconds = build(engine, quizzes, args.per_quiz, words)
+    print(f"Indexed in {seconds:.1f}s ({quizzes / seconds:.0f} quizzes/s)")
+
+    Session = sessionmaker(bind=engine)
+    queries = {
+        "common word": words[5],
+        "mid-frequency word": words[500],
+        "rare word": words[15000],
+        "two words": f"{words[50]} {words[800]}",
+    }
+    print(f"{'query':<20}{'matches':>9}{'median ms':>11}{'max ms':>9}{'LIKE scan ms':>14}")
+    with Session() as db:
+        for name, query in queries.items():
+            median, worst, results = timed(lambda: search.search_quizzes(db, query, limit=20), args.repeats)
+            matches = db.execute(
+                text("SELECT count(*) FROM quiz_search WHERE quiz_search MATCH :q"),
+                {"q": " ".join(f'"{w}"' for w in query.split())},
+            ).scalar() if engine.dialect.name == "sqlite" else "-"
+            pattern = " AND ".join(f"question LIKE '%{w}%'" for w in query.split())
+            scan, _, _ = timed(
+                lambda: db.execute(text(f"SELECT DISTINCT quiz_id FROM questions WHERE {pattern} LIMIT 20")).fetchall(),
+                1,
+            )
+            print(f"{name:<20}{matches:>9}{median:>11.1f}{worst:>9.1f}{scan:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
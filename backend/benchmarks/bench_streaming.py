@@ -0,0 +1,113 @@
+"""
+Benchmark of streamed quiz generation: time to first question.
+
+Replays a quiz-sized LLM response at a fixed token rate, the way a
+provider streams it, and measures when the summary and the first and
+last questions become available through `IncrementalObjectParser`,
+compared with waiting for the whole response and parsing it once
+(`parse_llm_json`). Also reports the parser's own CPU cost per response.
+
+Usage:
+    python benchmarks/bench_streaming.py --questions 10 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from json_stream import IncrementalObjectParser  # noqa: E402
+from llm_clients import CHARS_PER_TOKEN  # noqa: E402
+from utils import parse_llm_json  # noqa: E402
+
+
+def make_response(questions: int) -> str:
+    """A fenced LLM response with the structure QUIZ_PROMPT_TEMPLATE asks for."""
+    result = {
+        "summary": "Alan Turing was an English mathematician and computer scientist. "
+                   "He formalized computation and helped break the Enigma cipher.",
+        "key_entities": {
+            "people": ["Alan Turing", "Alonzo Church"],
+            "organizations": ["Bletchley Park", "University of Manchester"],
+            "locations": ["London", "Cambridge"],
+        },
+        "sections": ["Early life", "Career", "Legacy"],
+        "related_topics": ["Turing machine", "Enigma machine", "Computability"],
+        "quiz": [
+            {
+                "question": f"Question {i} about Alan Turing's work and its influence?",
+                "options": ["First option", "Second option", "Third option", "Fourth option"],
+                "answer": "Second option",
+                "difficulty": ["easy", "medium", "hard"][i % 3],
+                "explanation": "The article describes this in the section on his career.",
+            }
+            for i in range(questions)
+        ],
+    }
+    # Same field order as the example in QUIZ_PROMPT_TEMPLATE
+    return "```json\n" + json.dumps(result, indent=2) + "\n```"
+
+
+async def replay(text: str, tokens_per_second: float):
+    """Yield `text` in token-sized chunks at the given rate."""
+    chunk = CHARS_PER_TOKEN
+    delay = 1 / tokens_per_second
+    for i in range(0, len(text), chunk):
+        await asyncio.sleep(delay)
+        yield text[i:i + chunk]
+
+
+async def measure(text: str, tokens_per_second: float) -> dict:
+    parser = IncrementalObjectParser()
+    times = {}
+    start = time.perf_counter()
+    async for chunk in replay(text, tokens_per_second):
+        for kind, key, _ in parser.feed(chunk):
+            now = time.perf_counter() - start
+            if key == "summary":
+                times["summary"] = now
+            elif kind == "item" and key == "quiz":
+                times.setdefault("first_question", now)
+                times["last_question"] = now
+    times["complete"] = time.perf_counter() - start
+    parse_llm_json(text)
+    times["buffered"] = time.perf_counter() - start
+    return times
+
+
+def parser_cost(text: str, repeats: int) -> float:
+    """Milliseconds of CPU to parse one response incrementally, in token chunks."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parser = IncrementalObjectParser()
+        for i in range(0, len(text), CHARS_PER_TOKEN):
+            parser.feed(text[i:i + CHARS_PER_TOKEN])
+        parser.result()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    args = parser.parse_args()
+
+    text = make_response(args.questions)
+    tokens = len(text) // CHARS_PER_TOKEN
+    print(f"Response: {len(text)} chars (~{tokens} tokens), {args.questions} questions, "
+          f"{args.tokens_per_second:g} tokens/s")
+
+    times = asyncio.run(measure(text, args.tokens_per_second))
+    print(f"  {'summary':<16}{times['summary']:8.2f}s")
+    print(f"  {'first question':<16}{times['first_question']:8.2f}s")
+    print(f"  {'last question':<16}{times['last_question']:8.2f}s")
+    print(f"  {'buffered parse':<16}{times['buffered']:8.2f}s  (nothing shown before this without streaming)")
+    print(f"First question {times['buffered'] / times['first_question']:.1f}x sooner than the buffered response")
+    print(f"Parser CPU: {parser_cost(text, 50):.2f} ms per response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Offline fixtures for the benchmark scripts.
+
+Real pages saved under `sample_data/html/` (`*.html` or `*.html.gz`) are used
+when present. Otherwise a deterministic Wikipedia-shaped page is generated
+from the text in `sample_data/*.json`, with the same markup the scraper sees
+on en.wikipedia.org: navigation chrome, an infobox, linked paragraphs with
+reference markers, `mw-heading` section wrappers, references and categories.
+"""
+import gzip
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+SAMPLE_DATA_DIR = Path(__file__).resolve().parent.parent.parent / "sample_data"
+SAVED_HTML_DIR = SAMPLE_DATA_DIR / "html"
+
+
+def load_sample_quizzes() -> List[Dict]:
+    """Load the sample quiz JSON files."""
+    return [
+        json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(SAMPLE_DATA_DIR.glob("*.json"))
+    ]
+
+
+def _vocabulary() -> List[str]:
+    """Collect words from the sample quizzes to build realistic filler text."""
+    words = []
+    for quiz in load_sample_quizzes():
+        text = " ".join([quiz["summary"]] + [q["explanation"] for q in quiz["quiz"]])
+        words.extend(w.strip(".,'\"()") for w in text.split())
+    return [w for w in words if w] or ["lorem", "ipsum"]
+
+
+def build_article_html(title: str, paragraphs: int = 220, seed: int = 0, nav_items: int = 1500) -> str:
+    """
+    Build a Wikipedia-like article page of roughly 0.5-1 MB.
+
+    Args:
+        title: Article title
+        paragraphs: Number of body paragraphs
+        seed: Seed for the deterministic filler text
+        nav_items: Number of navigation links (page chrome weight)
+
+    Returns:
+        Full HTML document
+    """
+    rng = random.Random(f"{title}:{seed}")
+    vocab = _vocabulary()
+    anchors = [
+        "University of Cambridge", "Bletchley Park", "London", "Manchester",
+        "Princeton University", "Alonzo Church", "John von Neumann", "Paris",
+        "Royal Society", "Warsaw", "Pierre Curie", "Nobel Prize", "Netherlands",
+        "Guido van Rossum", "Python Software Foundation", "United Kingdom",
+    ]
+
+    def sentence() -> str:
+        words = [rng.choice(vocab) for _ in range(rng.randint(12, 28))]
+        if rng.random() < 0.6:
+            anchor = rng.choice(anchors)
+            href = "/wiki/" + anchor.replace(" ", "_")
+            words.insert(rng.randint(0, len(words)), f'<a href="{href}" title="{anchor}">{anchor}</a>')
+        return " ".join(words).capitalize() + "."
+
+    head = ["<!DOCTYPE html>", '<html lang="en"><head><meta charset="UTF-8">',
+            f"<title>{title} - Wikipedia</title>"]
+    for i in range(60):
+        head.append(f'<link rel="stylesheet" href="/w/load.php?modules=site.styles&amp;v={i}">')
+        head.append(f"<script>RLCONF_{i}={{\"wgPageName\":\"{title}\",\"wgRevisionId\":{1000 + i}}};</script>")
+    head.append("</head><body>")
+
+    nav = ['<div id="mw-navigation"><nav id="p-navigation"><ul>']
+    for i in range(nav_items):
+        nav.append(f'<li id="n-item-{i}"><a href="/wiki/Special:Page_{i}"><span>Navigation item {i}</span></a></li>')
+    nav.append("</ul></nav></div>")
+
+    body = ['<div id="content" class="mw-body">',
+            f'<h1 id="firstHeading" class="firstHeading mw-first-heading"><span class="mw-page-title-main">{title}</span></h1>',
+            '<div id="bodyContent"><div id="mw-content-text" class="mw-body-content">',
+            '<div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">',
+            '<table class="infobox vcard"><tbody>',
+            f'<tr><th colspan="2" class="infobox-above">{title}</th></tr>']
+    for label, value in [("Born", "London"), ("Alma mater", "University of Cambridge"),
+                         ("Known for", "Nobel Prize"), ("Institutions", "Royal Society"),
+                         ("Doctoral advisor", "Alonzo Church")]:
+        href = "/wiki/" + value.replace(" ", "_")
+        body.append(f'<tr><th scope="row" class="infobox-label">{label}</th>'
+                    f'<td class="infobox-data"><a href="{href}" title="{value}">{value}</a></td></tr>')
+    body.append("</tbody></table>")
+
+    section_names = ["Early life", "Education", "Career", "Research", "Later years",
+                     "Personal life", "Death", "Legacy", "Honours", "Works"]
+    for i in range(paragraphs):
+        if i and i % 20 == 0:
+            name = section_names[(i // 20 - 1) % len(section_names)]
+            tag = "h2" if (i // 20) % 2 else "h3"
+            anchor_id = name.replace(" ", "_")
+            body.append(f'<div class="mw-heading mw-heading{tag[1]}"><{tag} id="{anchor_id}">{name}</{tag}>'
+                        f'<span class="mw-editsection"><span class="mw-editsection-bracket">[</span>'
+                        f'<a href="/w/index.php?title={title}&amp;action=edit&amp;section={i}">edit</a>'
+                        f'<span class="mw-editsection-bracket">]</span></span></div>')
+        sentences = " ".join(sentence() for _ in range(rng.randint(3, 6)))
+        body.append(f'<p>{sentences}<sup id="cite_ref-{i}" class="reference"><a href="#cite_note-{i}">[{i + 1}]</a></sup></p>')
+
+    body.append('<div class="mw-heading mw-heading2"><h2 id="References">References</h2></div><ol class="references">')
+    for i in range(paragraphs):
+        body.append(f'<li id="cite_note-{i}"><span class="reference-text"><cite>{" ".join(rng.choice(vocab) for _ in range(40))}</cite></span></li>')
+    body.append("</ol>")
+    body.append('<div class="navbox"><table class="nowraplinks">')
+    for i in range(150):
+        anchor = rng.choice(anchors)
+        body.append(f'<tr><td><a href="/wiki/{anchor.replace(" ", "_")}">{anchor}</a></td></tr>')
+    body.append("</table></div></div></div>")
+    body.append('<div id="catlinks" class="catlinks"><div id="mw-normal-catlinks"><ul>')
+    for category in ["1912 births", "People from London", "Alumni of the University of Cambridge"]:
+        body.append(f'<li><a href="/wiki/Category:{category.replace(" ", "_")}">{category}</a></li>')
+    body.append("</ul></div></div></div></div>")
+
+    return "\n".join(head + nav + body + ["</body></html>"])
+
+
+def load_article_pages() -> Dict[str, str]:
+    """
+    Load saved article HTML, falling back to generated pages.
+
+    Returns:
+        Mapping of page name to HTML text
+    """
+    pages = {}
+    if SAVED_HTML_DIR.is_dir():
+        for path in sorted(SAVED_HTML_DIR.iterdir()):
+            if path.name.endswith(".html.gz"):
+                pages[path.name[:-8]] = gzip.decompress(path.read_bytes()).decode("utf-8")
+            elif path.suffix == ".html":
+                pages[path.stem] = path.read_text(encoding="utf-8")
+    if not pages:
+        for quiz in load_sample_quizzes():
+            pages[quiz["title"]] = build_article_html(quiz["title"])
+    return pages
@@ -0,0 +1,352 @@
+"""
+End-to-end load test of the API against local Wikipedia and LLM stand-ins.
+
+Starts the stand-ins (stand_ins.py) and the app under uvicorn, pointed at
+them and at a fresh database, then runs scenarios with a fixed number of
+concurrent clients, each sending its next request as soon as the last one
+returns:
+
+- cold: `POST /api/quizzes/generate` for a new article every time
+  (scrape, LLM call and persist on every request)
+- hot: `GET /api/quizzes/{id}` over already generated quizzes (mostly
+  served from the response cache)
+- mixed: quiz reads and `GET /api/quizzes` list pages, `--get-ratio` of
+  them reads
+
+Reports requests per second, p50/p95/p99 latency and the error rate per
+scenario and endpoint. A failed LLM call is answered by the offline
+generator rather than an error, so cold runs also report the app's LLM
+fallbacks (from /metrics) and the calls the LLM stand-in failed.
+
+The load generator is one asyncio process; for read scenarios beyond a few
+thousand requests per second, check that it is not the bottleneck (e.g.
+run two at once against `--target`).
+
+Usage:
+    python benchmarks/load_test.py --scenario cold --concurrency 20 --duration 30
+    python benchmarks/load_test.py --scenario mixed --workers 4 --concurrency 100
+    python benchmarks/load_test.py --llm-error-rate 0.05 --app-env LLM_CONCURRENCY=16
+    python benchmarks/load_test.py --target http://localhost:8000 --scenario hot
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from stand_ins import LatencyProfile, start_llm, start_wikipedia
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# (endpoint label, method, path, JSON body)
+Request = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+_FALLBACKS = re.compile(r"^wikiquiz_llm_fallbacks_total(?:\{[^}]*\})? (\S+)$", re.MULTILINE)
+
+
+class Scenario:
+    """Produces the requests of one load scenario."""
+
+    name = ""
+
+    def __init__(self, wiki_url: str, args: argparse.Namespace):
+        self.wiki_url = wiki_url
+        self.args = args
+
+    async def prepare(self, client: httpx.AsyncClient) -> None:
+        """Set up what the scenario needs; not measured."""
+
+    def next_request(self, rng: random.Random) -> Request:
+        raise NotImplementedError
+
+
+class ColdGenerate(Scenario):
+    name = "cold"
+
+    def __init__(self, wiki_url: str, args: argparse.Namespace):
+        super().__init__(wiki_url, args)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.count = 0
+
+    def next_request(self, rng: random.Random) -> Request:
+        self.count += 1
+        url = f"{self.wiki_url}/wiki/Load_{self.run_id}_{self.count}"
+        return "generate", "POST", "/api/quizzes/generate", {"url": url}
+
+
+class HotReads(Scenario):
+    name = "hot"
+
+    async def prepare(self, client: httpx.AsyncClient) -> None:
+        # The same articles every run, so a reused database has them already
+        limit = asyncio.Semaphore(8)
+
+        async def generate(i: int) -> int:
+            async with limit:
+                response = await client.post(
+                    "/api/quizzes/generate", json={"url": f"{self.wiki_url}/wiki/Load_seed_{i}"},
+                )
+                response.raise_for_status()
+                return response.json()["id"]
+        self.quiz_ids = await asyncio.gather(*(generate(i) for i in range(self.args.seed_quizzes)))
+
+    def next_request(self, rng: random.Random) -> Request:
+        return "get", "GET", f"/api/quizzes/{rng.choice(self.quiz_ids)}", None
+
+
+class MixedReads(HotReads):
+    name = "mixed"
+
+    def next_request(self, rng: random.Random) -> Request:
+        if rng.random() < self.args.get_ratio:
+            return super().next_request(rng)
+        return "list", "GET", "/api/quizzes?limit=20", None
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (ColdGenerate, HotReads, MixedReads)}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles (ms) and error rate of one endpoint or scenario."""
+    values = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status == "exception" or status >= 400)
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+async def _llm_fallbacks(client: httpx.AsyncClient) -> Optional[float]:
+    """The app's LLM fallback count, or None without /metrics."""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    return sum(float(value) for value in _FALLBACKS.findall(response.text))
+
+
+async def _llm_stats(llm_url: Optional[str]) -> Optional[Dict[str, int]]:
+    if llm_url is None:
+        return None
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{llm_url}/stats")).json()
+
+
+async def run_scenario(
+    scenario: Scenario,
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    timeout: float,
+    llm_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run one scenario for `duration` seconds with `concurrency` clients."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        await scenario.prepare(client)
+        fallbacks_before = await _llm_fallbacks(client)
+        llm_before = await _llm_stats(llm_url)
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def user(seed: int) -> None:
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                label, method, path, body = scenario.next_request(rng)
+                sent = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = "exception"
+                latencies[label].append(time.perf_counter() - sent)
+                statuses[label][status] += 1
+
+        await asyncio.gather(*(user(seed) for seed in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        fallbacks_after = await _llm_fallbacks(client)
+        llm_after = await _llm_stats(llm_url)
+
+    result = {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        **summarize(
+            [value for values in latencies.values() for value in values],
+            sum(statuses.values(), Counter()),
+            elapsed,
+        ),
+        "endpoints": {label: summarize(latencies[label], statuses[label], elapsed) for label in latencies},
+    }
+    if fallbacks_before is not None and fallbacks_after is not None:
+        result["llm_fallbacks"] = int(fallbacks_after - fallbacks_before)
+    if llm_before is not None:
+        result["llm_stand_in"] = {name: llm_after[name] - llm_before[name] for name in llm_after}
+    return result
+
+
+def start_app(port: int, workers: int, env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    """Start the app under uvicorn, logging to `log_path`, and wait until /health answers."""
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app exited with status {process.returncode}, see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The app did not become healthy within 60 seconds")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'scenario':<10}{'endpoint':<10}{'requests':>9}{'rps':>9}{'p50 ms':>9}"
+          f"{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for result in results:
+        rows = [("all", result)] + list(result["endpoints"].items()) if len(result["endpoints"]) > 1 \
+            else list(result["endpoints"].items())
+        for label, r in rows:
+            print(f"{result['scenario']:<10}{label:<10}{r['requests']:>9}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}"
+                  f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['error_rate']:>8.1%}")
+        notes = []
+        if result.get("llm_stand_in", {}).get("requests"):
+            stand_in = result["llm_stand_in"]
+            notes.append(f"LLM calls {stand_in['requests']} ({stand_in['errors']} failed, "
+                         f"{stand_in['throttled']} throttled)")
+        if result.get("llm_fallbacks"):
+            notes.append(f"offline fallbacks {result['llm_fallbacks']}")
+        if notes:
+            print(f"{'':<10}{', '.join(notes)}")
+
+
+async def run(args: argparse.Namespace, base_url: str, wiki_url: str, llm_url: Optional[str]) -> List[Dict[str, Any]]:
+    results = []
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    for name in names:
+        scenario = SCENARIOS[name](wiki_url, args)
+        print(f"Running {name} for {args.duration:.0f} s with {args.concurrency} clients...")
+        results.append(await run_scenario(
+            scenario, base_url, args.concurrency, args.duration, args.timeout, llm_url,
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--seed-quizzes", type=int, default=20, help="Quizzes the read scenarios read")
+    parser.add_argument("--get-ratio", type=float, default=0.8, help="Share of quiz reads in mixed")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--database-url", help="Defaults to a new SQLite file")
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra settings for the app, e.g. LLM_CONCURRENCY=16")
+    parser.add_argument("--target", help="Load an already running app instead (configured by you)")
+    parser.add_argument("--wiki-latency-ms", type=float, default=100)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500)
+    parser.add_argument("--llm-jitter-ms", type=float, default=500)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    wiki, wiki_port = start_wikipedia(LatencyProfile(args.wiki_latency_ms, args.wiki_latency_ms / 4))
+    wiki_url = f"http://127.0.0.1:{wiki_port}"
+    processes = [wiki]
+    llm_url = None
+    app = None
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            llm, llm_port = start_llm(
+                LatencyProfile(args.llm_latency_ms, args.llm_jitter_ms, args.llm_tokens_per_second),
+                args.llm_error_rate, args.llm_throttle_rate,
+            )
+            processes.append(llm)
+            llm_url = f"http://127.0.0.1:{llm_port}"
+            port = _free_port()
+            work_dir = Path(tempfile.mkdtemp(prefix="load_test_"))
+            env = {
+                "DATABASE_URL": args.database_url or f"sqlite:///{work_dir}/load_test.db",
+                "OPENAI_API_KEY": "stand-in",
+                "OPENAI_BASE_URL": f"{llm_url}/v1",
+                "GOOGLE_API_KEY": "",
+                "LLM_REQUESTS_PER_MINUTE": "0",
+                "METRICS_ENABLED": "True",
+            }
+            env.update(item.split("=", 1) for item in args.app_env)
+            log_path = work_dir / "app.log"
+            print(f"App log: {log_path}")
+            app = start_app(port, args.workers, env, log_path)
+            base_url = f"http://127.0.0.1:{port}"
+
+        results = asyncio.run(run(args, base_url, wiki_url, llm_url))
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait(timeout=30)
+        for process in processes:
+            process.terminate()
+
+    print_report(results)
+    if args.output:
+        report = {
+            "settings": {name: value for name, value in vars(args).items() if name != "output"},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2, default=str) + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
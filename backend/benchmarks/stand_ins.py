@@ -0,0 +1,291 @@
+"""
+Local stand-ins for Wikipedia and an OpenAI-compatible LLM API.
+
+Used by load_test.py, or run on their own to point a server at them:
+
+- Wikipedia: `GET /wiki/<Title>` answers with a recorded article page
+  (see fixtures.py). Titles without a recorded page get one of the
+  recorded pages with the title swapped in, so every title is a distinct
+  article and cold generations never hit the LLM cache.
+- LLM: `POST /v1/chat/completions` (plain and `stream=true`) answers with
+  one of the sample quizzes after a configurable latency and jitter, and
+  fails a configurable fraction of calls with 500s and 429s.
+  `GET /stats` returns what it served.
+
+Each server runs in its own process, so it does not compete with the
+server under test or the load generator for the GIL.
+
+Usage:
+    python benchmarks/stand_ins.py --wiki-port 8081 --llm-port 8082 --llm-latency-ms 1500
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Tuple
+from urllib.parse import unquote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import load_article_pages, load_sample_quizzes  # noqa: E402
+
+# Characters per streamed chunk; about one token
+STREAM_CHUNK_CHARS = 4
+
+_TITLE = re.compile(r"ARTICLE TITLE: (.*)")
+
+
+@dataclass
+class LatencyProfile:
+    """Response timing of a stand-in, in milliseconds."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0  # uniform, +/-
+    tokens_per_second: float = 0.0  # LLM output pace; 0 = all at once
+
+    def delay(self, rng: random.Random) -> float:
+        """Seconds to wait before answering."""
+        return max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, value, headers: Dict[str, str] = None) -> None:
+        self._send(status, json.dumps(value).encode("utf-8"), "application/json", headers)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(server: ThreadingHTTPServer, port_queue) -> None:
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _serve_wikipedia(port: int, profile: LatencyProfile, port_queue) -> None:
+    """Serve recorded article pages (runs in a child process)."""
+    pages = load_article_pages()
+    recorded = sorted(pages)
+    rng = random.Random()
+
+    class Handler(_Handler):
+        def do_GET(self):
+            if not self.path.startswith("/wiki/"):
+                self._send(404, b"Not found", "text/plain")
+                return
+            title = unquote(self.path[len("/wiki/"):].split("?")[0]).replace("_", " ")
+            page = pages.get(title)
+            if page is None:
+                original = recorded[zlib.crc32(title.encode("utf-8")) % len(recorded)]
+                page = pages[original].replace(original, title)
+            time.sleep(profile.delay(rng))
+            self._send(200, page.encode("utf-8"), "text/html; charset=UTF-8")
+
+    _serve(_Server(("127.0.0.1", port), Handler), port_queue)
+
+
+def _serve_llm(
+    port: int,
+    profile: LatencyProfile,
+    error_rate: float,
+    throttle_rate: float,
+    port_queue,
+) -> None:
+    """Serve an OpenAI-compatible chat completions API (runs in a child process)."""
+    quizzes = load_sample_quizzes()
+    rng = random.Random()
+    lock = threading.Lock()
+    counts = {"requests": 0, "streamed": 0, "errors": 0, "throttled": 0}
+
+    def count(name: str) -> None:
+        with lock:
+            counts[name] += 1
+
+    def answer(prompt: str) -> str:
+        match = _TITLE.search(prompt)
+        title = match.group(1).strip() if match else "Article"
+        quiz = quizzes[zlib.crc32(title.encode("utf-8")) % len(quizzes)]
+        return json.dumps({
+            "summary": quiz["summary"].replace(quiz["title"], title),
+            "key_entities": quiz["key_entities"],
+            "sections": quiz["sections"],
+            "related_topics": quiz["related_topics"],
+            "quiz": quiz["quiz"],
+        }, indent=2)
+
+    class Handler(_Handler):
+        def do_GET(self):
+            if self.path == "/stats":
+                with lock:
+                    self._send_json(200, dict(counts))
+            else:
+                self._send(404, b"Not found", "text/plain")
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                return
+            count("requests")
+            roll = rng.random()
+            time.sleep(profile.delay(rng))
+            if roll < error_rate:
+                count("errors")
+                self._send_json(500, {"error": {"message": "Stand-in server error", "type": "server_error"}})
+                return
+            if roll < error_rate + throttle_rate:
+                count("throttled")
+                self._send_json(
+                    429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                    headers={"Retry-After": "1"},
+                )
+                return
+
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            content = answer(prompt)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            model = body.get("model", "stand-in")
+            if body.get("stream"):
+                count("streamed")
+                self._stream(completion_id, model, content)
+                return
+            if profile.tokens_per_second:
+                time.sleep(len(content) / STREAM_CHUNK_CHARS / profile.tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4,
+                },
+            })
+
+        def _stream(self, completion_id: str, model: str, content: str) -> None:
+            """Server-sent event chunks, in HTTP/1.1 chunked encoding."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data: str) -> None:
+                event = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(event):X}\r\n".encode("ascii") + event + b"\r\n")
+
+            for i in range(0, len(content), STREAM_CHUNK_CHARS):
+                write(json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": content[i:i + STREAM_CHUNK_CHARS]},
+                        "finish_reason": None,
+                    }],
+                }))
+                if profile.tokens_per_second:
+                    time.sleep(1 / profile.tokens_per_second)
+            write("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+    _serve(_Server(("127.0.0.1", port), Handler), port_queue)
+
+
+def _start(target, *args) -> Tuple[multiprocessing.Process, int]:
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=target, args=args + (port_queue,), daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=30)
+
+
+def start_wikipedia(profile: LatencyProfile, port: int = 0) -> Tuple[multiprocessing.Process, int]:
+    """
+    Start the Wikipedia stand-in in its own process.
+
+    Returns:
+        Tuple of (process, port)
+    """
+    return _start(_serve_wikipedia, port, profile)
+
+
+def start_llm(
+    profile: LatencyProfile,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    port: int = 0,
+) -> Tuple[multiprocessing.Process, int]:
+    """
+    Start the LLM stand-in in its own process.
+
+    Args:
+        profile: Time to the first token (and output pace)
+        error_rate: Fraction of calls answered with a 500
+        throttle_rate: Fraction of calls answered with a 429
+
+    Returns:
+        Tuple of (process, port)
+    """
+    return _start(_serve_llm, port, profile, error_rate, throttle_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--wiki-port", type=int, default=8081)
+    parser.add_argument("--wiki-latency-ms", type=float, default=100)
+    parser.add_argument("--llm-port", type=int, default=8082)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500)
+    parser.add_argument("--llm-jitter-ms", type=float, default=500)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    wiki_profile = LatencyProfile(args.wiki_latency_ms, args.wiki_latency_ms / 4)
+    llm_profile = LatencyProfile(args.llm_latency_ms, args.llm_jitter_ms, args.llm_tokens_per_second)
+    wiki, wiki_port = start_wikipedia(wiki_profile, args.wiki_port)
+    llm, llm_port = start_llm(llm_profile, args.llm_error_rate, args.llm_throttle_rate, args.llm_port)
+    print(f"Wikipedia stand-in: http://127.0.0.1:{wiki_port}/wiki/<Title> {asdict(wiki_profile)}")
+    print(f"LLM stand-in:       http://127.0.0.1:{llm_port}/v1 {asdict(llm_profile)}")
+    print("\nStart the server with:")
+    print(f"  OPENAI_API_KEY=stand-in OPENAI_BASE_URL=http://127.0.0.1:{llm_port}/v1 GOOGLE_API_KEY= "
+          "LLM_REQUESTS_PER_MINUTE=0 uvicorn main:app")
+    try:
+        wiki.join()
+        llm.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Offline micro-benchmark suite with a machine-readable baseline.
+
+Times the hot paths of quiz generation and serving without network access
+or a server, on the fixtures in `sample_data/` (quiz JSON, and saved
+article HTML when present, see fixtures.py):
+
+- parse/<page>: `scrape_wikipedia` parsing (extraction, entities, digest)
+- prompt: filling QUIZ_PROMPT_TEMPLATE with an article digest
+- llm_json/fenced, llm_json/stream: `parse_llm_json` on a fenced response,
+  and `IncrementalObjectParser` fed the same response in chunks
+- create_quiz, get_quiz: `crud` against an in-memory SQLite database
+- serialize: `QuizResponse` validation and JSON encoding of a stored quiz
+
+Each case runs in rounds of enough calls to last about ROUND_SECONDS, with
+the garbage collector off (as `timeit` does); the median time per call over
+the rounds is the result, and the interquartile range its noise.
+
+`--output` writes the results as JSON; `--compare` reads such a file and
+exits non-zero if a case got slower by more than `--threshold` and more
+than its noise. Baselines are only comparable on the same machine and
+settings, which the file records.
+
+Usage:
+    python benchmarks/suite.py --output benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json
+    python benchmarks/suite.py --filter parse --rounds 10
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import sqlalchemy  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from config import settings  # noqa: E402
+from database import Base  # noqa: E402
+from extractors import get_extractor  # noqa: E402
+from json_stream import IncrementalObjectParser  # noqa: E402
+from schemas import QuizResponse  # noqa: E402
+from utils import QUIZ_PROMPT_TEMPLATE, _parse_wikipedia_html, parse_llm_json  # noqa: E402
+import crud  # noqa: E402
+from fixtures import load_article_pages, load_sample_quizzes  # noqa: E402
+
+FORMAT_VERSION = 1
+ROUND_SECONDS = 0.05
+STREAM_CHUNK_CHARS = 20  # About five tokens per streamed chunk
+
+# A case returning its own elapsed seconds sets `self_timed`, so that
+# untimed per-call setup or cleanup can live inside it
+Case = Callable[[], Any]
+
+
+def _llm_output(quiz: Dict[str, Any]) -> Dict[str, Any]:
+    """A sample quiz in the shape the LLM returns it."""
+    return {
+        "summary": quiz["summary"],
+        "key_entities": quiz["key_entities"],
+        "sections": quiz["sections"],
+        "related_topics": quiz["related_topics"],
+        "quiz": quiz["quiz"],
+    }
+
+
+def build_cases() -> Dict[str, Case]:
+    """Benchmark name -> callable; setup happens here, outside the timings."""
+    cases: Dict[str, Case] = {}
+    fetched_at = datetime(2024, 1, 1)
+    pages = load_article_pages()
+    for name, html in pages.items():
+        cases[f"parse/{name}"] = lambda html=html: _parse_wikipedia_html(html, fetched_at)
+
+    quiz = load_sample_quizzes()[0]
+    article = _parse_wikipedia_html(next(iter(pages.values())), fetched_at)
+    cases["prompt"] = lambda: QUIZ_PROMPT_TEMPLATE.format(title=article["title"], content=article["content"])
+
+    response = "```json\n" + json.dumps(_llm_output(quiz), indent=2) + "\n```"
+    cases["llm_json/fenced"] = lambda: parse_llm_json(response)
+    chunks = [response[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(response), STREAM_CHUNK_CHARS)]
+
+    def parse_stream():
+        parser = IncrementalObjectParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        return parser.result()
+    cases["llm_json/stream"] = parse_stream
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+    db = Session()
+    counter = iter(range(10 ** 9))
+    fields = dict(
+        title=quiz["title"], summary=quiz["summary"], key_entities=quiz["key_entities"],
+        sections=quiz["sections"], related_topics=quiz["related_topics"], questions=quiz["quiz"],
+    )
+
+    def create_quiz():
+        # Deleted again untimed: stored copies of the same questions would
+        # pile up in the same LSH buckets and slow every later call down
+        start = time.perf_counter()
+        created = crud.create_quiz(db=db, url=f"https://en.wikipedia.org/wiki/Bench_{next(counter)}", **fields)
+        elapsed = time.perf_counter() - start
+        crud.delete_quiz(db, created.id)
+        db.expunge_all()
+        return elapsed
+    create_quiz.self_timed = True
+    cases["create_quiz"] = create_quiz
+
+    stored = crud.create_quiz(db=db, url=quiz["url"], **fields)
+    stored_id = stored.id
+
+    def get_quiz():
+        crud.get_quiz(db, stored_id)
+        db.expunge_all()  # Read from the database every call, not the identity map
+    cases["get_quiz"] = get_quiz
+
+    cases["serialize"] = lambda: QuizResponse.model_validate(stored).model_dump_json()
+    return cases
+
+
+def _run(case: Case, calls: int) -> float:
+    """Seconds taken by `calls` calls of the case."""
+    if getattr(case, "self_timed", False):
+        return sum(case() for _ in range(calls))
+    start = time.perf_counter()
+    for _ in range(calls):
+        case()
+    return time.perf_counter() - start
+
+
+def _calls_per_round(case: Case) -> int:
+    """Calls that take about ROUND_SECONDS, doubling like timeit.autorange."""
+    calls = 1
+    while True:
+        if _run(case, calls) >= ROUND_SECONDS or calls >= 1 << 20:
+            return calls
+        calls *= 2
+
+
+def measure(case: Case, rounds: int) -> Dict[str, Any]:
+    """Median, quartiles and min of the time per call, in microseconds."""
+    calls = _calls_per_round(case)
+    samples: List[float] = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            samples.append(_run(case, calls) / calls * 1e6)
+    finally:
+        gc.enable()
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "iqr_us": round(quartiles[2] - quartiles[0], 3),
+        "min_us": round(min(samples), 3),
+        "rounds": rounds,
+        "calls_per_round": calls,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers depend on besides the code."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "html_extractor": get_extractor().name,
+        "llm_content_mode": settings.LLM_CONTENT_MODE,
+        "local_entities": settings.LOCAL_ENTITIES,
+        "fixture_pages": sorted(load_article_pages()),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+) -> Tuple[List[str], List[Tuple[str, float, float, float, str]]]:
+    """
+    Compare medians with a baseline.
+
+    A case regresses if its median grew by more than `threshold` (a
+    fraction) and by more than the two runs' combined IQR, so noisy
+    cases don't fail on jitter.
+
+    Returns:
+        Regressed case names, and (name, baseline us, current us, change,
+        verdict) rows for every case in both runs
+    """
+    regressions, rows = [], []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        old, new = before["median_us"], result["median_us"]
+        change = (new - old) / old if old else 0.0
+        noise = before.get("iqr_us", 0) + result["iqr_us"]
+        if change > threshold and new - old > noise:
+            verdict = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold and old - new > noise:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append((name, old, new, change, verdict))
+    return regressions, rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Slowdown (fraction of the baseline median) that counts as a regression")
+    args = parser.parse_args()
+
+    cases = {name: case for name, case in build_cases().items() if args.filter in name}
+    results = {}
+    print(f"{'case':<36}{'median us':>12}{'iqr us':>10}{'calls':>8}")
+    for name, case in cases.items():
+        results[name] = measure(case, args.rounds)
+        r = results[name]
+        print(f"{name:<36}{r['median_us']:>12.1f}{r['iqr_us']:>10.1f}{r['calls_per_round']:>8}")
+
+    if args.output:
+        report = {
+            "format": FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "environment": environment(),
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("environment") != environment():
+            print("Warning: the baseline was recorded in a different environment")
+        regressions, rows = compare(results, baseline["results"], args.threshold)
+        print(f"\n{'case':<36}{'baseline us':>12}{'now us':>10}{'change':>9}  verdict")
+        for name, old, new, change, verdict in rows:
+            print(f"{name:<36}{old:>12.1f}{new:>10.1f}{change:>+9.1%}  {verdict}")
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Bulk quiz generation from a file of Wikipedia URLs.
+
+Runs many articles through the generation pipeline at once. Scraping and
+LLM calls have separate concurrency limits and LLM calls respect the
+provider's requests- and tokens-per-minute budgets. Every finished URL is appended to a checkpoint
+file, so a crashed or interrupted run picks up where it stopped when
+started again with the same file.
+
+Usage (one URL per line; blank lines and # comments are ignored):
+    python -m backend.bulk_generate urls.txt
+    python backend/bulk_generate.py urls.txt --llm-concurrency 8 --rpm 500
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import settings  # noqa: E402
+from database import init_db  # noqa: E402
+import llm_clients  # noqa: E402
+import pipeline  # noqa: E402
+from pipeline import StageLimits, generate_quiz_for_url  # noqa: E402
+import utils  # noqa: E402
+from urls import canonicalize_url  # noqa: E402
+
+PROGRESS_EVERY = 30  # seconds
+
+
+def read_urls(path: Path) -> List[str]:
+    """Canonical URLs from the input file, in order, without duplicates."""
+    urls = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(canonicalize_url(line))
+    return list(dict.fromkeys(urls))
+
+
+def read_checkpoint(path: Path) -> Dict[str, dict]:
+    """Last recorded result per URL. A torn last line (crash mid-write) is ignored."""
+    done = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["url"]] = record
+    return done
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+class BulkRun:
+    """One pass over a list of URLs, recording each result to the checkpoint."""
+
+    def __init__(self, urls: List[str], checkpoint: Path, workers: int):
+        self.urls = urls
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def articles_per_minute(self) -> float:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (self.succeeded + self.failed) * 60 / elapsed
+
+    def _record(self, checkpoint_file, url: str, **result) -> None:
+        record = {"url": url, **result, "at": datetime.utcnow().isoformat()}
+        checkpoint_file.write(json.dumps(record) + "\n")
+        checkpoint_file.flush()
+
+    async def _worker(self, queue: "asyncio.Queue[str]", checkpoint_file) -> None:
+        while True:
+            try:
+                url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                quiz = await generate_quiz_for_url(url)
+            except Exception as e:
+                self.failed += 1
+                print(f"FAIL {url}: {e}")
+                self._record(checkpoint_file, url, status="failed", error=str(e))
+            else:
+                self.succeeded += 1
+                self._record(checkpoint_file, url, status="succeeded", quiz_id=quiz.id)
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_EVERY)
+            print(f"  {self.succeeded + self.failed}/{len(self.urls)} done, "
+                  f"{self.failed} failed, {self.articles_per_minute:.1f} articles/min")
+
+    async def run(self) -> None:
+        queue: "asyncio.Queue[str]" = asyncio.Queue()
+        for url in self.urls:
+            queue.put_nowait(url)
+        self.started = time.monotonic()
+        with self.checkpoint.open("a", encoding="utf-8") as checkpoint_file:
+            if checkpoint_file.tell() and not _ends_with_newline(self.checkpoint):
+                checkpoint_file.write("\n")  # Don't glue onto a torn last line
+            reporter = asyncio.create_task(self._report_progress())
+            try:
+                await asyncio.gather(*(
+                    self._worker(queue, checkpoint_file) for _ in range(self.workers)
+                ))
+            finally:
+                reporter.cancel()
+
+
+async def main(args) -> int:
+    init_db()
+    pipeline.stage_limits = StageLimits(scrape=args.scrape_concurrency)
+    llm_clients.configure_limits(
+        concurrency=args.llm_concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
+
+    urls = read_urls(args.urls_file)
+    checkpoint = args.checkpoint or args.urls_file.with_name(args.urls_file.name + ".checkpoint.jsonl")
+    done = read_checkpoint(checkpoint)
+    finished = {"succeeded"} if args.retry_failed else {"succeeded", "failed"}
+    pending = [url for url in urls if done.get(url, {}).get("status") not in finished]
+
+    print(f"{len(urls)} URLs, {len(urls) - len(pending)} already in {checkpoint}, "
+          f"{len(pending)} to generate")
+    print(f"scrape concurrency {args.scrape_concurrency}, LLM concurrency "
+          f"{args.llm_concurrency}, {args.rpm:g} LLM requests/min, {args.tpm:g} tokens/min")
+    if not pending:
+        return 0
+
+    # Enough articles in flight to keep both stages busy
+    run = BulkRun(pending, checkpoint, workers=args.scrape_concurrency + args.llm_concurrency)
+    try:
+        await run.run()
+        elapsed = time.monotonic() - run.started
+        print(f"Done: {run.succeeded} succeeded, {run.failed} failed in {elapsed:.1f}s "
+              f"({run.articles_per_minute:.1f} articles/min)")
+        for name, provider_stats in llm_clients.stats().items():
+            print(f"{name}: {provider_stats['requests']} LLM requests, queue wait avg "
+                  f"{provider_stats['wait_seconds_avg']:.2f}s, max {provider_stats['wait_seconds_max']:.2f}s")
+    finally:
+        # Release pooled connections even when the run fails or is interrupted
+        await llm_clients.close_providers()
+        await utils.close_http_client()
+    if run.failed:
+        print("Re-run with --retry-failed to retry the failed URLs")
+    return 1 if run.failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("urls_file", type=Path, help="File with one Wikipedia URL per line")
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help="Progress file (default: <urls_file>.checkpoint.jsonl)")
+    parser.add_argument("--scrape-concurrency", type=int, default=settings.SCRAPE_CONCURRENCY)
+    parser.add_argument("--llm-concurrency", type=int, default=settings.LLM_CONCURRENCY)
+    parser.add_argument("--rpm", type=float, default=settings.LLM_REQUESTS_PER_MINUTE,
+                        help="LLM requests per minute, 0 for no limit")
+    parser.add_argument("--tpm", type=float, default=settings.LLM_TOKENS_PER_MINUTE,
+                        help="LLM tokens per minute, 0 for no limit")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Also retry URLs that failed in a previous run")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Query-count checks for the CRUD read and write paths.
+
+Runs every path against an in-memory SQLite database with 1 and with 25
+quizzes and fails if a path issues more statements than its budget, or if
+the count grows with the number of rows (an N+1 pattern), and checks that
+questions of one quiz that duplicate each other are flagged and that
+cursor pagination ends over migrated whole-second timestamps. Exits
+non-zero on failure, so it can gate CI:
+
+    python check_query_counts.py
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import Base, count_queries
+import crud
+import migrate
+import search
+from models import Question
+from schemas import QuizResponse, QuizListResponse
+
+QUESTIONS_PER_QUIZ = 8
+
+
+def make_session():
+    """Create a session on a fresh in-memory SQLite database."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def seed(db, count: int) -> None:
+    """Insert `count` quizzes with questions."""
+    for i in range(count):
+        crud.create_quiz(
+            db=db,
+            url=f"https://en.wikipedia.org/wiki/Article_{i}",
+            title=f"Article {i}",
+            summary="Summary",
+            key_entities={"people": [], "organizations": [], "locations": []},
+            sections=["History"],
+            related_topics=["Topic"],
+            questions=[
+                {
+                    "question": f"Question {n}?",
+                    "options": ["A", "B", "C", "D"],
+                    "answer": "A",
+                    "difficulty": "easy",
+                    "explanation": "Because.",
+                }
+                for n in range(QUESTIONS_PER_QUIZ)
+            ],
+        )
+
+
+# name -> (budget, callable(db) that reads and serializes like the endpoint does)
+READ_PATHS = {
+    "get_quiz + QuizResponse": (
+        2, lambda db: QuizResponse.model_validate(crud.get_quiz(db, 1)),
+    ),
+    "get_quiz_by_url + QuizResponse": (
+        2, lambda db: QuizResponse.model_validate(
+            crud.get_quiz_by_url(db, "https://en.wikipedia.org/wiki/Article_0")
+        ),
+    ),
+    "get_quiz_page + QuizListResponse": (
+        1, lambda db: [QuizListResponse.model_validate(r) for r in crud.get_quiz_page(db)],
+    ),
+    "get_quizzes + QuizListResponse": (
+        1, lambda db: [QuizListResponse.model_validate(q) for q in crud.get_quizzes(db)],
+    ),
+    "get_quizzes(with_questions) + QuizResponse": (
+        2, lambda db: [
+            QuizResponse.model_validate(q)
+            for q in crud.get_quizzes(db, with_questions=True)
+        ],
+    ),
+    "search_quizzes": (
+        1, lambda db: search.search_quizzes(db, "article question"),
+    ),
+    "get_answer_key": (
+        1, lambda db: crud.get_answer_key(db, 1),
+    ),
+    "get_question_stats": (
+        1, lambda db: crud.get_question_stats(db, 1),
+    ),
+}
+
+
+def check() -> bool:
+    ok = True
+    counts = {}
+    for size in (1, 25):
+        engine, Session = make_session()
+        with Session() as db:
+            seed(db, size)
+        for name, (budget, read) in READ_PATHS.items():
+            with Session() as db, count_queries(engine) as counter:
+                read(db)
+            counts.setdefault(name, []).append(counter.count)
+            if counter.count > budget:
+                ok = False
+                print(f"FAIL {name}: {counter.count} queries with {size} quizzes (budget {budget})")
+                for statement in counter.statements:
+                    print(f"     {statement.splitlines()[0][:100]}")
+
+    # Writing a quiz: 6 statements (quiz, duplicate candidates, questions,
+    # LSH bands, snapshot, search row) however many questions it has
+    for size in (1, 25):
+        engine, Session = make_session()
+        with Session() as db, count_queries(engine) as counter:
+            quiz = crud.create_quiz(
+                db=db, url="https://en.wikipedia.org/wiki/New", title="New", summary="Summary",
+                key_entities={}, sections=[], related_topics=[],
+                questions=[
+                    {"question": f"Question {n}?", "options": ["A", "B"], "answer": "A"}
+                    for n in range(size)
+                ],
+                raw_html="<html></html>",
+            )
+        counts.setdefault("create_quiz", []).append(counter.count)
+        if counter.count > 6:
+            ok = False
+            print(f"FAIL create_quiz: {counter.count} queries with {size} questions (budget 6)")
+
+        # Serializing the created quiz: no refresh or lazy load
+        with count_queries(engine) as counter:
+            QuizResponse.model_validate(quiz)
+        counts.setdefault("QuizResponse of created quiz", []).append(counter.count)
+        if counter.count > 0:
+            ok = False
+            print(f"FAIL QuizResponse of created quiz: {counter.count} queries (budget 0)")
+
+    # Questions of one new quiz that duplicate each other point at the
+    # first of them, for one UPDATE after the questions' INSERT
+    engine, Session = make_session()
+    duplicate = {"question": "Which machine did Turing break?", "options": ["Enigma", "B"], "answer": "Enigma"}
+    with Session() as db, count_queries(engine) as counter:
+        quiz = crud.create_quiz(
+            db=db, url="https://en.wikipedia.org/wiki/New", title="New", summary="Summary",
+            key_entities={}, sections=[], related_topics=[], questions=[duplicate] * 3,
+        )
+    first = quiz.questions[0].id
+    with Session() as db:
+        flags = [row.duplicate_of for row in db.query(Question).order_by(Question.id)]
+    if flags != [None, first, first] or [q.duplicate_of for q in quiz.questions] != flags or counter.count > 7:
+        ok = False
+        print(f"FAIL duplicates within a quiz: duplicate_of {flags} in {counter.count} queries (budget 7)")
+    else:
+        print(f"duplicates within a quiz: {counter.count} queries")
+
+    # Writing a batch of attempts: 3 statements (attempts, answers, stats
+    # upsert) however many attempts and answers it holds
+    for size in (1, 25):
+        engine, Session = make_session()
+        with Session() as db:
+            seed(db, 1)
+        attempts = [
+            {
+                "id": f"attempt-{i}", "quiz_id": 1, "user_id": None, "score": 1, "total": 2,
+                "duration_ms": None, "submitted_at": datetime.utcnow(),
+                "answers": [
+                    {"question_id": 1, "selected": "A", "correct": True, "time_ms": 900},
+                    {"question_id": 2, "selected": "B", "correct": False, "time_ms": None},
+                ],
+            }
+            for i in range(size)
+        ]
+        with Session() as db, count_queries(engine) as counter:
+            crud.save_attempts(db, attempts)
+        counts.setdefault("save_attempts", []).append(counter.count)
+        if counter.count > 3:
+            ok = False
+            print(f"FAIL save_attempts: {counter.count} queries with {size} attempts (budget 3)")
+
+    # Cursor pagination over rows stored with whole-second timestamps (by
+    # CURRENT_TIMESTAMP, before created_at had a Python default) ends and
+    # returns every quiz once after the migration
+    engine, Session = make_session()
+    with Session() as db:
+        seed(db, 5)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE quizzes SET created_at = '2024-01-01 12:00:00'"))
+    migrate.normalize_sqlite_timestamps(engine)
+    seen, cursor = [], None
+    with Session() as db:
+        for _ in range(10):
+            rows = crud.get_quiz_page(db, limit=2, cursor=cursor)
+            seen.extend(row.id for row in rows)
+            if len(rows) < 2:
+                break
+            cursor = crud.decode_cursor(crud.encode_cursor(rows[-1]))
+    if sorted(seen) != [1, 2, 3, 4, 5]:
+        ok = False
+        print(f"FAIL cursor pagination over whole-second timestamps: pages returned {seen}")
+    else:
+        print("cursor pagination over whole-second timestamps: ends")
+
+    for name, values in counts.items():
+        if len(set(values)) > 1:
+            ok = False
+            print(f"FAIL {name}: query count grows with rows {values}")
+        else:
+            print(f"{name}: {values[-1]} queries")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
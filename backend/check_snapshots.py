@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Concurrent round-trip check for snapshot compression.
+
+Quizzes are saved from request, job and write-behind threads at once, so
+`compress_html` and `decompress_html` must be safe to call from many
+threads. Each of THREADS threads compresses and decompresses its own pages
+ROUNDS times; the check fails if any round trip changes the HTML. Exits
+non-zero on failure, so it can gate CI:
+
+    python check_snapshots.py
+"""
+import sys
+import threading
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from snapshots import ZSTD_AVAILABLE, compress_html, content_hash, decompress_html
+
+THREADS = 8
+ROUNDS = 50
+
+
+def page(n: int) -> str:
+    """A page of a few hundred KB, different per thread and round."""
+    paragraphs = "".join(f"<p>Paragraph {i} of page {n}: {'lorem ipsum ' * (i % 40)}</p>" for i in range(2000))
+    return f"<html><head><title>Page {n}</title></head><body>{paragraphs}</body></html>"
+
+
+def check() -> bool:
+    failures = []
+    start = threading.Barrier(THREADS)
+
+    def worker(index: int) -> None:
+        pages = [page(index * ROUNDS + r) for r in range(4)]
+        start.wait()
+        try:
+            for r in range(ROUNDS):
+                html = pages[r % len(pages)]
+                data, encoding = compress_html(html)
+                if content_hash(decompress_html(data, encoding)) != content_hash(html):
+                    failures.append(f"thread {index}, round {r}: round trip changed the HTML")
+        except Exception as e:
+            failures.append(f"thread {index}: {type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for failure in failures[:10]:
+        print(f"FAIL {failure}")
+    encoding = "zstd" if ZSTD_AVAILABLE else "gzip"
+    if not failures:
+        print(f"{encoding}: {THREADS} threads x {ROUNDS} round trips OK")
+    return not failures
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -1,10 +1,30 @@
 """
 CRUD operations for database interactions.
 """
-from sqlalchemy.orm import Session
-from models import Quiz, Question
+from sqlalchemy import func, insert, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+from models import (
+    Quiz, Question, ArticleSnapshot, GenerationJob, QuizAttempt, AttemptAnswer, QuestionStats
+)
+from snapshots import compress_html, decompress_html, content_hash
+from http_cache import quiz_responses
+import dedupe
+import search
+from urls import canonicalize_url, url_hash
 from schemas import KeyEntities, QuestionSchema
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+import base64
+import json
+import uuid
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING ... RETURNING
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
 
 def create_quiz(
@@ -17,65 +37,547 @@ def create_quiz(
     related_topics: List[str],
     questions: List[Dict[str, Any]],
     raw_html: Optional[str] = None,
+    fetched_at: Optional[datetime] = None,
 ) -> Quiz:
     """
     Create a new quiz with associated questions.
+    
+    The URL is stored in canonical form. If a quiz for the same canonical
+    URL already exists, that quiz is returned instead. The raw HTML, if
+    given, is stored compressed in `article_snapshots`.
+    
+    Questions that nearly duplicate a stored question, or an earlier
+    question of the same quiz, get `duplicate_of` set (see dedupe.py).
+    
+    On PostgreSQL and SQLite this takes one INSERT for the quiz (the
+    duplicate check is its ON CONFLICT (url_hash) clause), one SELECT for
+    near-duplicate candidates, one INSERT for all questions, one for their
+    LSH bands, one for the snapshot, one for the search index (search.py)
+    and the commit, plus one UPDATE when new questions duplicate each
+    other. Other databases use the ORM and have no search or
+    band index; `dedupe_questions.py` catches up on their questions.
     """
-    # Check if quiz already exists for this URL (caching bonus feature)
-    existing = db.query(Quiz).filter(Quiz.url == url).first()
+    question_rows = [
+        {
+            "question": q["question"],
+            "options": q["options"],
+            "answer": q["answer"],
+            "difficulty": q.get("difficulty", "medium"),
+            "explanation": q.get("explanation", ""),
+            "minhash": dedupe.signature(q["question"], q["answer"]),
+            "duplicate_of": None,
+        }
+        for q in questions
+    ]
+    snapshot_row = None
+    if raw_html is not None:
+        compressed, encoding = compress_html(raw_html)
+        snapshot_row = {
+            "content_hash": content_hash(raw_html),
+            "encoding": encoding,
+            "html": compressed,
+            "size": len(raw_html.encode("utf-8")),
+            "fetched_at": fetched_at or datetime.utcnow(),
+        }
+    quiz_row = {
+        "url": canonicalize_url(url),
+        "url_hash": url_hash(url),
+        "title": title,
+        "summary": summary,
+        "key_entities": key_entities,
+        "sections": sections,
+        "related_topics": related_topics,
+        "created_at": datetime.utcnow(),
+    }
+    
+    if db.get_bind().dialect.name in _UPSERT_DIALECTS:
+        return _create_quiz_bulk(db, quiz_row, question_rows, snapshot_row)
+    return _create_quiz_orm(db, quiz_row, question_rows, snapshot_row)
+
+
+
+def _create_quiz_bulk(
+    db: Session,
+    quiz_row: Dict[str, Any],
+    question_rows: List[Dict[str, Any]],
+    snapshot_row: Optional[Dict[str, Any]],
+) -> Quiz:
+    """Insert a quiz, its children and its index rows with Core statements (6 statements + commit)."""
+    dialect = db.get_bind().dialect.name
+    insert_quiz = (
+        _UPSERT_DIALECTS[dialect](Quiz.__table__)
+        .on_conflict_do_nothing(index_elements=["url_hash"])
+        .returning(Quiz.id)
+    )
+    quiz_id = db.execute(insert_quiz, quiz_row).scalar()
+    if quiz_id is None:
+        # The URL is already stored (cache hit or a concurrent writer)
+        return get_quiz_by_url(db, quiz_row["url"])
+    
+    question_rows = [dict(row, quiz_id=quiz_id) for row in question_rows]
+    pending_duplicates = dedupe.flag_duplicates(db, question_rows)
+    question_ids = _insert_questions(db, dialect, question_rows)
+    dedupe.link_duplicates(db, question_ids, question_rows, pending_duplicates)
+    dedupe.index_questions(db, question_ids, question_rows)
+    snapshot_id = None
+    if snapshot_row is not None:
+        snapshot_row = dict(snapshot_row, quiz_id=quiz_id)
+        snapshot_id = db.execute(
+            insert(ArticleSnapshot.__table__).returning(ArticleSnapshot.id), snapshot_row
+        ).scalar_one()
+    search.index_quiz(db, quiz_id, quiz_row["title"], quiz_row["summary"], question_rows)
+    db.commit()
+    
+    # Build the objects from what was written, so the caller can serialize
+    # the quiz without reading it back
+    db_quiz = _persistent(db, Quiz(id=quiz_id, **quiz_row))
+    db_questions = [
+        _persistent(db, Question(id=question_id, **row))
+        for question_id, row in zip(question_ids, question_rows)
+    ]
+    db_snapshot = None
+    if snapshot_row is not None:
+        db_snapshot = _persistent(db, ArticleSnapshot(id=snapshot_id, **snapshot_row))
+        set_committed_value(db_snapshot, "quiz", db_quiz)
+    for db_question in db_questions:
+        set_committed_value(db_question, "quiz", db_quiz)
+    set_committed_value(db_quiz, "questions", db_questions)
+    set_committed_value(db_quiz, "snapshot", db_snapshot)
+    return db_quiz
+
+
+def _insert_questions(db: Session, dialect: str, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert question rows in one statement and return their ids in row order."""
+    if not rows:
+        return []
+    # Parameters are bound at execute time so the compiled statement is cached
+    # across calls; SQLAlchemy sends the list as one multi-row INSERT
+    statement = insert(Question.__table__)
+    if dialect == "sqlite":
+        # SQLite assigns ascending rowids in row order, but SQLAlchemy can't
+        # promise RETURNING order there and would fall back to one INSERT per
+        # row if asked to, so sort the ids instead
+        return sorted(db.execute(statement.returning(Question.id), rows).scalars().all())
+    return db.execute(
+        statement.returning(Question.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+
+def _persistent(db: Session, obj):
+    """Add an object whose row is already committed, without flushing it again."""
+    make_transient_to_detached(obj)
+    db.add(obj)
+    return obj
+
+
+def _create_quiz_orm(
+    db: Session,
+    quiz_row: Dict[str, Any],
+    question_rows: List[Dict[str, Any]],
+    snapshot_row: Optional[Dict[str, Any]],
+) -> Quiz:
+    """Unit-of-work path for databases without INSERT ... ON CONFLICT."""
+    existing = get_quiz_by_url(db, quiz_row["url"])
     if existing:
         return existing
     
-    # Create quiz
-    db_quiz = Quiz(
-        url=url,
-        title=title,
-        summary=summary,
-        key_entities=key_entities,
-        sections=sections,
-        related_topics=related_topics,
-        raw_html=raw_html,
-    )
+    db_quiz = Quiz(**quiz_row)
+    if snapshot_row is not None:
+        db_quiz.snapshot = ArticleSnapshot(**snapshot_row)
+    # Attach through the relationship so the collection is already
+    # populated after commit (no refresh or lazy load needed)
+    db_quiz.questions = [Question(**row) for row in question_rows]
     db.add(db_quiz)
-    db.flush()  # Flush to get the quiz ID
-    
-    # Create questions
-    for q in questions:
-        db_question = Question(
-            quiz_id=db_quiz.id,
-            question=q["question"],
-            options=q["options"],
-            answer=q["answer"],
-            difficulty=q.get("difficulty", "medium"),
-            explanation=q.get("explanation", ""),
-        )
-        db.add(db_question)
     
-    db.commit()
-    db.refresh(db_quiz)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another writer stored this URL between our check and commit
+        db.rollback()
+        existing = get_quiz_by_url(db, quiz_row["url"])
+        if existing:
+            return existing
+        raise
     return db_quiz
 
 
 def get_quiz(db: Session, quiz_id: int) -> Optional[Quiz]:
-    """Get a quiz by ID with its questions."""
-    return db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    """Get a quiz by ID with its questions (2 queries)."""
+    return (
+        db.query(Quiz)
+        .options(selectinload(Quiz.questions))
+        .filter(Quiz.id == quiz_id)
+        .first()
+    )
+
+
+def get_quizzes(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    with_questions: bool = False,
+) -> List[Quiz]:
+    """
+    Get all quizzes.
+    
+    With `with_questions`, questions for the whole page are loaded in one
+    extra query instead of one per quiz.
+    """
+    query = db.query(Quiz)
+    if with_questions:
+        query = query.options(selectinload(Quiz.questions))
+    return query.offset(skip).limit(limit).all()
+
+
+def get_quiz_page(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    skip: int = 0,
+) -> List[Row]:
+    """
+    Get one page of the quiz list, newest first.
+    
+    Selects only the list columns. With a cursor (the `(created_at, id)` of
+    the last row of the previous page) the page is found by an index seek
+    on `ix_quizzes_created_at_id`, so deep pages cost the same as the first.
+    `skip` is kept for offset-based callers.
+    """
+    query = (
+        db.query(Quiz.id, Quiz.url, Quiz.title, Quiz.summary, Quiz.created_at)
+        .order_by(Quiz.created_at.desc(), Quiz.id.desc())
+    )
+    if cursor is not None:
+        query = query.filter(tuple_(Quiz.created_at, Quiz.id) < tuple_(*cursor))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def encode_cursor(row: Row) -> str:
+    """Encode the position after `row` as an opaque page cursor."""
+    raw = json.dumps([row.created_at.isoformat(), row.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
 
 
-def get_quizzes(db: Session, skip: int = 0, limit: int = 100) -> List[Quiz]:
-    """Get all quizzes."""
-    return db.query(Quiz).offset(skip).limit(limit).all()
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a page cursor produced by `encode_cursor`.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, quiz_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(quiz_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def count_quizzes(db: Session, approximate: bool = False) -> int:
+    """
+    Count quizzes.
+    
+    With `approximate` on PostgreSQL, reads the planner's row estimate
+    from pg_class instead of scanning the table.
+    """
+    if approximate and db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'quizzes'::regclass")
+        ).scalar()
+        if estimate is not None and estimate >= 0:  # -1 until first ANALYZE
+            return estimate
+    return db.query(func.count(Quiz.id)).scalar()
 
 
 def get_quiz_by_url(db: Session, url: str) -> Optional[Quiz]:
-    """Get a quiz by URL."""
-    return db.query(Quiz).filter(Quiz.url == url).first()
+    """
+    Get a quiz by URL with its questions (2 queries).
+    
+    Any spelling of the URL that canonicalizes to the stored one matches.
+    """
+    return (
+        db.query(Quiz)
+        .options(selectinload(Quiz.questions))
+        .filter(Quiz.url_hash == url_hash(url))
+        .first()
+    )
+
+
+def get_quiz_version(db: Session, quiz_id: int) -> Optional[Row]:
+    """Get `(id, created_at)` of a quiz, enough to build its ETag (1 query, no questions)."""
+    return db.query(Quiz.id, Quiz.created_at).filter(Quiz.id == quiz_id).first()
+
+
+def get_quiz_version_by_url(db: Session, url: str) -> Optional[Row]:
+    """Get `(id, created_at)` of the quiz for a URL (1 query, no questions)."""
+    return db.query(Quiz.id, Quiz.created_at).filter(Quiz.url_hash == url_hash(url)).first()
+
+
+def get_quiz_raw_html(db: Session, quiz_id: int) -> Optional[str]:
+    """Get the stored raw HTML of a quiz's article, decompressed."""
+    snapshot = (
+        db.query(ArticleSnapshot)
+        .filter(ArticleSnapshot.quiz_id == quiz_id)
+        .first()
+    )
+    if snapshot is None:
+        return None
+    return decompress_html(snapshot.html, snapshot.encoding)
 
 
 def delete_quiz(db: Session, quiz_id: int) -> bool:
-    """Delete a quiz by ID."""
+    """Delete a quiz by ID, with its index rows, and drop its cached response."""
     db_quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
     if db_quiz:
+        search.remove_quiz(db, quiz_id)
+        dedupe.remove_quiz_questions(db, quiz_id)
+        _remove_quiz_attempts(db, quiz_id)
         db.delete(db_quiz)
         db.commit()
+        quiz_responses.invalidate(quiz_id)
         return True
     return False
+
+
+def _remove_quiz_attempts(db: Session, quiz_id: int) -> None:
+    """Delete a quiz's attempts, answers and stats (SQLite doesn't enforce the cascades)."""
+    attempt_ids = db.query(QuizAttempt.id).filter(QuizAttempt.quiz_id == quiz_id).scalar_subquery()
+    db.query(AttemptAnswer).filter(AttemptAnswer.attempt_id.in_(attempt_ids)).delete(
+        synchronize_session=False
+    )
+    db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz_id).delete(synchronize_session=False)
+    db.query(QuestionStats).filter(QuestionStats.quiz_id == quiz_id).delete(synchronize_session=False)
+
+
+def get_answer_key(db: Session, quiz_id: int) -> Dict[int, str]:
+    """Map each question id of a quiz to its correct answer (1 query)."""
+    rows = db.query(Question.id, Question.answer).filter(Question.quiz_id == quiz_id).all()
+    return {row.id: row.answer for row in rows}
+
+
+def save_attempts(db: Session, attempts: List[Dict[str, Any]]) -> None:
+    """
+    Store a batch of graded attempts and fold them into `question_stats`.
+    
+    `attempts` are dictionaries with the `quiz_attempts` columns and an
+    `answers` list of `attempt_answers` rows (without `attempt_id`). On
+    PostgreSQL and SQLite the batch takes three statements and the commit,
+    whatever its size: one multi-row INSERT for the attempts, one for the
+    answers and one INSERT ... ON CONFLICT DO UPDATE that adds the batch's
+    counts to each question's running totals.
+    """
+    attempt_rows = [
+        {key: value for key, value in attempt.items() if key != "answers"}
+        for attempt in attempts
+    ]
+    answer_rows = [
+        dict(answer, attempt_id=attempt["id"])
+        for attempt in attempts for answer in attempt["answers"]
+    ]
+    
+    now = datetime.utcnow()
+    totals: Dict[int, Dict[str, Any]] = {}
+    for attempt in attempts:
+        for answer in attempt["answers"]:
+            row = totals.setdefault(answer["question_id"], {
+                "question_id": answer["question_id"],
+                "quiz_id": attempt["quiz_id"],
+                "answers": 0,
+                "correct": 0,
+                "timed_answers": 0,
+                "total_time_ms": 0,
+                "updated_at": now,
+            })
+            row["answers"] += 1
+            row["correct"] += int(answer["correct"])
+            if answer.get("time_ms") is not None:
+                row["timed_answers"] += 1
+                row["total_time_ms"] += answer["time_ms"]
+    
+    if attempt_rows:
+        db.execute(insert(QuizAttempt.__table__), attempt_rows)
+    if answer_rows:
+        db.execute(insert(AttemptAnswer.__table__), answer_rows)
+    dialect = db.get_bind().dialect.name
+    if totals and dialect in _UPSERT_DIALECTS:
+        statement = _UPSERT_DIALECTS[dialect](QuestionStats.__table__)
+        counters = ("answers", "correct", "timed_answers", "total_time_ms")
+        statement = statement.on_conflict_do_update(
+            index_elements=["question_id"],
+            set_={
+                **{name: QuestionStats.__table__.c[name] + statement.excluded[name] for name in counters},
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+        db.execute(statement, list(totals.values()))
+    elif totals:
+        _add_question_stats_orm(db, totals)
+    db.commit()
+
+
+def _add_question_stats_orm(db: Session, totals: Dict[int, Dict[str, Any]]) -> None:
+    """Read-modify-write fallback for databases without INSERT ... ON CONFLICT."""
+    existing = {
+        stats.question_id: stats
+        for stats in db.query(QuestionStats).filter(QuestionStats.question_id.in_(list(totals)))
+        .with_for_update()
+    }
+    for question_id, row in totals.items():
+        stats = existing.get(question_id)
+        if stats is None:
+            db.add(QuestionStats(**row))
+            continue
+        for name in ("answers", "correct", "timed_answers", "total_time_ms"):
+            setattr(stats, name, getattr(stats, name) + row[name])
+        stats.updated_at = row["updated_at"]
+
+
+def get_question_stats(db: Session, quiz_id: int) -> List[QuestionStats]:
+    """Running answer counts of a quiz's questions, from `question_stats` only (1 query)."""
+    return (
+        db.query(QuestionStats)
+        .filter(QuestionStats.quiz_id == quiz_id)
+        .order_by(QuestionStats.question_id)
+        .all()
+    )
+
+
+def create_job(
+    db: Session,
+    url: str,
+    status: str = "queued",
+    quiz_id: Optional[int] = None,
+) -> GenerationJob:
+    """Create a generation job."""
+    db_job = GenerationJob(id=str(uuid.uuid4()), url=url, status=status, quiz_id=quiz_id)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def create_jobs(
+    db: Session,
+    urls: List[str],
+    batch_id: str,
+    quiz_ids: Dict[str, int],
+) -> List[GenerationJob]:
+    """
+    Create the jobs of a bulk batch in one transaction.
+    
+    URLs found in `quiz_ids` (url -> existing quiz id) get jobs that are
+    succeeded from the start; the rest are queued.
+    """
+    db_jobs = [
+        GenerationJob(
+            id=str(uuid.uuid4()),
+            url=url,
+            batch_id=batch_id,
+            status="succeeded" if url in quiz_ids else "queued",
+            quiz_id=quiz_ids.get(url),
+        )
+        for url in urls
+    ]
+    db.add_all(db_jobs)
+    db.commit()
+    return db_jobs
+
+
+def get_quiz_ids_by_urls(db: Session, urls: List[str]) -> Dict[str, int]:
+    """Map each URL that already has a quiz to the quiz id (1 query)."""
+    hashes = {url_hash(url): url for url in urls}
+    rows = db.query(Quiz.id, Quiz.url_hash).filter(Quiz.url_hash.in_(list(hashes))).all()
+    return {hashes[row.url_hash]: row.id for row in rows}
+
+
+def get_batch_summary(db: Session, batch_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Progress of a bulk batch: job counts per status and throughput.
+    
+    Throughput is finished jobs per minute since the batch was created;
+    `updated_at` is the last status change of any of its jobs.
+    """
+    rows = (
+        db.query(
+            GenerationJob.status,
+            func.count(GenerationJob.id),
+            func.min(GenerationJob.created_at),
+            func.max(GenerationJob.updated_at),
+        )
+        .filter(GenerationJob.batch_id == batch_id)
+        .group_by(GenerationJob.status)
+        .all()
+    )
+    if not rows:
+        return None
+    counts = {status: 0 for status in ("queued", "running", "succeeded", "failed")}
+    counts.update({status: count for status, count, _, _ in rows})
+    started = min(row[2] for row in rows)
+    finished = counts["succeeded"] + counts["failed"]
+    if counts["queued"] or counts["running"]:
+        end = datetime.utcnow()
+    else:
+        end = max(row[3] for row in rows)
+    minutes = max((end - started).total_seconds(), 1) / 60
+    return {
+        "batch_id": batch_id,
+        "total": sum(counts.values()),
+        **counts,
+        "created_at": started,
+        "updated_at": max(row[3] for row in rows),
+        "articles_per_minute": round(finished / minutes, 2),
+    }
+
+
+def get_job(db: Session, job_id: str) -> Optional[GenerationJob]:
+    """Get a generation job by ID."""
+    return db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+
+
+def claim_job(db: Session, job_id: str) -> bool:
+    """
+    Atomically move a queued job to running.
+    
+    Returns False if another worker claimed it first.
+    """
+    claimed = (
+        db.query(GenerationJob)
+        .filter(GenerationJob.id == job_id, GenerationJob.status == "queued")
+        .update({"status": "running"}, synchronize_session=False)
+    )
+    db.commit()
+    return claimed == 1
+
+
+def update_job(db: Session, job_id: str, **fields: Any) -> Optional[GenerationJob]:
+    """Update fields of a generation job."""
+    db_job = get_job(db, job_id)
+    if db_job:
+        for key, value in fields.items():
+            setattr(db_job, key, value)
+        db.commit()
+        db.refresh(db_job)
+    return db_job
+
+
+def requeue_unfinished_jobs(db: Session, stale_before: datetime) -> List[GenerationJob]:
+    """
+    Get jobs to resume after a restart.
+    
+    Running jobs not updated since `stale_before` belonged to a worker that
+    died; they are reset to queued.
+    """
+    (
+        db.query(GenerationJob)
+        .filter(GenerationJob.status == "running", GenerationJob.updated_at < stale_before)
+        .update({"status": "queued", "stage": None}, synchronize_session=False)
+    )
+    db.commit()
+    return (
+        db.query(GenerationJob)
+        .filter(GenerationJob.status == "queued")
+        .order_by(GenerationJob.created_at)
+        .all()
+    )
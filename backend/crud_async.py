@@ -0,0 +1,141 @@
+"""
+Async versions of the CRUD operations, for request handlers.
+
+Each function runs its `crud` (or `search`) counterpart on the session
+given by `database.get_async_db`. On an AsyncSession, `run_sync` runs the
+same queries through the async driver: waiting on the database suspends
+the calling coroutine instead of blocking the event loop. Queries, query
+counts and results are those of the sync functions.
+"""
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Quiz, GenerationJob, QuestionStats
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+import crud
+import search
+
+
+async def create_quiz(db: AsyncSession, **fields: Any) -> Quiz:
+    """See `crud.create_quiz`."""
+    return await db.run_sync(crud.create_quiz, **fields)
+
+
+async def get_quiz(db: AsyncSession, quiz_id: int) -> Optional[Quiz]:
+    """Get a quiz by ID with its questions (2 queries)."""
+    return await db.run_sync(crud.get_quiz, quiz_id)
+
+
+async def get_quiz_page(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    skip: int = 0,
+) -> List[Row]:
+    """One page of the quiz list, newest first; see `crud.get_quiz_page`."""
+    return await db.run_sync(crud.get_quiz_page, limit, cursor, skip)
+
+
+async def count_quizzes(db: AsyncSession, approximate: bool = False) -> int:
+    """Count quizzes; see `crud.count_quizzes`."""
+    return await db.run_sync(crud.count_quizzes, approximate)
+
+
+async def get_quiz_by_url(db: AsyncSession, url: str) -> Optional[Quiz]:
+    """Get a quiz by URL with its questions (2 queries)."""
+    return await db.run_sync(crud.get_quiz_by_url, url)
+
+
+async def get_quiz_version(db: AsyncSession, quiz_id: int) -> Optional[Row]:
+    """Get `(id, created_at)` of a quiz (1 query, no questions)."""
+    return await db.run_sync(crud.get_quiz_version, quiz_id)
+
+
+async def get_quiz_version_by_url(db: AsyncSession, url: str) -> Optional[Row]:
+    """Get `(id, created_at)` of the quiz for a URL (1 query, no questions)."""
+    return await db.run_sync(crud.get_quiz_version_by_url, url)
+
+
+async def get_quiz_raw_html(db: AsyncSession, quiz_id: int) -> Optional[str]:
+    """Get the stored raw HTML of a quiz's article, decompressed."""
+    return await db.run_sync(crud.get_quiz_raw_html, quiz_id)
+
+
+async def delete_quiz(db: AsyncSession, quiz_id: int) -> bool:
+    """Delete a quiz by ID; see `crud.delete_quiz`."""
+    return await db.run_sync(crud.delete_quiz, quiz_id)
+
+
+async def get_answer_key(db: AsyncSession, quiz_id: int) -> Dict[int, str]:
+    """Map each question id of a quiz to its correct answer (1 query)."""
+    return await db.run_sync(crud.get_answer_key, quiz_id)
+
+
+async def save_attempts(db: AsyncSession, attempts: List[Dict[str, Any]]) -> None:
+    """Store a batch of graded attempts; see `crud.save_attempts`."""
+    await db.run_sync(crud.save_attempts, attempts)
+
+
+async def get_question_stats(db: AsyncSession, quiz_id: int) -> List[QuestionStats]:
+    """Running answer totals of a quiz's questions (1 query)."""
+    return await db.run_sync(crud.get_question_stats, quiz_id)
+
+
+async def get_batch_summary(db: AsyncSession, batch_id: str) -> Optional[Dict[str, Any]]:
+    """Job counts and throughput of a bulk batch; see `crud.get_batch_summary`."""
+    return await db.run_sync(crud.get_batch_summary, batch_id)
+
+
+async def create_job(
+    db: AsyncSession,
+    url: str,
+    status: str = "queued",
+    quiz_id: Optional[int] = None,
+) -> GenerationJob:
+    """Create a generation job."""
+    return await db.run_sync(crud.create_job, url, status, quiz_id)
+
+
+async def create_jobs(
+    db: AsyncSession,
+    urls: List[str],
+    batch_id: str,
+    quiz_ids: Dict[str, int],
+) -> List[GenerationJob]:
+    """Create the jobs of a bulk batch in one transaction; see `crud.create_jobs`."""
+    return await db.run_sync(crud.create_jobs, urls, batch_id, quiz_ids)
+
+
+async def get_quiz_ids_by_urls(db: AsyncSession, urls: List[str]) -> Dict[str, int]:
+    """Map each URL that already has a quiz to the quiz id (1 query)."""
+    return await db.run_sync(crud.get_quiz_ids_by_urls, urls)
+
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[GenerationJob]:
+    """Get a generation job by ID."""
+    return await db.run_sync(crud.get_job, job_id)
+
+
+async def claim_job(db: AsyncSession, job_id: str) -> bool:
+    """Atomically move a queued job to running; see `crud.claim_job`."""
+    return await db.run_sync(crud.claim_job, job_id)
+
+
+async def update_job(db: AsyncSession, job_id: str, **fields: Any) -> Optional[GenerationJob]:
+    """Update fields of a generation job."""
+    return await db.run_sync(crud.update_job, job_id, **fields)
+
+
+async def requeue_unfinished_jobs(db: AsyncSession, stale_before: datetime) -> List[GenerationJob]:
+    """Get jobs to resume after a restart; see `crud.requeue_unfinished_jobs`."""
+    return await db.run_sync(crud.requeue_unfinished_jobs, stale_before)
+
+
+async def search_quizzes(db: AsyncSession, query: str, limit: int = 20, skip: int = 0) -> List[Dict[str, Any]]:
+    """
+    Quizzes matching every word of `query`; see `search.search_quizzes`.
+
+    Raises:
+        ValueError: If the query has no searchable words
+    """
+    return await db.run_sync(search.search_quizzes, query, limit, skip)
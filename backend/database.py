@@ -1,21 +1,130 @@
 """
 Database setup and connection management.
+
+Request handlers use the async engine (`get_async_db`), so a slow query
+suspends its request instead of blocking the event loop: asyncpg for
+PostgreSQL, aiosqlite for SQLite. Without the driver installed (or with
+ASYNC_DATABASE off) they get a sync session whose work runs in a worker
+thread instead. Scripts, job workers and the write-behind buffer use the
+sync engine (`SessionLocal`).
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import importlib.util
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from config import settings
+import metrics
+
+# Async driver per database backend
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class _TimedCheckout:
+    """Records how long each checkout waits for a connection."""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_wait_seconds.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits for a connection."""
+
+
+def _pool_class(database_url):
+    """The dialect's default pool class, timed if it is a QueuePool."""
+    url = make_url(database_url)
+    pool_class = url.get_dialect().get_pool_class(url)
+    if pool_class is AsyncAdaptedQueuePool:
+        return TimedAsyncQueuePool
+    return TimedQueuePool if pool_class is QueuePool else pool_class
+
+
+def async_database_url(database_url: str) -> Optional[URL]:
+    """
+    DATABASE_URL with its backend's async driver, or None if the backend
+    has none or it isn't installed.
+    """
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or importlib.util.find_spec(driver) is None:
+        return None
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+def _engine_options(database_url) -> Dict[str, Any]:
+    """Engine arguments for `database_url`, with the pool settings from config."""
+    pool_class = _pool_class(database_url)
+    options = {
+        "echo": settings.DEBUG,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "poolclass": pool_class,
+    }
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+
+# Create session factory. Objects stay loaded after commit so a freshly
+# created quiz can be serialized without re-reading it.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Optional read replica for list and detail reads
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(settings.DATABASE_READ_URL, **_engine_options(settings.DATABASE_READ_URL))
+    ReadSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine,
+        info={"replica": True},
+    )
+else:
+    read_engine = None
+    ReadSessionLocal = None
+
+# Async engines for request handlers, if the driver is installed
+_async_url = async_database_url(settings.DATABASE_URL) if settings.ASYNC_DATABASE else None
+ASYNC_DATABASE_AVAILABLE = _async_url is not None
+async_engine = async_read_engine = None
+AsyncSessionLocal = AsyncReadSessionLocal = None
+if ASYNC_DATABASE_AVAILABLE:
+    async_engine = create_async_engine(_async_url, **_engine_options(_async_url))
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+    _async_read_url = async_database_url(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else None
+    if _async_read_url is not None:
+        async_read_engine = create_async_engine(_async_read_url, **_engine_options(_async_read_url))
+        AsyncReadSessionLocal = async_sessionmaker(
+            async_read_engine, autoflush=False, expire_on_commit=False, info={"replica": True}
+        )
+
+# Set when a client creates a quiz or sees one of its jobs finish; reads
+# from its holder go to the primary until the time (Unix seconds) it carries
+READ_YOUR_WRITES_COOKIE = "wq_read_primary"
 
 # Create base class for models
 Base = declarative_base()
@@ -30,6 +139,133 @@ def get_db():
         db.close()
 
 
+class ThreadedSession:
+    """
+    A sync Session behind the part of AsyncSession's interface that
+    `crud_async` uses; its work runs in a worker thread, one call at a time.
+    
+    Used when no async driver is available.
+    """
+    
+    def __init__(self, session: Session):
+        self.sync_session = session
+    
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self.sync_session.info
+    
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+    
+    async def close(self) -> None:
+        await asyncio.to_thread(self.sync_session.close)
+
+
+@asynccontextmanager
+async def async_session(replica: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    An async session on the primary, or on the read replica if `replica`
+    and one is configured. `session.info["replica"]` tells which.
+    """
+    if replica and ReadSessionLocal is not None:
+        async_factory, sync_factory = AsyncReadSessionLocal, ReadSessionLocal
+    else:
+        async_factory, sync_factory = AsyncSessionLocal, SessionLocal
+    if async_factory is not None:
+        async with async_factory() as db:
+            yield db
+    else:
+        # No async driver for this database
+        db = ThreadedSession(sync_factory())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+async def get_async_db():
+    """Get an async database session for dependency injection."""
+    async with async_session() as db:
+        yield db
+
+
+def reads_from_primary(cookies: Mapping[str, str]) -> bool:
+    """Whether the read-your-writes cookie is still in effect."""
+    try:
+        return float(cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_your_writes_until(written_at: Optional[datetime] = None, pending: float = 0) -> float:
+    """
+    Unix time until which reads of a client go to the primary, for a quiz
+    written at `written_at` (naive UTC, default now) or still being written
+    for up to `pending` seconds.
+    """
+    written = time.time() if written_at is None else written_at.replace(tzinfo=timezone.utc).timestamp()
+    return written + pending + settings.READ_YOUR_WRITES_SECONDS
+
+
+async def get_async_read_db(request: Request):
+    """
+    Get an async session for reads that tolerate replica lag.
+    
+    Uses the read replica (DATABASE_READ_URL) if there is one, except for
+    clients that created a quiz in the last READ_YOUR_WRITES_SECONDS, so
+    they see their own writes.
+    """
+    async with async_session(replica=not reads_from_primary(request.cookies)) as db:
+        yield db
+
+
 def init_db():
     """Initialize database with all tables."""
     Base.metadata.create_all(bind=engine)
+
+
+@metrics.registry.collector("wikiquiz_db_pool_connections", "Connections of the database pools by state.")
+def _pool_metrics():
+    engines = [("sync", engine), ("async", async_engine), ("read", read_engine), ("async_read", async_read_engine)]
+    samples = []
+    for name, bind in engines:
+        pool = bind.pool if bind is not None else None
+        if not isinstance(pool, QueuePool):
+            continue
+        samples += [
+            ({"engine": name, "state": "checked_out"}, pool.checkedout()),
+            ({"engine": name, "state": "idle"}, pool.checkedin()),
+            ({"engine": name, "state": "overflow"}, max(pool.overflow(), 0)),
+        ]
+    return samples
+
+
+class QueryCounter:
+    """SQL statements recorded by `count_queries`."""
+    
+    def __init__(self):
+        self.statements: List[str] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(bind: Engine = engine):
+    """
+    Record every SQL statement sent to the database inside the block.
+    
+    Used to pin the number of queries per read path so N+1 patterns
+    show up as a failing count.
+    """
+    counter = QueryCounter()
+    
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+    
+    event.listen(bind, "before_cursor_execute", _record)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", _record)
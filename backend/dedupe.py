@@ -0,0 +1,209 @@
+"""
+Near-duplicate question detection with MinHash and LSH.
+
+Overlapping articles (a person and the events they took part in) produce
+paraphrases of the same question. Each question gets a MinHash signature
+of its content words and answer, so the Jaccard similarity of two
+questions can be estimated from the signatures alone. The signature is
+cut into BANDS bands; every band is hashed to a bucket and stored in
+`question_lsh_bands`. Questions similar enough to matter share a bucket
+in at least one band with high probability, so candidates come from an
+index lookup instead of a pairwise scan:
+
+- `crud.create_quiz` looks up the new questions' buckets and sets
+  `duplicate_of` on questions that nearly duplicate a stored one or an
+  earlier question of the same quiz
+- `dedupe_questions.py` signs questions stored before this existed and
+  clusters the whole table from bucket collisions, in linear time
+"""
+import hashlib
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import Question, QuestionBand
+from summarizer import STOPWORDS
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity from which a question counts as a duplicate.
+# With 16 bands of 4 rows, pairs at 0.7 share a bucket 99% of the time.
+DUPLICATE_THRESHOLD = 0.7
+
+_PRIME = (1 << 31) - 1
+# Fixed, so signatures stay comparable across processes and releases
+_rng = np.random.default_rng(31)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_TERM = re.compile(r"\w+")
+# Words every question form shares; they say nothing about the content
+_QUESTION_WORDS = {"what", "which", "who", "whom", "whose", "when", "where", "why", "how", "did", "does"}
+
+Band = Tuple[int, int]  # (band number, bucket)
+
+
+def _normalize(word: str) -> str:
+    # Crude plural folding, enough for "cipher"/"ciphers"
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def shingles(question: str, answer: str) -> Set[str]:
+    """Content words of the question, and of the answer (prefixed)."""
+    words = {
+        _normalize(w) for w in _TERM.findall(question.lower())
+        if w not in STOPWORDS and w not in _QUESTION_WORDS
+    }
+    words.update(f"a:{_normalize(w)}" for w in _TERM.findall(answer.lower()) if w not in STOPWORDS)
+    return words
+
+
+def signature(question: str, answer: str) -> Optional[bytes]:
+    """MinHash signature (NUM_PERM uint32 values), or None for a question without content words."""
+    features = shingles(question, answer)
+    if not features:
+        return None
+    x = np.array([zlib.crc32(f.encode("utf-8")) % _PRIME for f in features], dtype=np.uint64)
+    hashes = (np.outer(x, _A) + _B) % _PRIME
+    return hashes.min(axis=0).astype(np.uint32).tobytes()
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures' shingle sets."""
+    return float(np.mean(np.frombuffer(a, dtype=np.uint32) == np.frombuffer(b, dtype=np.uint32)))
+
+
+def bands(minhash: bytes) -> List[Band]:
+    """(band, bucket) keys of a signature, the bucket a signed 64-bit hash of the band."""
+    size = ROWS * 4
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(minhash[band * size:(band + 1) * size], digest_size=8).digest(),
+            "big", signed=True,
+        ))
+        for band in range(BANDS)
+    ]
+
+
+def flag_duplicates(db: Session, rows: Sequence[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """
+    Set `duplicate_of` on new question rows (with `minhash`) that nearly
+    duplicate a stored question or an earlier row (1 query).
+
+    A row is pointed at the most similar stored question, or at the
+    question that one duplicates, so flags always point at the first
+    occurrence. Each row's bands join the candidate buckets once it has
+    been checked, so later rows of the same quiz are compared with it
+    without another query. A row whose first occurrence is an earlier
+    row that isn't stored yet can't be pointed at it before the insert
+    assigns ids; it is returned as a (row index, earlier row index) pair
+    for `link_duplicates`.
+    """
+    keys = {key for row in rows if row.get("minhash") for key in bands(row["minhash"])}
+    if not keys:
+        return []
+    # Stored questions are (question id, duplicate_of, minhash); rows of this
+    # batch are (-1 - row index, None, minhash), so the two can't collide
+    candidates: Dict[Band, List[Tuple[int, Optional[int], bytes]]] = {}
+    for band, bucket, question_id, duplicate_of, minhash in db.execute(
+        select(
+            QuestionBand.band, QuestionBand.bucket, Question.id, Question.duplicate_of, Question.minhash,
+        )
+        .join(Question, Question.id == QuestionBand.question_id)
+        .where(QuestionBand.bucket.in_({bucket for _, bucket in keys}))
+    ):
+        candidates.setdefault((band, bucket), []).append((question_id, duplicate_of, minhash))
+
+    pending: List[Tuple[int, int]] = []
+    for index, row in enumerate(rows):
+        if not row.get("minhash"):
+            continue
+        row_bands = bands(row["minhash"])
+        best = None
+        for key in row_bands:
+            for question_id, duplicate_of, minhash in candidates.get(key, ()):
+                score = similarity(row["minhash"], minhash)
+                if score < DUPLICATE_THRESHOLD:
+                    continue
+                # Ties go to stored questions, then to the oldest
+                rank = (score, question_id > 0, -abs(question_id))
+                if best is None or rank > best[0]:
+                    best = (rank, question_id, duplicate_of)
+        if best is not None:
+            _, question_id, duplicate_of = best
+            if question_id > 0:
+                row["duplicate_of"] = duplicate_of or question_id
+            else:
+                earlier = -1 - question_id
+                if rows[earlier]["duplicate_of"] is not None:
+                    row["duplicate_of"] = rows[earlier]["duplicate_of"]
+                else:
+                    pending.append((index, earlier))
+        for key in row_bands:
+            candidates.setdefault(key, []).append((-1 - index, None, row["minhash"]))
+    return pending
+
+
+def link_duplicates(
+    db: Session,
+    question_ids: Sequence[int],
+    rows: Sequence[Dict[str, Any]],
+    pending: Sequence[Tuple[int, int]],
+) -> None:
+    """
+    Point inserted questions at earlier questions of the same batch
+    (`flag_duplicates`' pairs of row indexes) and set `duplicate_of` on
+    their rows to match, in the caller's transaction (1 statement, none
+    when there are no pairs).
+    """
+    if not pending:
+        return
+    for index, earlier in pending:
+        rows[index]["duplicate_of"] = question_ids[earlier]
+    db.execute(
+        update(Question.__table__)
+        .where(Question.__table__.c.id == bindparam("question_id"))
+        .values(duplicate_of=bindparam("canonical_id")),
+        [
+            {"question_id": question_ids[index], "canonical_id": rows[index]["duplicate_of"]}
+            for index, _ in pending
+        ],
+    )
+
+
+def band_rows(question_ids: Iterable[int], minhashes: Iterable[Optional[bytes]]) -> List[Dict[str, int]]:
+    """Rows of `question_lsh_bands` for the given questions."""
+    return [
+        {"band": band, "bucket": bucket, "question_id": question_id}
+        for question_id, minhash in zip(question_ids, minhashes)
+        if minhash
+        for band, bucket in bands(minhash)
+    ]
+
+
+def index_questions(db: Session, question_ids: Sequence[int], rows: Sequence[Dict[str, Any]]) -> None:
+    """Add new questions to the band index (1 statement), in the caller's transaction."""
+    band_index = band_rows(question_ids, (row.get("minhash") for row in rows))
+    if band_index:
+        db.execute(insert(QuestionBand.__table__), band_index)
+
+
+def remove_quiz_questions(db: Session, quiz_id: int) -> None:
+    """
+    Drop a quiz's questions from the band index and clear flags pointing
+    at them, in the caller's transaction (SQLite doesn't enforce the
+    foreign keys that would do this).
+    """
+    question_ids = select(Question.id).where(Question.quiz_id == quiz_id).scalar_subquery()
+    db.execute(
+        update(Question).where(Question.duplicate_of.in_(question_ids)).values(duplicate_of=None),
+        execution_options={"synchronize_session": False},
+    )
+    db.query(QuestionBand).filter(QuestionBand.question_id.in_(question_ids)).delete(
+        synchronize_session=False
+    )
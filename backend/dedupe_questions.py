@@ -0,0 +1,206 @@
+"""
+Offline near-duplicate detection over the whole questions table.
+
+1. Signs questions that have no MinHash signature yet (stored before
+   dedupe.py existed, or written through the ORM path) and adds them to
+   the LSH band index.
+2. Reads the buckets that hold more than one question, compares each
+   bucket's questions with its first one and joins the similar ones into
+   clusters (union-find). The work is linear in the number of questions;
+   no pair of questions is compared unless they share a bucket.
+3. Reports the clusters, largest first. With --apply, every question in a
+   cluster is flagged as a duplicate of the cluster's oldest question.
+
+Usage:
+    python dedupe_questions.py
+    python dedupe_questions.py --report clusters.json --apply
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import bindparam, insert, select, text, update  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from database import engine, init_db  # noqa: E402
+from models import Question, QuestionBand  # noqa: E402
+import dedupe  # noqa: E402
+
+BATCH_SIZE = 1000
+SHOW_CLUSTERS = 10
+
+
+class UnionFind:
+    """Disjoint sets of question ids; the root of a set is its smallest id."""
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # Path halving
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def clusters(self) -> List[List[int]]:
+        groups: Dict[int, List[int]] = {}
+        for x in self.parent:
+            groups.setdefault(self.find(x), []).append(x)
+        return [sorted(ids) for ids in groups.values() if len(ids) > 1]
+
+
+def sign_missing(engine: Engine, batch_size: int = BATCH_SIZE) -> int:
+    """Sign and band-index questions without a signature; returns how many were signed."""
+    signed = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(Question.id, Question.question, Question.answer)
+                .where(Question.id > last_id, Question.minhash.is_(None))
+                .order_by(Question.id)
+                .limit(batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for question_id, question, answer in rows:
+                minhash = dedupe.signature(question, answer)
+                if minhash is not None:
+                    updates.append({"question_id": question_id, "signature": minhash})
+            if updates:
+                conn.execute(
+                    update(Question.__table__)
+                    .where(Question.__table__.c.id == bindparam("question_id"))
+                    .values(minhash=bindparam("signature")),
+                    updates,
+                )
+                conn.execute(
+                    insert(QuestionBand.__table__),
+                    dedupe.band_rows(
+                        [u["question_id"] for u in updates], [u["signature"] for u in updates]
+                    ),
+                )
+        signed += len(updates)
+        last_id = rows[-1].id
+    return signed
+
+
+def _buckets(engine: Engine) -> Iterator[List[Tuple[int, bytes]]]:
+    """(question id, signature) of every bucket holding more than one question."""
+    query = text(
+        "SELECT b.band, b.bucket, q.id, q.minhash "
+        "FROM question_lsh_bands b JOIN questions q ON q.id = b.question_id "
+        "WHERE (b.band, b.bucket) IN ("
+        "  SELECT band, bucket FROM question_lsh_bands GROUP BY band, bucket HAVING COUNT(*) > 1"
+        ") ORDER BY b.band, b.bucket, q.id"
+    )
+    with engine.connect() as conn:
+        key = None
+        members: List[Tuple[int, bytes]] = []
+        for band, bucket, question_id, minhash in conn.execution_options(stream_results=True).execute(query):
+            if (band, bucket) != key:
+                if len(members) > 1:
+                    yield members
+                key, members = (band, bucket), []
+            members.append((question_id, minhash))
+        if len(members) > 1:
+            yield members
+
+
+def find_clusters(engine: Engine) -> Tuple[List[List[int]], int]:
+    """Clusters of near-duplicate question ids, and the number of comparisons made."""
+    sets = UnionFind()
+    comparisons = 0
+    for members in _buckets(engine):
+        first_id, first = members[0]
+        for question_id, minhash in members[1:]:
+            comparisons += 1
+            if dedupe.similarity(first, minhash) >= dedupe.DUPLICATE_THRESHOLD:
+                sets.union(first_id, question_id)
+    return sets.clusters(), comparisons
+
+
+def _texts(engine: Engine, ids: List[int]) -> Dict[int, Tuple[int, str]]:
+    """question id -> (quiz id, question text)"""
+    texts = {}
+    with engine.connect() as conn:
+        for start in range(0, len(ids), BATCH_SIZE):
+            rows = conn.execute(
+                select(Question.id, Question.quiz_id, Question.question)
+                .where(Question.id.in_(ids[start:start + BATCH_SIZE]))
+            )
+            texts.update({row.id: (row.quiz_id, row.question) for row in rows})
+    return texts
+
+
+def apply_flags(engine: Engine, clusters: List[List[int]]) -> int:
+    """Flag every clustered question as a duplicate of its cluster's oldest one."""
+    updates = [
+        {"question_id": question_id, "canonical_id": ids[0]}
+        for ids in clusters for question_id in ids[1:]
+    ]
+    with engine.begin() as conn:
+        for start in range(0, len(updates), BATCH_SIZE):
+            conn.execute(
+                update(Question.__table__)
+                .where(Question.__table__.c.id == bindparam("question_id"))
+                .values(duplicate_of=bindparam("canonical_id")),
+                updates[start:start + BATCH_SIZE],
+            )
+    return len(updates)
+
+
+def main(args) -> int:
+    init_db()
+    start = time.monotonic()
+    signed = sign_missing(engine)
+    print(f"Signed {signed} questions")
+
+    clusters, comparisons = find_clusters(engine)
+    clusters.sort(key=lambda ids: (-len(ids), ids[0]))
+    duplicates = sum(len(ids) - 1 for ids in clusters)
+    print(f"{len(clusters)} clusters, {duplicates} duplicate questions "
+          f"({comparisons} comparisons, {time.monotonic() - start:.1f}s)")
+
+    shown = clusters if args.report else clusters[:SHOW_CLUSTERS]
+    texts = _texts(engine, [question_id for ids in shown for question_id in ids])
+    for ids in clusters[:SHOW_CLUSTERS]:
+        print(f"  {len(ids)} questions, e.g. #{ids[0]}: {texts[ids[0]][1][:100]}")
+    if args.report:
+        report = [
+            {
+                "canonical_id": ids[0],
+                "questions": [
+                    {"id": i, "quiz_id": texts[i][0], "question": texts[i][1]} for i in ids
+                ],
+            }
+            for ids in clusters
+        ]
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.report}")
+    if args.apply:
+        print(f"Flagged {apply_flags(engine, clusters)} questions as duplicates")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--report", type=Path, default=None,
+                        help="Write all clusters, with question texts, to this JSON file")
+    parser.add_argument("--apply", action="store_true",
+                        help="Set duplicate_of on the clustered questions")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,319 @@
+"""
+Key entities (people, organizations, locations) of an article, without
+the LLM.
+
+The page already carries typed signals, so the extractor builds a
+gazetteer from them:
+
+- infobox rows: the label types the linked values ("Born" -> location,
+  "Alma mater" -> organization, "Doctoral advisor" -> person)
+- categories: "People from X" -> location, "Alumni of X" -> organization
+- article links: typed by the linked title ("Cambridge, Massachusetts",
+  "Smith (physicist)"), its words ("... University", "... River") and how
+  the text mentions it ("in Warsaw")
+
+Every surface form of an entry (link text and linked title) goes into a
+word-level Aho-Corasick automaton, which finds all mentions in a single
+pass over the article. Entities are ranked by mentions, with a bonus for
+infobox and category entries.
+"""
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAX_PER_TYPE = 8
+INFOBOX_BONUS = 3
+CATEGORY_BONUS = 2
+
+ORGANIZATION_WORDS = {
+    "academy", "agency", "army", "association", "bank", "board", "church", "club",
+    "college", "commission", "committee", "company", "corporation", "council",
+    "court", "department", "force", "foundation", "government", "group",
+    "institute", "institution", "laboratory", "league", "ministry", "museum", "navy",
+    "office", "parliament", "party", "press", "railway", "railways", "school",
+    "service", "society", "team", "union", "university",
+}
+EVENT_WORDS = {
+    "award", "battle", "championship", "election", "games", "olympics", "prize",
+    "revolution", "treaty", "war",
+}
+PLACE_WORDS = {
+    "bay", "city", "coast", "county", "island", "islands", "kingdom", "lake",
+    "mountain", "mountains", "ocean", "province", "region", "republic", "river",
+    "sea", "state", "street", "valley",
+}
+PLACE_PREPOSITIONS = {"in", "at", "from", "near", "to", "into", "across"}
+# Lowercase words allowed inside a person's name ("John von Neumann")
+NAME_PARTICLES = {"de", "da", "di", "del", "von", "van", "der", "du", "la", "le", "bin", "ibn"}
+
+PERSON, ORGANIZATION, LOCATION = "people", "organizations", "locations"
+
+# Infobox label (lowercase) -> type of the entities linked in its value
+INFOBOX_LABELS = {
+    **dict.fromkeys([
+        "born", "died", "birth place", "place of birth", "death place",
+        "place of death", "resting place", "citizenship", "country", "location",
+        "headquarters", "capital", "largest city", "region", "state", "city",
+        "residence",
+    ], LOCATION),
+    **dict.fromkeys([
+        "alma mater", "education", "institutions", "institution", "employer",
+        "organization", "organisation", "party", "political party", "affiliation",
+        "affiliations", "developer", "developers", "owner", "parent", "publisher",
+        "label", "labels", "team", "club", "manufacturer",
+    ], ORGANIZATION),
+    **dict.fromkeys([
+        "spouse", "spouses", "partner", "children", "parents", "relatives",
+        "doctoral advisor", "doctoral advisors", "academic advisors",
+        "other academic advisors", "doctoral students", "notable students",
+        "influences", "influenced", "founder", "founders", "founded by",
+        "designed by", "designer", "key people", "leader", "president", "monarch",
+        "preceded by", "succeeded by", "predecessor", "successor",
+    ], PERSON),
+}
+
+# Category name patterns; group 1 is the entity
+CATEGORY_PATTERNS = [
+    (re.compile(r"^People from (?:the )?(.+)$"), LOCATION),
+    (re.compile(r"^Burials at (?:the )?(.+)$"), LOCATION),
+    (re.compile(r"^\w+ (?:emigrants|expatriates|people) (?:to|in) (?:the )?(.+)$"), LOCATION),
+    (re.compile(r"^(?:Alumni|Fellows|Members|Academics|Employees|Presidents) of (?:the )?(.+)$"), ORGANIZATION),
+    (re.compile(r"^(.+) (?:alumni|faculty)$"), ORGANIZATION),
+]
+
+# Disambiguation in a linked title: "Georgia (country)", "John Smith (physicist)"
+_QUALIFIER = re.compile(r"^(.*?)\s*\(([^)]*)\)$")
+_QUALIFIER_TYPES = {
+    **dict.fromkeys([
+        "city", "town", "village", "country", "state", "province", "region",
+        "county", "river", "island", "mountain", "district", "borough",
+    ], LOCATION),
+    **dict.fromkeys([
+        "company", "band", "organization", "organisation", "party", "university",
+        "college", "club", "publisher",
+    ], ORGANIZATION),
+    **dict.fromkeys([
+        "mathematician", "physicist", "chemist", "scientist", "philosopher",
+        "politician", "writer", "author", "poet", "composer", "musician", "singer",
+        "actor", "actress", "artist", "painter", "engineer", "economist",
+        "footballer", "cricketer", "general", "king", "queen", "emperor", "saint",
+    ], PERSON),
+}
+_WORD = re.compile(r"\w+(?:['’]\w+)*")
+
+
+def _words(text: str) -> Tuple[str, ...]:
+    return tuple(w.lower() for w in _WORD.findall(text))
+
+
+class AhoCorasick:
+    """
+    Word-level Aho-Corasick automaton.
+
+    Patterns are sequences of lowercase words; `find` reports every
+    occurrence of every pattern in one pass over the text's words.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[Tuple[str, ...], Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (pattern length, value) of the patterns ending at each state
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        for words, value in patterns:
+            if words:
+                self._add(words, value)
+        self._link()
+
+    def _add(self, words: Tuple[str, ...], value: Any) -> None:
+        state = 0
+        for word in words:
+            following = self._goto[state].get(word)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][word] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = following
+        self._output[state].append((len(words), value))
+
+    def _link(self) -> None:
+        """Breadth-first pass setting failure links and merging outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[following] = target if target != following else 0
+                self._output[following] = self._output[following] + self._output[self._fail[following]]
+
+    def find(self, words: Sequence[str]) -> List[Tuple[int, int, Any]]:
+        """(start, end, value) of every match, word indexes, end exclusive."""
+        matches = []
+        state = 0
+        for i, word in enumerate(words):
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+            for length, value in self._output[state]:
+                matches.append((i + 1 - length, i + 1, value))
+        return matches
+
+
+def longest_matches(matches: List[Tuple[int, int, Any]]) -> List[Tuple[int, int, Any]]:
+    """Leftmost-longest matches that don't overlap, in text order."""
+    chosen = []
+    end = 0
+    for start, stop, value in sorted(matches, key=lambda m: (m[0], -m[1])):
+        if start >= end:
+            chosen.append((start, stop, value))
+            end = stop
+    return chosen
+
+
+class _Entry:
+    __slots__ = ("name", "key", "type", "bonus", "forms", "mentions", "first", "after_preposition")
+
+    def __init__(self, name: str, key: Tuple[str, ...]):
+        self.name = name
+        self.key = key
+        self.type: Optional[str] = None
+        self.bonus = 0
+        self.forms = {key}
+        self.mentions = 0
+        self.first = float("inf")
+        self.after_preposition = 0
+
+
+def _strip_qualifier(title: str) -> Tuple[str, str]:
+    """("John Smith", "physicist") for "John Smith (physicist)"."""
+    match = _QUALIFIER.match(title)
+    if match:
+        return match.group(1), match.group(2).lower()
+    return title, ""
+
+
+def _type_from_name(name: str, qualifier: str) -> Optional[str]:
+    """Type implied by a linked title alone, if any."""
+    if qualifier:
+        for word in _words(qualifier):
+            if word in _QUALIFIER_TYPES:
+                return _QUALIFIER_TYPES[word]
+    words = _words(name)
+    if any(w in ORGANIZATION_WORDS for w in words):
+        return ORGANIZATION
+    if any(w in EVENT_WORDS for w in words):
+        return "event"
+    if (words and words[-1] in PLACE_WORDS) or ", " in name:
+        return LOCATION
+    return None
+
+
+def _looks_like_person(surface: str) -> bool:
+    """Two to four capitalized words, allowing particles ("Guido van Rossum")."""
+    words = surface.split()
+    if not 2 <= len(words) <= 4 or not words[0][:1].isupper() or not words[-1][:1].isupper():
+        return False
+    return all(w[:1].isupper() or w in NAME_PARTICLES for w in words)
+
+
+class _Gazetteer:
+    def __init__(self, title: str):
+        self.title = _words(_strip_qualifier(title)[0])
+        self.entries: Dict[Tuple[str, ...], _Entry] = {}
+
+    def entry(self, name: str) -> Optional[_Entry]:
+        name, qualifier = _strip_qualifier(name.strip())
+        key = _words(name)
+        if not key or key == self.title:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = _Entry(name, key)
+            entry.type = _type_from_name(name, qualifier)
+        return entry
+
+    def add(self, name: str, type_: Optional[str] = None, bonus: int = 0,
+            surface: str = "") -> None:
+        entry = self.entry(name)
+        if entry is None:
+            return
+        if type_ is not None:
+            entry.type = type_
+        entry.bonus = max(entry.bonus, bonus)
+        if surface:
+            entry.forms.add(_words(surface))
+
+    def count_mentions(self, passages: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, ...], str]:
+        """Count mentions of every entry; returns the first surface form of each."""
+        automaton = AhoCorasick(
+            (form, entry) for entry in self.entries.values() for form in entry.forms
+        )
+        surfaces: Dict[Tuple[str, ...], str] = {}
+        position = 0
+        for _, text in passages:
+            spans = [(m.start(), m.end()) for m in _WORD.finditer(text)]
+            words = [text[a:b].lower() for a, b in spans]
+            for start, stop, entry in longest_matches(automaton.find(words)):
+                entry.mentions += 1
+                entry.first = min(entry.first, position + start)
+                if start and words[start - 1] in PLACE_PREPOSITIONS:
+                    entry.after_preposition += 1
+                surfaces.setdefault(entry.key, text[spans[start][0]:spans[stop - 1][1]])
+            position += len(words)
+        return surfaces
+
+
+def _final_type(entry: _Entry, surface: str) -> Optional[str]:
+    """The entry's type, inferring it from its mentions when the page didn't give one."""
+    if entry.type is not None:
+        return entry.type
+    if entry.mentions and entry.after_preposition * 2 >= entry.mentions:
+        return LOCATION
+    if _looks_like_person(surface):
+        return PERSON
+    return None
+
+
+def extract_entities(article: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Key entities of an extracted article (see extractors.py).
+
+    Args:
+        article: Extraction result with title, passages, link_targets,
+            infobox and categories
+
+    Returns:
+        Dictionary with people, organizations and locations, each the
+        MAX_PER_TYPE highest ranked names, best first
+    """
+    gazetteer = _Gazetteer(article["title"])
+    for anchor, target in article.get("link_targets", {}).items():
+        gazetteer.add(target, surface=anchor)
+    for label, _, links in article.get("infobox", ()):
+        type_ = INFOBOX_LABELS.get(label.lower())
+        if type_ is not None:
+            for anchor, target in links:
+                gazetteer.add(target, type_, INFOBOX_BONUS, surface=anchor)
+    for category in article.get("categories", ()):
+        for pattern, type_ in CATEGORY_PATTERNS:
+            match = pattern.match(category)
+            if match:
+                gazetteer.add(match.group(1), type_, CATEGORY_BONUS)
+                break
+
+    surfaces = gazetteer.count_mentions(article.get("passages", ()))
+    ranked: Dict[str, List[Tuple[int, float, str]]] = {PERSON: [], ORGANIZATION: [], LOCATION: []}
+    for entry in gazetteer.entries.values():
+        surface = surfaces.get(entry.key, entry.name)
+        type_ = _final_type(entry, surface)
+        if type_ not in ranked or not (entry.mentions or entry.bonus):
+            continue
+        # Linked titles start with a capital; otherwise show the text's casing
+        name = entry.name if entry.name[:1].isupper() else surface
+        ranked[type_].append((-(entry.mentions + entry.bonus), entry.first, name))
+    return {type_: [name for *_, name in sorted(items)[:MAX_PER_TYPE]] for type_, items in ranked.items()}
@@ -0,0 +1,301 @@
+"""
+HTML extraction backends for Wikipedia article pages.
+
+Every backend walks the article body once, collecting paragraphs (with
+the section each belongs to) and section headings in document order.
+Paragraph text stops being collected as soon as the character budget is
+filled, and the walk ends once the section list is full as well. Infobox
+rows and category links are read separately; they are typed signals for
+the local entity extractor (entities.py).
+
+Backends, fastest first: selectolax (Lexbor), lxml, BeautifulSoup. The
+faster ones are optional dependencies; BeautifulSoup is always available.
+"""
+import re
+from urllib.parse import unquote
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from config import settings
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Limits applied to the scraped article
+MAX_CONTENT_CHARS = 15000
+MAX_SECTIONS = 10
+# Upper bound when the whole article is read (for the LLM digest)
+MAX_ARTICLE_CHARS = 300000
+
+# Links to other articles (not File:, Help:, Category: ... pages)
+_ARTICLE_HREF = re.compile(r"^/wiki/([^:#]+)(?:#.*)?$")
+
+Link = Tuple[Optional[str], str]  # (href, anchor text)
+
+
+def _link_target(href: Optional[str]) -> Optional[str]:
+    """Title of the article a link points to, or None for other pages."""
+    match = _ARTICLE_HREF.match(href or "")
+    return unquote(match.group(1)).replace("_", " ") if match else None
+
+
+class _ArticleCollector:
+    """Accumulates paragraph text and section names up to their budgets."""
+
+    def __init__(self, max_chars: int, max_sections: int):
+        self.max_chars = max_chars
+        self.max_sections = max_sections
+        self.paragraphs: List[str] = []
+        self.sections: List[str] = []
+        # (section heading, paragraph); the lead section's heading is ""
+        self.passages: List[Tuple[str, str]] = []
+        # Text of article links in the collected paragraphs -> linked
+        # article title, in first use order
+        self.links: Dict[str, str] = {}
+        # (label, value text, [(link text, linked title)]) per infobox row
+        self.infobox: List[Tuple[str, str, List[Tuple[str, str]]]] = []
+        self.categories: List[str] = []
+        self._section = ""
+        self._chars = 0
+
+    @property
+    def content_full(self) -> bool:
+        return self._chars > self.max_chars
+
+    @property
+    def done(self) -> bool:
+        return self.content_full and len(self.sections) >= self.max_sections
+
+    def add_paragraph(self, text: str, links: Iterable[Link] = ()) -> None:
+        for href, anchor in links:
+            anchor = anchor.strip()
+            target = _link_target(href)
+            if anchor and target:
+                self.links.setdefault(anchor, target)
+        text = text.strip()
+        self.paragraphs.append(text)
+        if text:
+            self.passages.append((self._section, text))
+        self._chars += len(text) + 1  # joined with newlines
+
+    def add_heading(self, text: str) -> None:
+        # Remove [edit] links
+        text = text.strip().replace("[edit]", "").strip()
+        if text:
+            self._section = text
+        if text and len(self.sections) < self.max_sections:
+            self.sections.append(text)
+
+    def add_infobox_row(self, label: str, value: str, links: Iterable[Link]) -> None:
+        label = label.strip()
+        if label:
+            targets = [(anchor.strip(), _link_target(href)) for href, anchor in links]
+            self.infobox.append((label, value.strip(), [(a, t) for a, t in targets if a and t]))
+
+    def add_category(self, name: str) -> None:
+        name = name.strip()
+        if name:
+            self.categories.append(name)
+
+    def result(self, title: str) -> Dict[str, Any]:
+        return {
+            "title": title,
+            "content": "\n".join(self.paragraphs)[:self.max_chars],
+            "sections": self.sections,
+            "passages": self.passages,
+            "links": list(self.links),
+            "link_targets": self.links,
+            "infobox": self.infobox,
+            "categories": self.categories,
+        }
+
+
+class ArticleExtractor:
+    """Base class for article extraction backends."""
+
+    name = "base"
+
+    def extract(
+        self,
+        html: str,
+        max_chars: int = MAX_CONTENT_CHARS,
+        max_sections: int = MAX_SECTIONS,
+    ) -> Dict[str, Any]:
+        """
+        Extract the title, paragraph text and section names.
+
+        Args:
+            html: Page HTML
+            max_chars: Content budget in characters
+            max_sections: Maximum number of section names
+
+        Returns:
+            Dictionary with title, content, sections, passages (section
+            heading, paragraph), link texts and their targets within the
+            content budget, infobox rows and categories
+
+        Raises:
+            ValueError: If the page has no article body
+        """
+        raise NotImplementedError
+
+
+class SelectolaxExtractor(ArticleExtractor):
+    """Extractor on the Lexbor HTML5 parser via selectolax."""
+
+    name = "selectolax"
+
+    def extract(self, html, max_chars=MAX_CONTENT_CHARS, max_sections=MAX_SECTIONS):
+        tree = LexborHTMLParser(html)
+
+        title_elem = tree.css_first("h1.firstHeading")
+        title = title_elem.text().strip() if title_elem else "Unknown"
+
+        content_div = tree.css_first("div#mw-content-text")
+        if content_div is None:
+            raise ValueError("Could not find article content")
+
+        collector = _ArticleCollector(max_chars, max_sections)
+        for node in content_div.css("p, h2, h3"):
+            if node.tag == "p":
+                if not collector.content_full:
+                    collector.add_paragraph(node.text(), (
+                        (a.attributes.get("href"), a.text()) for a in node.css("a")
+                    ))
+            else:
+                collector.add_heading(node.text())
+            if collector.done:
+                break
+        for row in content_div.css("table.infobox tr"):
+            label, data = row.css_first("th.infobox-label"), row.css_first("td.infobox-data")
+            if label is not None and data is not None:
+                collector.add_infobox_row(label.text(), data.text(), (
+                    (a.attributes.get("href"), a.text()) for a in data.css("a")
+                ))
+        for link in tree.css("#mw-normal-catlinks li a"):
+            collector.add_category(link.text())
+        return collector.result(title)
+
+
+class LxmlExtractor(ArticleExtractor):
+    """Extractor on libxml2's HTML parser via lxml."""
+
+    name = "lxml"
+
+    def extract(self, html, max_chars=MAX_CONTENT_CHARS, max_sections=MAX_SECTIONS):
+        root = lxml.html.document_fromstring(html)
+
+        title_elems = root.xpath(
+            "//h1[contains(concat(' ', normalize-space(@class), ' '), ' firstHeading ')]"
+        )
+        title = title_elems[0].text_content().strip() if title_elems else "Unknown"
+
+        content_divs = root.xpath("//div[@id='mw-content-text']")
+        if not content_divs:
+            raise ValueError("Could not find article content")
+
+        collector = _ArticleCollector(max_chars, max_sections)
+        for node in content_divs[0].iter("p", "h2", "h3"):
+            if node.tag == "p":
+                if not collector.content_full:
+                    collector.add_paragraph(node.text_content(), (
+                        (a.get("href"), a.text_content()) for a in node.iter("a")
+                    ))
+            else:
+                collector.add_heading(node.text_content())
+            if collector.done:
+                break
+        for row in content_divs[0].xpath(
+            ".//table[contains(concat(' ', normalize-space(@class), ' '), ' infobox ')]//tr"
+        ):
+            labels = row.xpath("./th[contains(concat(' ', normalize-space(@class), ' '), ' infobox-label ')]")
+            data = row.xpath("./td[contains(concat(' ', normalize-space(@class), ' '), ' infobox-data ')]")
+            if labels and data:
+                collector.add_infobox_row(labels[0].text_content(), data[0].text_content(), (
+                    (a.get("href"), a.text_content()) for a in data[0].iter("a")
+                ))
+        for link in root.xpath("//div[@id='mw-normal-catlinks']//li/a"):
+            collector.add_category(link.text_content())
+        return collector.result(title)
+
+
+class BeautifulSoupExtractor(ArticleExtractor):
+    """Pure-Python fallback on BeautifulSoup's html.parser."""
+
+    name = "beautifulsoup"
+
+    def extract(self, html, max_chars=MAX_CONTENT_CHARS, max_sections=MAX_SECTIONS):
+        soup = BeautifulSoup(html, "html.parser")
+
+        title_elem = soup.find("h1", class_="firstHeading")
+        title = title_elem.text.strip() if title_elem else "Unknown"
+
+        content_div = soup.find("div", id="mw-content-text")
+        if not content_div:
+            raise ValueError("Could not find article content")
+
+        collector = _ArticleCollector(max_chars, max_sections)
+        for node in content_div.find_all(["p", "h2", "h3"]):
+            if node.name == "p":
+                if not collector.content_full:
+                    collector.add_paragraph(node.get_text(), (
+                        (a.get("href"), a.get_text()) for a in node.find_all("a")
+                    ))
+            else:
+                collector.add_heading(node.get_text())
+            if collector.done:
+                break
+        infobox = content_div.find("table", class_="infobox")
+        for row in infobox.find_all("tr") if infobox else ():
+            label, data = row.find("th", class_="infobox-label"), row.find("td", class_="infobox-data")
+            if label is not None and data is not None:
+                collector.add_infobox_row(label.get_text(), data.get_text(), (
+                    (a.get("href"), a.get_text()) for a in data.find_all("a")
+                ))
+        catlinks = soup.find("div", id="mw-normal-catlinks")
+        for item in catlinks.find_all("li") if catlinks else ():
+            collector.add_category(item.get_text())
+        return collector.result(title)
+
+
+EXTRACTORS = {
+    "selectolax": (SelectolaxExtractor, SELECTOLAX_AVAILABLE),
+    "lxml": (LxmlExtractor, LXML_AVAILABLE),
+    "beautifulsoup": (BeautifulSoupExtractor, True),
+}
+
+
+def available_extractors() -> List[str]:
+    """Names of the backends usable in this environment, fastest first."""
+    return [name for name, (_, available) in EXTRACTORS.items() if available]
+
+
+def get_extractor(name: Optional[str] = None) -> ArticleExtractor:
+    """
+    Get an extraction backend.
+
+    Args:
+        name: Backend name, or "auto" for the fastest installed one.
+            Defaults to settings.HTML_EXTRACTOR.
+
+    Returns:
+        Extractor instance; BeautifulSoup if the requested backend
+        is not installed
+    """
+    name = name or settings.HTML_EXTRACTOR
+    if name == "auto":
+        name = available_extractors()[0]
+    extractor_cls, available = EXTRACTORS.get(name, (BeautifulSoupExtractor, True))
+    if not available:
+        extractor_cls = BeautifulSoupExtractor
+    return extractor_cls()
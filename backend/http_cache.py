@@ -0,0 +1,140 @@
+"""
+HTTP conditional caching for quiz responses.
+
+A quiz never changes after it is created, so its representation is fully
+identified by its id, its creation time and the response schema version.
+That makes a strong ETag that can be computed from the `quizzes` row alone,
+without reading the questions.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from config import settings
+import metrics
+
+# Bump when the QuizResponse JSON changes shape, so cached copies revalidate
+QUIZ_SCHEMA_VERSION = 2
+
+
+def quiz_etag(quiz_id: int, created_at: datetime) -> str:
+    """
+    Strong ETag for a quiz response.
+
+    created_at is part of the tag because SQLite can reuse the id of a
+    deleted quiz.
+    """
+    version = f"{quiz_id}:{created_at.isoformat()}:{QUIZ_SCHEMA_VERSION}"
+    return f'"{hashlib.sha256(version.encode()).hexdigest()[:20]}"'
+
+
+def quiz_cache_headers(etag: str, created_at: datetime, cacheable: bool = True) -> Dict[str, str]:
+    """Validator headers, plus Cache-Control for responses shared caches may store."""
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(created_at.replace(tzinfo=timezone.utc), usegmt=True),
+    }
+    if cacheable:
+        headers["Cache-Control"] = (
+            f"public, max-age={settings.QUIZ_CACHE_MAX_AGE}, "
+            f"s-maxage={settings.QUIZ_CACHE_S_MAXAGE}"
+        )
+    return headers
+
+
+def is_not_modified(request_headers: Mapping[str, str], etag: str, created_at: datetime) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when there is no
+    If-None-Match (RFC 9110 section 13.2.2).
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses weak comparison
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        modified = created_at.replace(microsecond=0, tzinfo=timezone.utc)
+        return modified <= since
+    return False
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized quiz responses, keyed by quiz id.
+
+    Entries are only returned for a matching ETag, so a stale entry (a quiz
+    deleted and recreated, or a schema bump) is never served.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, quiz_id: int, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(quiz_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, quiz_id: int, etag: str, body: bytes) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[quiz_id] = (etag, body)
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, quiz_id: int) -> None:
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+quiz_responses = ResponseCache(settings.QUIZ_RESPONSE_CACHE_SIZE)
+
+
+@metrics.registry.collector(
+    "wikiquiz_quiz_response_cache_lookups_total", "In-process quiz response cache lookups.", "counter"
+)
+def _lookup_metrics():
+    return [({"result": "hit"}, quiz_responses.hits), ({"result": "miss"}, quiz_responses.misses)]
+
+
+@metrics.registry.collector(
+    "wikiquiz_quiz_response_cache_hit_ratio", "Share of quiz response cache lookups that hit."
+)
+def _hit_ratio_metrics():
+    lookups = quiz_responses.hits + quiz_responses.misses
+    return [({}, round(quiz_responses.hits / lookups, 4) if lookups else 0.0)]
+
+
+@metrics.registry.collector("wikiquiz_quiz_response_cache_entries", "Quiz responses held in the cache.")
+def _entries_metrics():
+    return [({}, len(quiz_responses))]
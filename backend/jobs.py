@@ -0,0 +1,179 @@
+"""
+Background quiz generation: persistent jobs run by a bounded worker pool.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from database import async_session
+import crud_async
+import metrics
+from models import GenerationJob
+from pipeline import generate_quiz_for_url
+from schemas import JobResponse
+from urls import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"succeeded", "failed"}
+
+
+class QueueFullError(Exception):
+    """Raised when the job backlog is at capacity."""
+
+
+def _job_payload(job: GenerationJob) -> Dict[str, Any]:
+    """Serialize a job the way the status endpoint returns it."""
+    return JobResponse.model_validate(job).model_dump(mode="json")
+
+
+class JobQueue:
+    """
+    Runs generation jobs on a fixed number of worker tasks.
+
+    Job rows are the source of truth; the in-memory queue only holds IDs.
+    Status changes are pushed to subscribers (the SSE endpoint) as they
+    happen.
+    """
+
+    def __init__(self, workers: int, max_size: int):
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    async def start(self) -> None:
+        """Resume unfinished jobs and start the workers."""
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_AFTER)
+        async with async_session() as db:
+            pending = await crud_async.requeue_unfinished_jobs(db, stale_before)
+        for job in pending:
+            self._queue.put_nowait(job.id)
+        if pending:
+            logger.info(f"Resuming {len(pending)} unfinished generation jobs")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers. Interrupted jobs are resumed on next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, url: str) -> GenerationJob:
+        """
+        Create a job for `url` and queue it.
+
+        The job stores the canonical URL. A URL that already has a quiz gets a
+        job that is succeeded from the start.
+
+        Raises:
+            QueueFullError: If the backlog is at JOB_QUEUE_SIZE
+        """
+        url = canonicalize_url(url)
+        async with async_session() as db:
+            existing = await crud_async.get_quiz_version_by_url(db, url)
+            if existing:
+                return await crud_async.create_job(db, url, status="succeeded", quiz_id=existing.id)
+            if self._queue.qsize() >= self.max_size:
+                raise QueueFullError("Generation queue is full, try again later")
+            job = await crud_async.create_job(db, url)
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def submit_batch(self, urls: List[str]) -> str:
+        """
+        Create and queue one job per distinct URL under a new batch id.
+        
+        URLs that already have a quiz get succeeded jobs. The batch is
+        rejected as a whole if it doesn't fit in the queue.
+        
+        Returns:
+            The batch id
+        
+        Raises:
+            QueueFullError: If the batch would exceed JOB_QUEUE_SIZE
+        """
+        urls = list(dict.fromkeys(canonicalize_url(url) for url in urls))
+        batch_id = str(uuid.uuid4())
+        async with async_session() as db:
+            quiz_ids = await crud_async.get_quiz_ids_by_urls(db, urls)
+            if self._queue.qsize() + len(urls) - len(quiz_ids) > self.max_size:
+                raise QueueFullError("Generation queue is full, try again later")
+            jobs = await crud_async.create_jobs(db, urls, batch_id, quiz_ids)
+        for job in jobs:
+            if job.status == "queued":
+                self._queue.put_nowait(job.id)
+        return batch_id
+
+    def subscribe(self, job_id: str) -> "asyncio.Queue[Dict[str, Any]]":
+        """Receive status updates for a job."""
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        """Stop receiving status updates for a job."""
+        queues = self._subscribers.get(job_id, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._subscribers.pop(job_id, None)
+
+    async def _update(self, job_id: str, **fields: Any) -> None:
+        """Persist a status change and notify subscribers."""
+        async with async_session() as db:
+            job = await crud_async.update_job(db, job_id, **fields)
+            payload = _job_payload(job) if job else None
+        if payload:
+            for queue in self._subscribers.get(job_id, []):
+                queue.put_nowait(payload)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker error for {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        async with async_session() as db:
+            if not await crud_async.claim_job(db, job_id):
+                return  # Claimed by another worker process
+            url = (await crud_async.get_job(db, job_id)).url
+        await self._update(job_id, status="running")
+
+        try:
+            quiz = await generate_quiz_for_url(
+                url, on_stage=lambda stage: self._update(job_id, stage=stage)
+            )
+        except ValueError as e:
+            await self._update(job_id, status="failed", error=str(e))
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await self._update(job_id, status="failed", error="Failed to generate quiz")
+        else:
+            await self._update(job_id, status="succeeded", stage=None, quiz_id=quiz.id)
+
+
+job_queue = JobQueue(workers=settings.JOB_WORKERS, max_size=settings.JOB_QUEUE_SIZE)
+
+
+@metrics.registry.collector("wikiquiz_job_queue_depth", "Generation jobs queued in this process.")
+def _queue_metrics():
+    return [({}, job_queue._queue.qsize())]
+
+
+async def get_job_payload(job_id: str) -> Optional[Dict[str, Any]]:
+    """Load a job's current status from the database."""
+    async with async_session() as db:
+        job = await crud_async.get_job(db, job_id)
+        return _job_payload(job) if job else None
@@ -0,0 +1,183 @@
+"""
+Incremental parsing of a JSON object that arrives in chunks.
+
+Used to act on an LLM response while it is still streaming: every
+top-level field, and every element of a top-level array, is reported as
+soon as its closing character arrives instead of after the whole
+document. Text before the opening brace and after the closing one (a
+markdown fence) is ignored.
+"""
+import json
+from bisect import bisect_right
+from typing import Any, List, Optional, Tuple
+
+# (kind, key, value): ("item", "quiz", {...}) for each element of a
+# top-level array, ("field", "summary", "...") for each top-level value
+StreamEvent = Tuple[str, str, Any]
+
+
+class IncrementalObjectParser:
+    """
+    Scans chunks of a JSON object and reports completed parts of it.
+
+    Only nesting, strings and escapes are tracked while scanning; each
+    completed part is decoded with `json.loads`, so the parser never
+    accepts JSON the standard library would reject. Chunks are kept as
+    they arrive and positions are offsets into their concatenation, so
+    feeding is linear in the total input size.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._chunks: List[str] = []
+        self._chunk_starts: List[int] = []  # Offset of each chunk
+        self._length = 0
+        self._pos = 0
+        self._started = False
+        # Open containers, innermost last: "{" or "["
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        # Top-level object state
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """
+        Add a chunk of the response.
+
+        Returns:
+            Events completed by this chunk, in document order
+
+        Raises:
+            ValueError: If a completed part is not valid JSON
+        """
+        if not chunk or self.done:
+            return []
+        base = self._length
+        self._chunks.append(chunk)
+        self._chunk_starts.append(base)
+        self._length += len(chunk)
+        events: List[StreamEvent] = []
+        # Everything before this chunk has been scanned
+        for i, char in enumerate(chunk, base):
+            self._pos = i + 1
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append("{")
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._string_closed(i, events)
+                continue
+
+            depth = len(self._stack)
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+                if depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+            elif char in "{[":
+                if depth == 1 and self._value_start is None:
+                    self._value_start = i
+                elif depth == 2 and self._stack[-1] == "[" and self._item_start is None:
+                    self._item_start = i
+                self._stack.append(char)
+            elif char in "}]":
+                if depth == 2 and self._stack[-1] == "[":
+                    self._end_item(i, events)
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 0:
+                    self._end_value(i, events)
+                    self.done = True
+                    break
+                elif depth == 1:
+                    self._emit(events, "field", self._key, self._slice(self._value_start, i + 1))
+                    self._value_start = None
+                elif depth == 2 and self._stack[-1] == "[" and self._item_start is not None:
+                    self._emit(events, "item", self._key, self._slice(self._item_start, i + 1))
+                    self._item_start = None
+            elif char == ",":
+                if depth == 1:
+                    self._end_value(i, events)
+                    self._expect_key = True
+                elif depth == 2 and self._stack[-1] == "[":
+                    self._end_item(i, events)
+            elif not char.isspace() and char != ":":
+                # Start of a number, true, false or null
+                if depth == 1 and self._value_start is None and not self._expect_key:
+                    self._value_start = i
+                elif depth == 2 and self._stack[-1] == "[" and self._item_start is None:
+                    self._item_start = i
+        return events
+
+    def _slice(self, start: int, end: int) -> str:
+        """The input from offset `start` up to `end`, joined from the chunks it spans."""
+        last_start = self._chunk_starts[-1]
+        if start >= last_start:
+            return self._chunks[-1][start - last_start:end - last_start]
+        first = bisect_right(self._chunk_starts, start) - 1
+        parts = []
+        for chunk_start, chunk in zip(self._chunk_starts[first:], self._chunks[first:]):
+            if chunk_start >= end:
+                break
+            parts.append(chunk[max(start - chunk_start, 0):end - chunk_start])
+        return "".join(parts)
+
+    def _string_closed(self, i: int, events: List[StreamEvent]) -> None:
+        depth = len(self._stack)
+        if depth == 1 and self._expect_key:
+            self._key = json.loads(self._slice(self._string_start, i + 1))
+            self._expect_key = False
+        elif depth == 1:
+            self._emit(events, "field", self._key, self._slice(self._value_start, i + 1))
+            self._value_start = None
+        elif depth == 2 and self._stack[-1] == "[" and self._item_start is None:
+            self._emit(events, "item", self._key, self._slice(self._string_start, i + 1))
+
+    def _end_value(self, i: int, events: List[StreamEvent]) -> None:
+        """Close a pending scalar top-level value (numbers, true/false/null)."""
+        if self._value_start is not None:
+            self._emit(events, "field", self._key, self._slice(self._value_start, i))
+            self._value_start = None
+
+    def _end_item(self, i: int, events: List[StreamEvent]) -> None:
+        """Close a pending scalar array element."""
+        if self._item_start is not None:
+            self._emit(events, "item", self._key, self._slice(self._item_start, i))
+            self._item_start = None
+
+    def _emit(self, events: List[StreamEvent], kind: str, key: Optional[str], raw: str) -> None:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON for {key!r}: {e}")
+        events.append((kind, key, value))
+
+    def result(self) -> Any:
+        """
+        The complete object, once the closing brace has arrived.
+
+        Raises:
+            ValueError: If the object is incomplete or invalid
+        """
+        if not self.done:
+            raise ValueError("Incomplete JSON object")
+        text = self._slice(0, self._pos)
+        try:
+            return json.loads(text[text.index("{"):])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
@@ -0,0 +1,144 @@
+"""
+Persistent, content-addressed cache of LLM quiz results.
+
+An entry is keyed by the prompt version, the model and the exact article
+text sent to it, so the same article reached through another URL (or
+re-generated after its quiz was deleted) costs one lookup instead of a
+paid LLM call. Changing the prompt template changes the prompt version and
+therefore every key.
+"""
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import settings
+from database import SessionLocal
+from models import LLMCacheEntry
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """Hit/miss counters for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+@metrics.registry.collector("wikiquiz_llm_cache_lookups_total", "LLM result cache lookups.", "counter")
+def _lookup_metrics():
+    return [({"result": "hit"}, stats.hits), ({"result": "miss"}, stats.misses)]
+
+
+@metrics.registry.collector("wikiquiz_llm_cache_hit_ratio", "Share of LLM cache lookups that hit.")
+def _hit_ratio_metrics():
+    return [({}, stats.as_dict()["hit_ratio"])]
+
+
+def cache_key(prompt_version: str, model: str, title: str, content: str) -> str:
+    """SHA-256 over everything that determines the LLM's input."""
+    digest = hashlib.sha256()
+    for part in (prompt_version, model, title, content):
+        data = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _expired(entry: LLMCacheEntry, now: datetime) -> bool:
+    return bool(settings.LLM_CACHE_TTL) and entry.created_at < now - timedelta(
+        seconds=settings.LLM_CACHE_TTL
+    )
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached result and mark it as recently used.
+
+    Database errors count as a miss; the cache must never fail a generation.
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    now = datetime.utcnow()
+    try:
+        with SessionLocal() as db:
+            entry = db.get(LLMCacheEntry, key)
+            if entry is None or _expired(entry, now):
+                stats.record(misses=1)
+                return None
+            entry.hits = LLMCacheEntry.hits + 1  # in SQL, so concurrent hits all count
+            entry.last_used_at = now
+            db.commit()
+            stats.record(hits=1)
+            return entry.result
+    except SQLAlchemyError as e:
+        logger.warning(f"LLM cache lookup failed: {e}")
+        stats.record(misses=1)
+        return None
+
+
+def put(key: str, model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+    """Store a result, then evict expired and least recently used entries."""
+    if not settings.LLM_CACHE_ENABLED:
+        return
+    now = datetime.utcnow()
+    try:
+        with SessionLocal() as db:
+            db.merge(LLMCacheEntry(
+                key=key,
+                model=model,
+                prompt_version=prompt_version,
+                result=result,
+                hits=0,
+                created_at=now,
+                last_used_at=now,
+            ))
+            db.commit()
+            evicted = _evict(db, now)
+        if evicted:
+            stats.record(evictions=evicted)
+    except SQLAlchemyError as e:
+        logger.warning(f"LLM cache store failed: {e}")
+
+
+def _evict(db, now: datetime) -> int:
+    """Delete expired entries and everything beyond LLM_CACHE_MAX_ENTRIES, oldest use first."""
+    overflow = (
+        select(LLMCacheEntry.key)
+        .order_by(LLMCacheEntry.last_used_at.desc())
+        .offset(settings.LLM_CACHE_MAX_ENTRIES)
+    )
+    condition = LLMCacheEntry.key.in_(overflow)
+    if settings.LLM_CACHE_TTL:
+        ttl_cutoff = now - timedelta(seconds=settings.LLM_CACHE_TTL)
+        condition = or_(condition, LLMCacheEntry.created_at < ttl_cutoff)
+    result = db.execute(delete(LLMCacheEntry).where(condition))
+    db.commit()
+    return result.rowcount or 0
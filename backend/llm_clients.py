@@ -0,0 +1,297 @@
+"""
+LLM provider clients, created once per process.
+
+Each provider keeps one async SDK client (and with it one connection pool)
+for the life of the process, and bounds its own traffic: a concurrency
+semaphore plus token buckets for requests and tokens per minute, so bursts
+queue here instead of coming back as 429s. Time spent queueing and in the
+call itself is recorded per provider (see metrics.py).
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config import settings
+from ratelimit import RateLimiter
+import metrics
+
+# Try importing Gemini API, fall back to OpenAI
+try:
+    import google.generativeai as genai
+    GEMINI_AVAILABLE = True
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+except (ImportError, Exception):
+    GEMINI_AVAILABLE = False
+
+from openai import AsyncOpenAI
+
+GEMINI_MODEL = "gemini-pro"
+OPENAI_MODEL = "gpt-3.5-turbo"
+
+# Rough prompt size in tokens; only used to charge the tokens-per-minute bucket
+CHARS_PER_TOKEN = 4
+
+
+class QueueStats:
+    """Queueing and call counters for one provider."""
+
+    def __init__(self):
+        self.requests = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.requests += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+class ProviderLimits:
+    """Concurrency, requests-per-minute and tokens-per-minute limits for a provider."""
+
+    def __init__(self, concurrency: int, requests_per_minute: float, tokens_per_minute: float):
+        self.concurrency = concurrency
+        self.requests = RateLimiter(requests_per_minute)
+        self.tokens = RateLimiter(tokens_per_minute)
+        self.stats = QueueStats()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; recreate it for a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.concurrency), loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        """Wait for a concurrency slot and rate budget, then run the call."""
+        start = time.monotonic()
+        queued = True
+        self.stats.waiting += 1
+        try:
+            async with self._get_semaphore():
+                await self.requests.acquire()
+                await self.tokens.acquire(estimated_tokens)
+                queued = False
+                self.stats.waiting -= 1
+                self.stats.record_wait(time.monotonic() - start)
+                self.stats.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.stats.in_flight -= 1
+        finally:
+            if queued:  # Cancelled while waiting
+                self.stats.waiting -= 1
+
+    @classmethod
+    def from_settings(cls) -> "ProviderLimits":
+        return cls(
+            concurrency=settings.LLM_CONCURRENCY,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+        )
+
+
+class LLMProvider:
+    """Base class: one shared client and its limits."""
+
+    name = "base"
+    model = ""
+
+    def __init__(self):
+        self.limits = ProviderLimits.from_settings()
+
+    def estimate_tokens(self, prompt: str) -> int:
+        return len(prompt) // CHARS_PER_TOKEN + settings.LLM_MAX_OUTPUT_TOKENS
+
+    @asynccontextmanager
+    async def _call(self, prompt: str):
+        """Hold a slot for one call and record its queueing and call time."""
+        queued_at = time.perf_counter()
+        async with self.limits.slot(self.estimate_tokens(prompt)):
+            start = time.perf_counter()
+            metrics.llm_queue_seconds.observe(start - queued_at, provider=self.name)
+            outcome = "error"
+            try:
+                yield
+                outcome = "ok"
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.llm_seconds.observe(elapsed, provider=self.name, outcome=outcome)
+                metrics.stage_seconds.observe(elapsed, stage="llm")
+
+    async def complete(self, prompt: str) -> str:
+        """Send the prompt and return the response text."""
+        async with self._call(prompt):
+            return await self._complete(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Send the prompt and yield the response text as it is generated."""
+        # The slot is held until the whole response has arrived
+        async with self._call(prompt):
+            async for chunk in self._stream(prompt):
+                yield chunk
+
+    async def _complete(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        # Providers without a streaming API deliver the response in one chunk
+        yield await self._complete(prompt)
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+    model = OPENAI_MODEL
+
+    def __init__(self):
+        super().__init__()
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+
+    def _request(self, prompt: str) -> Dict[str, Any]:
+        messages: List[Dict[str, str]] = [
+            {
+                "role": "system",
+                "content": "You are a JSON generator. Return only valid JSON."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": settings.LLM_MAX_OUTPUT_TOKENS,
+        }
+
+    async def _complete(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(**self._request(prompt))
+        return response.choices[0].message.content
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(**self._request(prompt), stream=True)
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+    model = GEMINI_MODEL
+
+    def __init__(self):
+        super().__init__()
+        self.client = genai.GenerativeModel(self.model)
+
+    async def _complete(self, prompt: str) -> str:
+        response = await self.client.generate_content_async(prompt)
+        return response.text
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.client.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+
+PROVIDERS = {"gemini": GeminiProvider, "openai": OpenAIProvider}
+
+# Provider instances for this process, created on first use
+_providers: Dict[str, LLMProvider] = {}
+
+
+def active_provider_name() -> Optional[str]:
+    """The configured provider: Gemini if available, else OpenAI, else None."""
+    if GEMINI_AVAILABLE and settings.GOOGLE_API_KEY:
+        return "gemini"
+    if settings.OPENAI_API_KEY:
+        return "openai"
+    return None
+
+
+def get_provider() -> Optional[LLMProvider]:
+    """The shared client of the configured provider, or None without API keys."""
+    name = active_provider_name()
+    if name is None:
+        return None
+    if name not in _providers:
+        _providers[name] = PROVIDERS[name]()
+    return _providers[name]
+
+
+def configure_limits(
+    concurrency: Optional[int] = None,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> None:
+    """Override the configured provider's limits (e.g. from bulk_generate options)."""
+    provider = get_provider()
+    if provider is None:
+        return
+    current = provider.limits
+    provider.limits = ProviderLimits(
+        concurrency=concurrency if concurrency is not None else current.concurrency,
+        requests_per_minute=requests_per_minute if requests_per_minute is not None else current.requests.rate,
+        tokens_per_minute=tokens_per_minute if tokens_per_minute is not None else current.tokens.rate,
+    )
+
+
+def stats() -> Dict[str, Any]:
+    """Limits and queueing counters of every provider used by this process."""
+    return {
+        name: {
+            "model": provider.model,
+            "concurrency": provider.limits.concurrency,
+            "requests_per_minute": provider.limits.requests.rate,
+            "tokens_per_minute": provider.limits.tokens.rate,
+            **provider.limits.stats.as_dict(),
+        }
+        for name, provider in _providers.items()
+    }
+
+
+async def close_providers() -> None:
+    """Close provider connection pools (called on application shutdown)."""
+    for provider in _providers.values():
+        await provider.close()
+    _providers.clear()
+
+
+@metrics.registry.collector(
+    "wikiquiz_llm_requests_waiting", "LLM calls waiting for a concurrency slot or rate budget."
+)
+def _waiting_metrics():
+    return [({"provider": name}, provider.limits.stats.waiting) for name, provider in _providers.items()]
+
+
+@metrics.registry.collector("wikiquiz_llm_requests_in_flight", "LLM calls in progress.")
+def _in_flight_metrics():
+    return [({"provider": name}, provider.limits.stats.in_flight) for name, provider in _providers.items()]
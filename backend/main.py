@@ -1,20 +1,42 @@
 """
 Main FastAPI application.
 """
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import json
 import logging
+import math
+import time
+import uuid
 
 from config import settings
-from database import get_db, init_db
+from database import (
+    READ_YOUR_WRITES_COOKIE, async_engine, async_read_engine, async_session, get_async_db,
+    get_async_read_db, init_db, read_your_writes_until
+)
 from schemas import (
-    QuizGenerateRequest, QuizResponse, QuizListResponse, ErrorResponse
+    QuizGenerateRequest, QuizResponse, QuizListResponse, ErrorResponse, JobResponse,
+    BulkGenerateRequest, BatchResponse, QuizPreviewResponse, QuizSearchResult,
+    AttemptRequest, AttemptResponse, QuestionStatsResponse
 )
 from models import Quiz
 import crud
-from utils import scrape_wikipedia, generate_quiz_with_llm
+import crud_async
+from http_cache import is_not_modified, quiz_cache_headers, quiz_etag, quiz_responses
+from jobs import job_queue, get_job_payload, QueueFullError, TERMINAL_STATUSES
+from write_behind import attempt_buffer, BufferFullError
+from pipeline import generate_quiz_for_url, preview_quiz_for_url, stream_quiz_for_url
+from utils import close_http_client
+from llm_clients import close_providers
+import llm_cache
+import llm_clients
+import metrics
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Last-Modified"],
 )
 
 
@@ -44,6 +67,55 @@ async def startup_event():
     logger.info("Initializing database...")
     init_db()
     logger.info("Database initialized successfully")
+    await job_queue.start()
+    await attempt_buffer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop job workers, write buffered attempts and release pooled connections."""
+    await job_queue.stop()
+    await attempt_buffer.stop()
+    await close_http_client()
+    await close_providers()
+    for bind in (async_engine, async_read_engine):
+        if bind is not None:
+            await bind.dispose()
+
+
+async def _quiz_response(
+    http_request: Request,
+    db: AsyncSession,
+    version: Row,
+    status_code: int = 200,
+) -> Response:
+    """
+    Respond with a quiz, given its `(id, created_at)` row.
+    
+    A GET whose If-None-Match or If-Modified-Since still matches gets a 304.
+    Otherwise the body comes from the in-process response cache, and the
+    quiz and its questions are only read on a miss.
+    """
+    etag = quiz_etag(version.id, version.created_at)
+    is_get = http_request.method == "GET"
+    headers = quiz_cache_headers(etag, version.created_at, cacheable=is_get)
+    headers["Content-Location"] = f"/api/quizzes/{version.id}"
+    if is_get and is_not_modified(http_request.headers, etag, version.created_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    body = quiz_responses.get(version.id, etag)
+    if body is None:
+        quiz = await crud_async.get_quiz(db, version.id)
+        if not quiz:
+            # Deleted since the version was read
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Quiz with ID {version.id} not found"
+            )
+        with metrics.stage_seconds.time(stage="serialize"):
+            body = QuizResponse.model_validate(quiz).model_dump_json().encode()
+        quiz_responses.put(version.id, etag, body)
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
 
 
 @app.get("/")
@@ -62,66 +134,212 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """
+    LLM usage in this process.
+    
+    Returns:
+    - Per provider: limits, requests, callers waiting and in flight, and
+      time spent queueing for a slot and rate budget
+    - LLM result cache hits and misses
+    """
+    return {"providers": llm_clients.stats(), "cache": llm_cache.stats.as_dict()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus metrics of this process: per-stage generation latency
+    histograms, LLM call and queueing time per provider, cache hit ratios,
+    database pool checkout wait and in-flight generations (see metrics.py).
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post(
     "/api/quizzes/generate",
     response_model=QuizResponse,
     status_code=201,
     responses={
+        202: {"model": JobResponse},
         400: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
     }
 )
 async def generate_quiz(
     request: QuizGenerateRequest,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    run_async: bool = Query(False, alias="async"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate a quiz from a Wikipedia article URL.
     
     - **url**: Wikipedia article URL
+    - **async**: Queue the generation and return a job right away (202)
     
     Returns:
     - Quiz with questions, entities, related topics, and more
+    - With async=true, the generation job; poll `/api/jobs/{id}`
     """
+    if run_async:
+        try:
+            job = await job_queue.submit(str(request.url))
+        except QueueFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=JobResponse.model_validate(job).model_dump(mode="json"),
+            headers={"Location": f"/api/jobs/{job.id}"},
+        )
+    
     try:
         url = str(request.url)
         
-        # Check if quiz already exists (caching feature)
-        existing_quiz = crud.get_quiz_by_url(db, url)
-        if existing_quiz:
+        # Check if quiz already exists (caching feature); the questions
+        # are only read if the response isn't cached in-process
+        existing = await crud_async.get_quiz_version_by_url(db, url)
+        if existing:
             logger.info(f"Quiz already exists for URL: {url}")
-            return QuizResponse.model_validate(existing_quiz)
+            return await _quiz_response(http_request, db, existing, status_code=201)
         
         logger.info(f"Starting quiz generation for URL: {url}")
         
-        # 1. Scrape Wikipedia
-        logger.info("Scraping Wikipedia...")
-        scraped_data = scrape_wikipedia(url)
+        # Don't hold a pooled connection while the LLM runs
+        await db.close()
         
-        # 2. Generate quiz with LLM
-        logger.info("Generating quiz with LLM...")
-        llm_output = generate_quiz_with_llm(
-            scraped_data["title"],
-            scraped_data["content"]
-        )
-        
-        # 3. Save to database
-        logger.info("Saving quiz to database...")
-        db_quiz = crud.create_quiz(
-            db=db,
-            url=url,
-            title=scraped_data["title"],
-            summary=llm_output["summary"],
-            key_entities=llm_output["key_entities"],
-            sections=llm_output["sections"],
-            related_topics=llm_output["related_topics"],
-            questions=llm_output["quiz"],
-            raw_html=scraped_data.get("raw_html"),
-        )
+        # Concurrent requests for the same URL share one generation
+        quiz = await generate_quiz_for_url(url)
         
-        logger.info(f"Quiz generated successfully with ID: {db_quiz.id}")
-        return QuizResponse.model_validate(db_quiz)
+        logger.info(f"Quiz generated successfully with ID: {quiz.id}")
+        etag = quiz_etag(quiz.id, quiz.created_at)
+        with metrics.stage_seconds.time(stage="serialize"):
+            body = quiz.model_dump_json().encode()
+        quiz_responses.put(quiz.id, etag, body)
+        headers = quiz_cache_headers(etag, quiz.created_at, cacheable=False)
+        headers["Content-Location"] = f"/api/quizzes/{quiz.id}"
+        response = Response(body, status_code=201, media_type="application/json", headers=headers)
+        _read_your_writes(response)
+        return response
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to generate quiz"
+        )
+
+
+@app.post(
+    "/api/quizzes/preview",
+    response_model=QuizPreviewResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def preview_quiz(request: QuizGenerateRequest):
+    """
+    Get a quiz for first paint without waiting for the LLM.
+    
+    - **url**: Wikipedia article URL
+    
+    Returns:
+    - The stored quiz (`source: "stored"`), or a rule-based quiz built from
+      the scraped article in milliseconds (`source: "offline"`). Offline
+      previews are not stored; generate the quiz as usual alongside.
+    """
+    try:
+        return await preview_quiz_for_url(str(request.url))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to preview quiz"
+        )
+
+
+def _read_your_writes(response: Response, written_at: Optional[datetime] = None, pending: float = 0) -> None:
+    """
+    With a read replica, send the client's reads to the primary until the
+    replica has a quiz written at `written_at` (default now), or still
+    being written for up to `pending` seconds.
+    """
+    if not settings.DATABASE_READ_URL:
+        return
+    until = read_your_writes_until(written_at, pending)
+    max_age = math.ceil(until - time.time())
+    if max_age > 0:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, str(math.ceil(until)),
+            max_age=max_age, httponly=True, samesite="lax",
+        )
+
+
+def _generation_event(kind: str, value) -> str:
+    """Format a `stream_quiz_for_url` event as a server-sent event."""
+    if kind == "quiz":
+        # Later GETs of the new quiz are served from the response cache
+        body = value.model_dump_json()
+        quiz_responses.put(value.id, quiz_etag(value.id, value.created_at), body.encode())
+        return f"event: quiz\ndata: {body}\n\n"
+    if kind == "summary":
+        value = {"summary": value}
+    return f"event: {kind}\ndata: {json.dumps(value)}\n\n"
+
+
+@app.post(
+    "/api/quizzes/generate/stream",
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "Server-sent events"},
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def generate_quiz_stream(request: QuizGenerateRequest):
+    """
+    Generate a quiz, streaming its parts as server-sent events while the
+    LLM is still writing it.
+    
+    - **url**: Wikipedia article URL
+    
+    Events, in order:
+    - `article`: `{"url", "title"}` once the article is scraped
+    - `summary`: `{"summary"}` as soon as the LLM has written it
+    - `question`: each question as soon as it is complete, with its `index`
+    - `quiz`: the stored quiz, as returned by `POST /api/quizzes/generate`
+    - `error`: `{"detail"}` if generation fails after the stream started
+    
+    Already stored quizzes are streamed the same way. URL and scraping
+    errors return 400 before the stream starts. Disconnecting stops the
+    generation.
+    """
+    events = stream_quiz_for_url(str(request.url))
+    try:
+        # Scraping happens before the first event, so its errors still
+        # get a proper status code
+        first = await events.__anext__()
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(
@@ -134,6 +352,88 @@ async def generate_quiz(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate quiz"
         )
+    
+    async def event_stream():
+        kind, value = first
+        questions = 0
+        try:
+            while True:
+                if kind == "question":
+                    value = {"index": questions, **value}
+                    questions += 1
+                yield _generation_event(kind, value)
+                kind, value = await events.__anext__()
+        except StopAsyncIteration:
+            pass
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Failed to generate quiz'})}\n\n"
+        finally:
+            await events.aclose()
+    
+    response = StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # The quiz is stored at the end of the stream, within about one LLM call
+    _read_your_writes(response, pending=settings.LLM_TIMEOUT)
+    return response
+
+
+@app.post(
+    "/api/quizzes/bulk",
+    response_model=BatchResponse,
+    status_code=202,
+    responses={503: {"model": ErrorResponse}}
+)
+async def bulk_generate(request: BulkGenerateRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Queue quiz generation for many Wikipedia URLs.
+    
+    - **urls**: Wikipedia article URLs; duplicates are generated once
+    
+    Returns:
+    - The batch; poll `/api/quizzes/bulk/{batch_id}` for progress. Jobs are
+      persisted, so a restart resumes the batch where it stopped.
+    """
+    try:
+        batch_id = await job_queue.submit_batch([str(url) for url in request.urls])
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=BatchResponse(**await crud_async.get_batch_summary(db, batch_id)).model_dump(mode="json"),
+        headers={"Location": f"/api/quizzes/bulk/{batch_id}"},
+    )
+
+
+@app.get(
+    "/api/quizzes/bulk/{batch_id}",
+    response_model=BatchResponse,
+    responses={404: {"model": ErrorResponse}}
+)
+async def get_bulk_batch(batch_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the progress of a bulk generation batch.
+    
+    - **batch_id**: Batch ID returned by `POST /api/quizzes/bulk`
+    
+    Returns:
+    - Job counts per status and throughput in articles per minute
+    """
+    summary = await crud_async.get_batch_summary(db, batch_id)
+    if not summary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch with ID {batch_id} not found"
+        )
+    if summary["succeeded"]:
+        _read_your_writes(response, written_at=summary["updated_at"])
+    return summary
 
 
 @app.get(
@@ -142,22 +442,42 @@ async def generate_quiz(
     responses={500: {"model": ErrorResponse}}
 )
 async def list_quizzes(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get list of all quizzes.
+    Get list of all quizzes, newest first.
     
-    - **skip**: Number of quizzes to skip (default: 0)
     - **limit**: Maximum number of quizzes to return (default: 100)
+    - **cursor**: Opaque cursor from the `X-Next-Cursor` header of the previous page
+    - **skip**: Number of quizzes to skip (default: 0); ignored with a cursor
+    - **include_total**: Add an approximate total in `X-Total-Count`
     
     Returns:
-    - List of quizzes with basic information
+    - List of quizzes with basic information. `X-Next-Cursor` is set when
+      there may be more quizzes. Read from the replica if one is
+      configured, so quizzes written by other clients may show up with
+      a short delay.
     """
     try:
-        quizzes = crud.get_quizzes(db, skip=skip, limit=limit)
-        return [QuizListResponse.model_validate(q) for q in quizzes]
+        position = crud.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    try:
+        rows = await crud_async.get_quiz_page(db, limit=limit, cursor=position, skip=skip)
+        if len(rows) == limit:
+            response.headers["X-Next-Cursor"] = crud.encode_cursor(rows[-1])
+        if include_total:
+            response.headers["X-Total-Count"] = str(await crud_async.count_quizzes(db, approximate=True))
+        return [QuizListResponse.model_validate(row) for row in rows]
     except Exception as e:
         logger.error(f"Error listing quizzes: {str(e)}")
         raise HTTPException(
@@ -166,17 +486,56 @@ async def list_quizzes(
         )
 
 
+@app.get(
+    "/api/quizzes/search",
+    response_model=List[QuizSearchResult],
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+)
+async def search_quizzes(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full-text search over quiz titles, summaries, questions and explanations.
+    
+    - **q**: Search words; quizzes must contain all of them (stemmed)
+    - **limit**: Maximum number of results (default: 20)
+    - **skip**: Number of results to skip (default: 0)
+    
+    Returns:
+    - Matching quizzes, best first, each with an HTML snippet that marks
+      the matched words with `<mark>`
+    """
+    try:
+        return await crud_async.search_quizzes(db, q, limit=limit, skip=skip)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error searching quizzes: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search quizzes"
+        )
+
+
 @app.get(
     "/api/quizzes/{quiz_id}",
     response_model=QuizResponse,
     responses={
+        304: {"description": "Not modified"},
         404: {"model": ErrorResponse},
         500: {"model": ErrorResponse}
     }
 )
 async def get_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get a specific quiz by ID with all questions.
@@ -184,16 +543,23 @@ async def get_quiz(
     - **quiz_id**: Quiz ID
     
     Returns:
-    - Quiz with all details and questions
+    - Quiz with all details and questions, with `ETag`, `Last-Modified`
+      and `Cache-Control` headers. A matching `If-None-Match` gets a 304.
     """
     try:
-        quiz = crud.get_quiz(db, quiz_id)
-        if not quiz:
+        version = await crud_async.get_quiz_version(db, quiz_id)
+        if not version and db.info.get("replica"):
+            # The replica may not have caught up with a quiz created just now
+            async with async_session() as primary:
+                version = await crud_async.get_quiz_version(primary, quiz_id)
+                if version:
+                    return await _quiz_response(http_request, primary, version)
+        if not version:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Quiz with ID {quiz_id} not found"
             )
-        return QuizResponse.model_validate(quiz)
+        return await _quiz_response(http_request, db, version)
     except HTTPException:
         raise
     except Exception as e:
@@ -204,6 +570,215 @@ async def get_quiz(
         )
 
 
+@app.get(
+    "/api/quizzes/{quiz_id}/html",
+    response_class=HTMLResponse,
+    responses={404: {"model": ErrorResponse}}
+)
+async def get_quiz_html(
+    quiz_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the raw Wikipedia HTML stored when the quiz was generated.
+    
+    - **quiz_id**: Quiz ID
+    """
+    raw_html = await crud_async.get_quiz_raw_html(db, quiz_id)
+    if raw_html is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No stored HTML for quiz with ID {quiz_id}"
+        )
+    # Scraped markup must not run scripts on our origin
+    return HTMLResponse(raw_html, headers={"Content-Security-Policy": "sandbox"})
+
+
+def _grade_attempt(quiz_id: int, answer_key: dict, request: AttemptRequest) -> dict:
+    """
+    Grade submitted answers against a quiz's answer key.
+    
+    Raises:
+        ValueError: If a question isn't part of the quiz or is answered twice
+    """
+    answers = []
+    for submitted in request.answers:
+        answer = answer_key.get(submitted.question_id)
+        if answer is None:
+            raise ValueError(f"Question {submitted.question_id} is not part of quiz {quiz_id}")
+        answers.append({
+            "question_id": submitted.question_id,
+            "selected": submitted.selected,
+            "correct": submitted.selected.strip() == answer.strip(),
+            "time_ms": submitted.time_ms,
+        })
+    if len({a["question_id"] for a in answers}) < len(answers):
+        raise ValueError("Each question can only be answered once per attempt")
+    return {
+        "id": str(uuid.uuid4()),
+        "quiz_id": quiz_id,
+        "user_id": request.user_id,
+        "score": sum(a["correct"] for a in answers),
+        "total": len(answers),
+        "duration_ms": request.duration_ms,
+        "submitted_at": datetime.utcnow(),
+        "answers": answers,
+    }
+
+
+@app.post(
+    "/api/quizzes/{quiz_id}/attempts",
+    response_model=AttemptResponse,
+    status_code=202,
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}}
+)
+async def submit_attempt(
+    quiz_id: int,
+    request: AttemptRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Submit answers to a quiz and get them graded.
+    
+    - **user_id**: Who answered (optional, free-form)
+    - **answers**: `question_id`, `selected` option and optionally `time_ms` per question
+    - **duration_ms**: Time spent on the whole attempt (optional)
+    
+    Returns:
+    - The graded attempt. It is stored by the write-behind buffer within
+      `ATTEMPT_FLUSH_INTERVAL_MS`, so question stats lag by up to that long.
+    """
+    answer_key = await crud_async.get_answer_key(db, quiz_id)
+    if not answer_key and not await crud_async.get_quiz_version(db, quiz_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Quiz with ID {quiz_id} not found"
+        )
+    try:
+        attempt = _grade_attempt(quiz_id, answer_key, request)
+        attempt_buffer.add(attempt)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except BufferFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return AttemptResponse(
+        **attempt,
+        results=[
+            {**answer, "answer": answer_key[answer["question_id"]]}
+            for answer in attempt["answers"]
+        ],
+    )
+
+
+@app.get(
+    "/api/quizzes/{quiz_id}/stats",
+    response_model=List[QuestionStatsResponse]
+)
+async def get_quiz_stats(quiz_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Answer statistics of a quiz's questions over all stored attempts.
+    
+    - **quiz_id**: Quiz ID
+    
+    Returns:
+    - Per answered question: answers, correct answers, correctness rate
+      and average answer time. Read from running totals, never from the
+      answers themselves; questions nobody has answered are left out.
+    """
+    return [
+        QuestionStatsResponse(
+            question_id=stats.question_id,
+            answers=stats.answers,
+            correct=stats.correct,
+            correct_rate=round(stats.correct / stats.answers, 4) if stats.answers else 0.0,
+            average_time_ms=(
+                round(stats.total_time_ms / stats.timed_answers, 1) if stats.timed_answers else None
+            ),
+        )
+        for stats in await crud_async.get_question_stats(db, quiz_id)
+    ]
+
+
+@app.get(
+    "/api/jobs/{job_id}",
+    response_model=JobResponse,
+    responses={404: {"model": ErrorResponse}}
+)
+async def get_job(job_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the status of a background generation job.
+    
+    - **job_id**: Job ID returned by `POST /api/quizzes/generate?async=true`
+    """
+    job = await crud_async.get_job(db, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
+    if job.status == "succeeded":
+        _read_your_writes(response, written_at=job.updated_at)
+    return JobResponse.model_validate(job)
+
+
+@app.get(
+    "/api/jobs/{job_id}/events",
+    responses={404: {"model": ErrorResponse}}
+)
+async def stream_job_events(job_id: str):
+    """
+    Stream job progress as server-sent events.
+    
+    Sends a `job` event with the full job status on every change and
+    closes the stream once the job has succeeded or failed.
+    """
+    payload = await get_job_payload(job_id)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
+    
+    async def event_stream():
+        updates = job_queue.subscribe(job_id)
+        try:
+            # Re-read after subscribing so no update is missed in between
+            current = await get_job_payload(job_id)
+            yield f"event: job\ndata: {json.dumps(current)}\n\n"
+            while current["status"] not in TERMINAL_STATUSES:
+                try:
+                    latest = await asyncio.wait_for(updates.get(), timeout=5)
+                except asyncio.TimeoutError:
+                    # The job may be running in another worker process
+                    latest = await get_job_payload(job_id)
+                    if latest == current:
+                        yield ": keep-alive\n\n"
+                        continue
+                current = latest
+                yield f"event: job\ndata: {json.dumps(current)}\n\n"
+        finally:
+            job_queue.unsubscribe(job_id, updates)
+    
+    response = StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Headers go out before the job finishes: cover a running job's last
+    # LLM call; a job still queued gets the cookie from GET /api/jobs/{id}
+    if payload["status"] == "succeeded":
+        _read_your_writes(response, written_at=datetime.fromisoformat(payload["updated_at"]))
+    elif payload["status"] == "running":
+        _read_your_writes(response, pending=settings.LLM_TIMEOUT)
+    return response
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -81,7 +81,7 @@ async def generate_quiz(request: QuizGenerateRequest):
         print(f"✅ Scraped article: {article_data['title']}")
         
         # Generate quiz with LLM
-        quiz_data = generate_quiz_with_llm(
+        quiz_data = await generate_quiz_with_llm(
             title=article_data["title"],
             content=article_data["content"][:3000],  # Limit content
             num_questions=request.num_questions
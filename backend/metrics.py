@@ -0,0 +1,257 @@
+"""
+Process metrics in the Prometheus text format, served at `/metrics`.
+
+Histograms keep cumulative bucket counts per label set; recording a value
+is a bisect and a few additions under a lock, cheap enough for every
+request. Values that other modules already track (LLM queueing, cache
+counters, the DB pool, the attempt buffer) are read when `/metrics` is
+scraped instead of being counted twice.
+
+Stages of a generation, in `wikiquiz_stage_seconds{stage=...}`:
+
+- fetch: downloading the article
+- parse: HTML extraction, entities and digest
+- prompt: building the LLM prompt
+- llm: the provider call, per provider (`wikiquiz_llm_seconds` has the outcome)
+- json_parse: parsing the LLM response
+- persist: `crud.create_quiz`
+- serialize: turning a stored quiz into its JSON response
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Seconds; generous at the top end for LLM calls
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+LabelValues = Tuple[str, ...]
+# (labels, value) as read by a collector at scrape time
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._lines()
+
+    def _lines(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _lines(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(k))} {_format_value(v)}" for k, v in values]
+
+
+class Gauge(_Metric):
+    """Current value per label set."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _lines(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(k))} {_format_value(v)}" for k, v in values]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets, per label set."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the block, in seconds, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _lines(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = []
+        for key, counts, total in series:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class _Collected(_Metric):
+    """Metric whose samples are read from elsewhere at scrape time."""
+
+    def __init__(self, name: str, help: str, type: str, collect: Callable[[], Iterable[Sample]]):
+        super().__init__(name, help)
+        self.type = type
+        self._collect = collect
+
+    def _lines(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+            for labels, value in self._collect()
+        ]
+
+
+class Registry:
+    """The metrics rendered at `/metrics`, in registration order."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def collector(self, name: str, help: str, type: str = "gauge"):
+        """Decorator registering a function that returns samples at scrape time."""
+        def decorate(collect: Callable[[], Iterable[Sample]]):
+            self.register(_Collected(name, help, type, collect))
+            return collect
+        return decorate
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A broken collector must not take the other metrics down
+                lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Starlette appends the charset to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+stage_seconds = registry.register(Histogram(
+    "wikiquiz_stage_seconds", "Time spent in each stage of quiz generation.", ["stage"],
+))
+llm_seconds = registry.register(Histogram(
+    "wikiquiz_llm_seconds", "LLM provider calls, excluding time queued for limits.",
+    ["provider", "outcome"],
+))
+llm_queue_seconds = registry.register(Histogram(
+    "wikiquiz_llm_queue_seconds", "Time LLM calls waited for a concurrency slot and rate budget.",
+    ["provider"],
+))
+llm_fallbacks = registry.register(Counter(
+    "wikiquiz_llm_fallbacks_total", "Failed LLM generations answered by the offline generator.",
+    ["provider"],
+))
+generation_seconds = registry.register(Histogram(
+    "wikiquiz_generation_seconds", "End-to-end quiz generations (scrape, LLM, persist).", ["outcome"],
+))
+generations_in_flight = registry.register(Gauge(
+    "wikiquiz_generations_in_flight", "Quiz generations running in this process.", ["mode"],
+))
+db_pool_wait_seconds = registry.register(Histogram(
+    "wikiquiz_db_pool_wait_seconds", "Time spent waiting to check a connection out of the pool.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+))
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return registry.render()
@@ -0,0 +1,241 @@
+"""
+Schema migrations for existing databases.
+
+`init_db()` creates missing tables but never alters existing ones. Run this
+script once after upgrading; every migration checks the current schema
+first, so running it again is harmless.
+
+    python migrate.py
+"""
+import hashlib
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Engine
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import Base, engine, init_db
+from models import Quiz  # also registers the tables for init_db
+import search
+from snapshots import compress_html, content_hash
+from urls import canonicalize_url, url_hash
+
+BATCH_SIZE = 100
+
+
+def _columns(engine: Engine, table: str) -> set:
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def migrate_raw_html_to_snapshots(engine: Engine) -> None:
+    """Move `quizzes.raw_html` into compressed `article_snapshots` rows."""
+    if "raw_html" not in _columns(engine, "quizzes"):
+        print("  quizzes.raw_html already migrated")
+        return
+
+    moved = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT q.id, q.raw_html, q.created_at FROM quizzes q "
+                    "WHERE q.id > :last_id AND q.raw_html IS NOT NULL "
+                    "AND NOT EXISTS (SELECT 1 FROM article_snapshots s WHERE s.quiz_id = q.id) "
+                    "ORDER BY q.id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+            snapshots = []
+            for quiz_id, raw_html, created_at in rows:
+                compressed, encoding = compress_html(raw_html)
+                snapshots.append({
+                    "quiz_id": quiz_id,
+                    "content_hash": content_hash(raw_html),
+                    "encoding": encoding,
+                    "html": compressed,
+                    "size": len(raw_html.encode("utf-8")),
+                    # The fetch time wasn't recorded; the quiz was created right after
+                    "fetched_at": created_at or datetime.utcnow(),
+                })
+            conn.execute(
+                text(
+                    "INSERT INTO article_snapshots (quiz_id, content_hash, encoding, html, size, fetched_at) "
+                    "VALUES (:quiz_id, :content_hash, :encoding, :html, :size, :fetched_at)"
+                ),
+                snapshots,
+            )
+        moved += len(rows)
+        last_id = rows[-1][0]
+        print(f"  moved {moved} snapshots")
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE quizzes DROP COLUMN raw_html"))
+    print(f"  dropped quizzes.raw_html ({moved} snapshots moved)")
+
+
+def migrate_url_hash(engine: Engine) -> None:
+    """
+    Add `quizzes.url_hash`, canonicalize stored URLs and move uniqueness
+    from the URL string to the hash.
+
+    Rows whose URLs canonicalize to the same article as an older row keep
+    their original URL and get a hash that no lookup produces, so they
+    stay reachable by id but the oldest quiz serves the cache.
+    """
+    indexes = {index["name"] for index in inspect(engine).get_indexes("quizzes")}
+    if "url_hash" in _columns(engine, "quizzes") and "ix_quizzes_url" not in indexes:
+        print("  quizzes.url_hash already migrated")
+        return
+
+    if "url_hash" not in _columns(engine, "quizzes"):
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE quizzes ADD COLUMN url_hash VARCHAR(64)"))
+
+    updated = duplicates = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, url FROM quizzes WHERE id > :last_id AND url_hash IS NULL "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+            hashes = {quiz_id: url_hash(url) for quiz_id, url in rows}
+            taken = {
+                row[0]
+                for row in conn.execute(
+                    text("SELECT url_hash FROM quizzes WHERE url_hash IN :hashes").bindparams(
+                        bindparam("hashes", expanding=True)
+                    ),
+                    {"hashes": list(set(hashes.values()))},
+                )
+            }
+            updates = []
+            for quiz_id, url in rows:
+                if hashes[quiz_id] in taken:
+                    duplicates += 1
+                    print(f"  quiz {quiz_id} duplicates an older quiz for {canonicalize_url(url)}")
+                    # Not the hash of any URL, so lookups never land on this row
+                    placeholder = hashlib.sha256(f"duplicate:{quiz_id}:{url}".encode("utf-8")).hexdigest()
+                    updates.append({"id": quiz_id, "url": url, "url_hash": placeholder})
+                else:
+                    taken.add(hashes[quiz_id])
+                    updates.append({"id": quiz_id, "url": canonicalize_url(url), "url_hash": hashes[quiz_id]})
+            conn.execute(
+                text("UPDATE quizzes SET url = :url, url_hash = :url_hash WHERE id = :id"),
+                updates,
+            )
+        updated += len(rows)
+        last_id = rows[-1][0]
+        print(f"  hashed {updated} URLs")
+
+    for index in Quiz.__table__.indexes:
+        if index.name == "ix_quizzes_url_hash":
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE quizzes ALTER COLUMN url_hash SET NOT NULL"))
+        if "ix_quizzes_url" in indexes:
+            conn.execute(text("DROP INDEX ix_quizzes_url"))
+    print(f"  moved the URL index to quizzes.url_hash ({duplicates} duplicate URLs found)")
+
+
+def add_job_batch_id(engine: Engine) -> None:
+    """Add `generation_jobs.batch_id` for bulk generation batches."""
+    if "batch_id" in _columns(engine, "generation_jobs"):
+        print("  generation_jobs.batch_id already exists")
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE generation_jobs ADD COLUMN batch_id VARCHAR(36)"))
+    print("  added generation_jobs.batch_id")
+
+
+def add_question_minhash(engine: Engine) -> None:
+    """Add `questions.minhash` and `questions.duplicate_of` for near-duplicate detection."""
+    columns = _columns(engine, "questions")
+    if {"minhash", "duplicate_of"} <= columns:
+        print("  questions.minhash already exists")
+        return
+    blob = "BYTEA" if engine.dialect.name == "postgresql" else "BLOB"
+    with engine.begin() as conn:
+        if "minhash" not in columns:
+            conn.execute(text(f"ALTER TABLE questions ADD COLUMN minhash {blob}"))
+        if "duplicate_of" not in columns:
+            conn.execute(text(
+                "ALTER TABLE questions ADD COLUMN duplicate_of INTEGER "
+                "REFERENCES questions (id) ON DELETE SET NULL"
+            ))
+    print("  added questions.minhash and questions.duplicate_of "
+          "(run dedupe_questions.py to sign existing questions)")
+
+
+def add_search_index(engine: Engine) -> None:
+    """Create the full-text search index and add the quizzes stored before it."""
+    if engine.dialect.name not in search.SEARCH_DIALECTS:
+        print(f"  no full-text search on {engine.dialect.name}")
+        return
+    with engine.begin() as conn:
+        search.create_search_index(conn)
+    print(f"  indexed {search.index_missing_quizzes(engine, BATCH_SIZE)} quizzes for search")
+
+
+def normalize_sqlite_timestamps(engine: Engine) -> None:
+    """
+    Rewrite whole-second `quizzes.created_at` values in SQLite's storage
+    format for datetimes (`YYYY-MM-DD HH:MM:SS.ffffff`).
+
+    Rows stored before `created_at` got a Python default took SQLite's
+    CURRENT_TIMESTAMP, without microseconds. SQLite compares them as
+    strings, so against a page cursor they sort below their own bound
+    value and the quiz list pages through them forever.
+    """
+    if engine.dialect.name != "sqlite":
+        print(f"  {engine.dialect.name} compares timestamps natively")
+        return
+    with engine.begin() as conn:
+        updated = conn.execute(text(
+            "UPDATE quizzes SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+        )).rowcount
+    print(f"  normalized {updated} quiz timestamps")
+
+
+def create_missing_indexes(engine: Engine) -> None:
+    """Create indexes added to models after their tables already existed."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+MIGRATIONS = [
+    ("Move raw HTML to compressed article snapshots", migrate_raw_html_to_snapshots),
+    ("Canonicalize quiz URLs and index them by hash", migrate_url_hash),
+    ("Add batch ids to generation jobs", add_job_batch_id),
+    ("Add MinHash signatures to questions", add_question_minhash),
+    ("Normalize SQLite quiz timestamps", normalize_sqlite_timestamps),
+    ("Create missing indexes", create_missing_indexes),
+    ("Build the quiz search index", add_search_index),
+]
+
+
+def run_migrations() -> None:
+    """Create missing tables, then apply each migration in order."""
+    init_db()
+    for description, migration in MIGRATIONS:
+        print(f"{description}...")
+        migration(engine)
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print("Done!")
@@ -1,7 +1,10 @@
 """
 SQLAlchemy models for Quiz and Question entities.
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import (
+    Column, Integer, BigInteger, SmallInteger, String, Text, DateTime, JSON, ForeignKey,
+    LargeBinary, Index, Boolean,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -12,9 +15,17 @@ class Quiz(Base):
     """Quiz model representing a Wikipedia article quiz."""
     
     __tablename__ = "quizzes"
+    __table_args__ = (
+        # Keyset pagination for the quiz list: ORDER BY created_at DESC, id DESC
+        Index("ix_quizzes_created_at_id", "created_at", "id"),
+    )
+    # Fetch server defaults (created_at) in the INSERT so new rows need no refresh
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
-    url = Column(String(2048), unique=True, index=True, nullable=False)
+    url = Column(String(2048), nullable=False)  # Canonical form, see urls.canonicalize_url
+    # Lookups and uniqueness go through this fixed-width key, not the URL itself
+    url_hash = Column(String(64), unique=True, index=True, nullable=False)  # urls.url_hash
     title = Column(String(255), nullable=False)
     summary = Column(Text, nullable=False)
     key_entities = Column(
@@ -24,11 +35,25 @@ class Quiz(Base):
     )
     sections = Column(JSON, nullable=False, default=[])
     related_topics = Column(JSON, nullable=False, default=[])
-    raw_html = Column(Text, nullable=True)  # Bonus: store raw HTML
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    # Set client-side too, so every row has the same microsecond precision and
+    # the (created_at, id) pagination cursor compares exactly on every backend
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
     
     # Relationship to questions
-    questions = relationship("Question", back_populates="quiz", cascade="all, delete-orphan")
+    questions = relationship(
+        "Question",
+        back_populates="quiz",
+        cascade="all, delete-orphan",
+        order_by="Question.id",
+    )
+    
+    # Raw article HTML lives in its own table, loaded only on access
+    snapshot = relationship(
+        "ArticleSnapshot",
+        back_populates="quiz",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
 
 
 class Question(Base):
@@ -43,6 +68,116 @@ class Question(Base):
     answer = Column(String(500), nullable=False)
     difficulty = Column(String(20), nullable=False, default="medium")  # easy, medium, hard
     explanation = Column(Text, nullable=False)
+    # MinHash signature of the question and answer words, see dedupe.py
+    minhash = Column(LargeBinary, nullable=True)
+    # Earlier question this one nearly duplicates, flagged at insert time
+    duplicate_of = Column(Integer, ForeignKey("questions.id", ondelete="SET NULL"), nullable=True, index=True)
     
     # Relationship to quiz
     quiz = relationship("Quiz", back_populates="questions")
+
+
+class QuestionBand(Base):
+    """LSH band index over question MinHash signatures (one row per band)."""
+    
+    __tablename__ = "question_lsh_bands"
+    
+    # Primary key order serves the candidate lookup by bucket; buckets are
+    # 64-bit hashes, so a bucket almost never mixes bands
+    bucket = Column(BigInteger, primary_key=True)  # Hash of the band's signature values
+    band = Column(SmallInteger, primary_key=True)
+    question_id = Column(
+        Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+class ArticleSnapshot(Base):
+    """Compressed raw HTML of the scraped article (bonus: store raw HTML)."""
+    
+    __tablename__ = "article_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), unique=True, nullable=False)
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the uncompressed HTML
+    encoding = Column(String(10), nullable=False)  # zstd or gzip
+    html = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # Uncompressed size in bytes
+    fetched_at = Column(DateTime, server_default=func.now(), nullable=False)
+    
+    # Relationship to quiz
+    quiz = relationship("Quiz", back_populates="snapshot")
+
+
+class GenerationJob(Base):
+    """Background quiz generation job, persisted so it survives restarts."""
+    
+    __tablename__ = "generation_jobs"
+    
+    id = Column(String(36), primary_key=True)  # UUID4
+    url = Column(String(2048), nullable=False)
+    batch_id = Column(String(36), nullable=True, index=True)  # Set for jobs from POST /api/quizzes/bulk
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    stage = Column(String(20), nullable=True)  # scraping, generating, saving
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class QuizAttempt(Base):
+    """One submission of answers to a quiz, written through the write-behind buffer."""
+    
+    __tablename__ = "quiz_attempts"
+    
+    id = Column(String(36), primary_key=True)  # UUID4, assigned before the row is written
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String(255), nullable=True, index=True)  # Supplied by the client; None if anonymous
+    score = Column(Integer, nullable=False)  # Correct answers
+    total = Column(Integer, nullable=False)  # Answered questions
+    duration_ms = Column(Integer, nullable=True)
+    submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AttemptAnswer(Base):
+    """Answer to one question within an attempt."""
+    
+    __tablename__ = "attempt_answers"
+    
+    id = Column(Integer, primary_key=True)
+    attempt_id = Column(String(36), ForeignKey("quiz_attempts.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
+    selected = Column(String(500), nullable=False)
+    correct = Column(Boolean, nullable=False)
+    time_ms = Column(Integer, nullable=True)
+
+
+class QuestionStats(Base):
+    """
+    Running answer counts per question, incremented with every flushed
+    batch of attempts so stats never aggregate `attempt_answers`.
+    """
+    
+    __tablename__ = "question_stats"
+    
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    # Denormalized so a quiz's stats are read from this table alone
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    answers = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    timed_answers = Column(Integer, nullable=False, default=0)  # Answers that reported time_ms
+    total_time_ms = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class LLMCacheEntry(Base):
+    """Memoized LLM output, keyed by prompt version, model and article text."""
+    
+    __tablename__ = "llm_cache"
+    
+    key = Column(String(64), primary_key=True)  # SHA-256, see llm_cache.cache_key
+    model = Column(String(100), nullable=False)
+    prompt_version = Column(String(50), nullable=False)
+    result = Column(JSON, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
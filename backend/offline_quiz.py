@@ -0,0 +1,403 @@
+"""
+Rule-based quiz generation without an LLM.
+
+Builds a quiz from the article text alone, in milliseconds and without
+network access:
+
+- cloze questions: a sentence with a name, year or number blanked out
+- "which of these is true" questions: a sentence from the article against
+  copies of it with one name swapped for another of the same kind
+
+Distractors are names of the same kind from the same article (link texts
+and capitalized phrases), nearby years, or scaled numbers. Difficulty
+follows the sentence's position in the article and how rare the answer is
+in it. The same input always gives the same quiz.
+
+Used when no LLM is configured, when a provider call fails, and for the
+instant preview (`POST /api/quizzes/preview`).
+"""
+import hashlib
+import random
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from entities import EVENT_WORDS, ORGANIZATION_WORDS, PLACE_PREPOSITIONS, PLACE_WORDS
+from summarizer import STOPWORDS, split_sentences
+
+MAX_QUESTIONS = 10
+# Every third question is a "which of these" question when possible
+STATEMENT_EVERY = 3
+MIN_WORDS, MAX_WORDS = 6, 45
+MAX_STATEMENT_WORDS = 30
+BLANK = "_____"
+
+_YEAR = re.compile(r"\b(?:1[0-9]{3}|20[0-9]{2})\b")
+_NUMBER = re.compile(r"\b\d{1,3}(?:,\d{3})+\b|\b\d+(?:\.\d+)?\b")
+# Capitalized words, optionally joined by lowercase particles ("University of Cambridge")
+_NAME = re.compile(
+    r"[A-Z][\w'’-]*\w(?:\s+(?:(?:of|the|de|da|di|del|von|van|der|du|la|le|and)\s+)?[A-Z][\w'’-]*\w)*"
+)
+_HEADING = re.compile(r"^## (.+)$")
+
+_LEADING_WORDS = STOPWORDS | {
+    "although", "because", "despite", "following", "here", "later", "many",
+    "meanwhile", "since", "though", "thus", "today", "until", "upon", "when",
+    "where", "whose", "why", "yet",
+}
+
+
+class _Sentence:
+    __slots__ = ("text", "section", "position")
+
+    def __init__(self, text: str, section: str, position: float):
+        self.text = text
+        self.section = section
+        self.position = position
+
+
+def _sentences(
+    content: str,
+    passages: Sequence[Tuple[str, str]] = (),
+) -> Tuple[List[_Sentence], List[str]]:
+    """Sentences with their section and relative position, and the section headings."""
+    pieces: List[Tuple[str, str]] = []
+    headings: List[str] = []
+    section = ""
+    for line in content.splitlines():
+        heading = _HEADING.match(line.strip())
+        if heading:
+            section = heading.group(1).strip()
+            headings.append(section)
+            continue
+        pieces.extend((section, sentence) for sentence in split_sentences(line))
+    if not headings and passages:
+        pieces = _label_sections(content, passages)
+    total = max(len(pieces), 1)
+    return [_Sentence(text, sec, i / total) for i, (sec, text) in enumerate(pieces)], headings
+
+
+def _label_sections(
+    content: str,
+    passages: Sequence[Tuple[str, str]],
+) -> List[Tuple[str, str]]:
+    """
+    (section, sentence) pieces of plain text without "## " headings (the
+    truncated article), with each paragraph's section taken from the
+    scraped passage it was joined from.
+    """
+    pieces: List[Tuple[str, str]] = []
+    position = 0
+    for section, text in passages:
+        start = content.find(text, position)
+        if start < 0:
+            # The text is cut off in the middle of its last paragraph
+            rest = content[position:].strip()
+            if not rest or not text.startswith(rest):
+                break
+            start = content.index(rest, position)
+        end = min(start + len(text), len(content))
+        for line in content[start:end].splitlines():
+            pieces.extend((section, sentence) for sentence in split_sentences(line))
+        position = end
+    return pieces
+
+
+def _strip_leading(phrase: str) -> str:
+    """Drop sentence-initial function words picked up as capitalized ("In London")."""
+    words = phrase.split()
+    while words and words[0].lower() in _LEADING_WORDS:
+        words.pop(0)
+    return " ".join(words)
+
+
+def _token_span(text: str, phrase: str) -> Optional[Tuple[int, int]]:
+    """
+    Span of the first occurrence of `phrase` that isn't part of a longer
+    word or number ("2" in "12" or "2.5"), or None if there is none.
+    """
+    match = re.search(rf"(?<!\w)(?<!\d[.,]){re.escape(phrase)}(?!\w)(?![.,]\d)", text)
+    return match.span() if match else None
+
+
+def _splice(text: str, span: Tuple[int, int], replacement: str) -> str:
+    return text[:span[0]] + replacement + text[span[1]:]
+
+
+def _entity_type(phrase: str, before: str) -> str:
+    """Guess what kind of name a phrase is from its words and the word before it."""
+    words = [w.lower() for w in phrase.split()]
+    if any(w in ORGANIZATION_WORDS for w in words):
+        return "organization"
+    if any(w in EVENT_WORDS for w in words):
+        return "event"
+    previous = before.split()[-1].lower() if before.split() else ""
+    if words[-1] in PLACE_WORDS or previous in PLACE_PREPOSITIONS:
+        return "location"
+    if 2 <= len(words) <= 4 and all(w[0].isupper() for w in phrase.split()):
+        return "person"
+    return "name"
+
+
+def _names(sentence: str, links: Sequence[str], title_words: set) -> List[Tuple[str, str]]:
+    """(phrase, kind) for the names in a sentence, link texts first."""
+    found: Dict[str, str] = {}
+    for link in links:
+        start = sentence.find(link)
+        if start >= 0 and link not in found:
+            found[link] = _entity_type(link, sentence[:start])
+    for match in _NAME.finditer(sentence):
+        phrase = _strip_leading(match.group())
+        if not phrase or any(phrase in name or name in phrase for name in found):
+            continue
+        words = phrase.lower().split()
+        # Names made only of the article's own title words give the answer
+        # away; a single capitalized word may just start the sentence
+        if all(w in title_words for w in words):
+            continue
+        if len(words) == 1 and not sentence[:match.start()].strip():
+            continue
+        found[phrase] = _entity_type(phrase, sentence[:match.start()])
+    return list(found.items())
+
+
+class _Generator:
+    def __init__(
+        self,
+        title: str,
+        content: str,
+        links: Sequence[str],
+        passages: Sequence[Tuple[str, str]] = (),
+    ):
+        self.title = title
+        self.content = content
+        self.rng = random.Random(hashlib.sha256(f"{title}\n{content}".encode("utf-8")).hexdigest())
+        self.sentences, self.headings = _sentences(content, passages)
+        self.title_words = {w.lower() for w in re.findall(r"\w+", title)}
+        links = [link for link in links if link and link.lower() != title.lower()]
+        self.links = links
+        self.link_set = set(links)
+
+        # Names of each kind across the article, most frequent first
+        self.names_in: List[List[Tuple[str, str]]] = []
+        kinds: Dict[str, Counter] = defaultdict(Counter)
+        for sentence in self.sentences:
+            names = _names(sentence.text, links, self.title_words)
+            self.names_in.append(names)
+            for phrase, kind in names:
+                kinds[phrase][kind] += 1
+        self.kind_of = {phrase: counts.most_common(1)[0][0] for phrase, counts in kinds.items()}
+        self.pool: Dict[str, List[str]] = defaultdict(list)
+        for phrase, counts in sorted(kinds.items(), key=lambda item: -sum(item[1].values())):
+            self.pool[self.kind_of[phrase]].append(phrase)
+        self.years = sorted({int(y) for y in _YEAR.findall(content)})
+
+    # Distractors
+
+    def _name_distractors(self, answer: str, sentence: str) -> Optional[List[str]]:
+        answer_lower = answer.lower()
+        kind = self.kind_of.get(answer, "name")
+        candidates = [
+            name for name in self.pool[kind]
+            if name != answer
+            and (kind != "name" or name in self.link_set)
+            and name.lower() not in answer_lower and answer_lower not in name.lower()
+            and name not in sentence
+        ]
+        if len(candidates) < 3:
+            return None
+        # Prefer names of a similar length, so the answer doesn't stand out
+        candidates.sort(key=lambda name: abs(len(name.split()) - len(answer.split())))
+        shortlist = candidates[:6]
+        return self.rng.sample(shortlist, 3)
+
+    def _year_distractors(self, answer: str) -> List[str]:
+        year = int(answer)
+        nearby = [y for y in self.years if y != year and abs(y - year) <= 50]
+        choices = self.rng.sample(nearby, min(3, len(nearby)))
+        offsets = list(range(-10, 11))
+        self.rng.shuffle(offsets)
+        for offset in offsets:
+            if len(choices) == 3:
+                break
+            if offset and year + offset not in choices:
+                choices.append(year + offset)
+        return [str(y) for y in choices]
+
+    def _number_distractors(self, answer: str) -> List[str]:
+        value = float(answer.replace(",", ""))
+        integer = "." not in answer
+        choices: List[str] = []
+        factors = [0.5, 2, 1.5, 0.75, 3, 1.25]
+        self.rng.shuffle(factors)
+        for factor in factors:
+            scaled = value * factor
+            if integer:
+                scaled = int(round(scaled))
+                text = f"{scaled:,}" if "," in answer else str(scaled)
+            else:
+                text = f"{scaled:.{len(answer.split('.')[1])}f}"
+            if text != answer and text not in choices:
+                choices.append(text)
+            if len(choices) == 3:
+                break
+        return choices if len(choices) == 3 else []
+
+    # Questions
+
+    def _answerable_names(self, index: int) -> List[str]:
+        # Lone capitalized words ("English", "Hut") are often adjectives or
+        # parts of longer names; only link texts are trusted as answers
+        return [
+            phrase for phrase, kind in self.names_in[index]
+            if self.kind_of[phrase] != "name" or phrase in self.link_set
+        ]
+
+    def _difficulty(self, sentence: _Sentence, answer: str) -> str:
+        occurrences = max(self.content.count(answer), 1)
+        score = 0.5 * sentence.position + 0.5 / occurrences
+        if score < 0.4:
+            return "easy"
+        if score < 0.7:
+            return "medium"
+        return "hard"
+
+    def _options(self, answer: str, distractors: List[str]) -> List[str]:
+        options = [answer] + distractors
+        self.rng.shuffle(options)
+        return options
+
+    def _cloze(self, index: int) -> Optional[Dict[str, Any]]:
+        sentence = self.sentences[index]
+        text = sentence.text
+        candidates: List[Tuple[str, List[str]]] = []
+        for phrase in self._answerable_names(index):
+            distractors = self._name_distractors(phrase, text)
+            if distractors:
+                candidates.append((phrase, distractors))
+        for year in _YEAR.findall(text):
+            candidates.append((year, self._year_distractors(year)))
+        for number in _NUMBER.findall(text):
+            if not _YEAR.fullmatch(number) and float(number.replace(",", "")) >= 2:
+                distractors = self._number_distractors(number)
+                if distractors:
+                    candidates.append((number, distractors))
+        # Names make better questions than dates, dates better than counts;
+        # only the answer's own occurrence is blanked
+        for answer, distractors in candidates:
+            span = _token_span(text, answer) if answer not in self.used_answers else None
+            if span:
+                break
+        else:
+            return None
+        self.used_answers.add(answer)
+        return {
+            "question": f"Fill in the blank: {_splice(text, span, BLANK)}",
+            "options": self._options(answer, distractors),
+            "answer": answer,
+            "difficulty": self._difficulty(sentence, answer),
+            "explanation": f'The article states: "{text}"',
+        }
+
+    def _statement(self, index: int) -> Optional[Dict[str, Any]]:
+        sentence = self.sentences[index]
+        text = sentence.text
+        if len(text.split()) > MAX_STATEMENT_WORDS:
+            return None
+        for phrase in self._answerable_names(index):
+            if phrase in self.used_answers:
+                continue
+            span = _token_span(text, phrase)
+            distractors = self._name_distractors(phrase, text) if span else None
+            if not distractors:
+                continue
+            self.used_answers.add(phrase)
+            return {
+                "question": f"Which of these statements about {self.title} is true?",
+                "options": self._options(text, [_splice(text, span, d) for d in distractors]),
+                "answer": text,
+                "difficulty": self._difficulty(sentence, phrase),
+                "explanation": (
+                    f"The article mentions {phrase} here; the other statements "
+                    f"swap in {', '.join(distractors[:2])} and {distractors[2]}."
+                ),
+            }
+        return None
+
+    def questions(self) -> List[Dict[str, Any]]:
+        self.used_answers: set = set()
+        usable = [
+            i for i, s in enumerate(self.sentences)
+            if MIN_WORDS <= len(s.text.split()) <= MAX_WORDS and s.text[0].isupper()
+        ]
+        # Walk the sections round-robin so questions cover the whole article
+        by_section: Dict[str, List[int]] = defaultdict(list)
+        for i in usable:
+            by_section[self.sentences[i].section].append(i)
+        order: List[int] = []
+        queues = [list(indexes) for indexes in by_section.values()]
+        while any(queues):
+            for queue in queues:
+                if queue:
+                    order.append(queue.pop(0))
+
+        questions: List[Dict[str, Any]] = []
+        for i in order:
+            if len(questions) >= MAX_QUESTIONS:
+                break
+            question = None
+            if (len(questions) + 1) % STATEMENT_EVERY == 0:
+                question = self._statement(i)
+            question = question or self._cloze(i)
+            if question:
+                questions.append(question)
+        return questions
+
+    # Other fields
+
+    def summary(self) -> str:
+        lead = [s.text for s in self.sentences if s.section == ""] or [s.text for s in self.sentences]
+        return " ".join(lead[:2]) or f"{self.title} is the subject of this article."
+
+    def key_entities(self) -> Dict[str, List[str]]:
+        entities = {"people": [], "organizations": [], "locations": []}
+        for kind, key in (("person", "people"), ("organization", "organizations"), ("location", "locations")):
+            entities[key] = self.pool.get(kind, [])[:8]
+        return entities
+
+    def related_topics(self) -> List[str]:
+        topics = self.links or [name for names in self.pool.values() for name in names]
+        return topics[:5]
+
+
+def generate_offline_quiz(
+    title: str,
+    content: str,
+    links: Iterable[str] = (),
+    passages: Sequence[Tuple[str, str]] = (),
+) -> Dict[str, Any]:
+    """
+    Generate a quiz from article text with rules only.
+
+    Args:
+        title: Article title
+        content: Article text (the LLM input: digest or truncated text)
+        links: Texts of the article's links to other articles, which make
+            the best answers and distractors
+        passages: The scraper's (section heading, paragraph) pairs; they
+            label the sentences of truncated text, which has no "## "
+            headings, with their sections (its `sections` stay empty, and
+            callers use the scraped headings)
+
+    Returns:
+        Dictionary with the same structure as the LLM output: summary,
+        key_entities, sections, related_topics and quiz
+    """
+    generator = _Generator(title, content, list(links), passages)
+    return {
+        "summary": generator.summary(),
+        "key_entities": generator.key_entities(),
+        "sections": generator.headings,
+        "related_topics": generator.related_topics(),
+        "quiz": generator.questions(),
+    }
@@ -0,0 +1,301 @@
+"""
+Quiz generation pipeline: scrape -> LLM -> persist.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+from database import SessionLocal
+import crud
+import metrics
+from schemas import QuizResponse
+from singleflight import SingleFlight, advisory_lock
+from offline_quiz import generate_offline_quiz
+from urls import resolve_url
+from utils import scrape_wikipedia_async, generate_quiz_with_llm, stream_quiz_with_llm
+
+logger = logging.getLogger(__name__)
+
+# In-flight generations in this process, keyed by canonical URL
+generation_flights = SingleFlight()
+
+
+StageCallback = Callable[[str], Awaitable[None]]
+
+
+class StageLimits:
+    """
+    Scrape concurrency for this process.
+
+    LLM calls are limited per provider in llm_clients.py; a run waiting for
+    an LLM slot doesn't hold up scrapes for other URLs.
+    """
+
+    def __init__(self, scrape: int):
+        self.scrape = scrape
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def scrape_slot(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; recreate it for a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._scrape_slots = asyncio.Semaphore(self.scrape)
+            self._loop = loop
+        return self._scrape_slots
+
+    @classmethod
+    def from_settings(cls) -> "StageLimits":
+        return cls(scrape=settings.SCRAPE_CONCURRENCY)
+
+
+# Shared by interactive requests, background jobs and bulk runs
+stage_limits = StageLimits.from_settings()
+
+
+async def _report(on_stage: Optional[StageCallback], stage: str) -> None:
+    if on_stage is not None:
+        await on_stage(stage)
+
+
+@contextmanager
+def _generation_metrics(mode: str):
+    """Count a generation as in flight and record its duration and outcome."""
+    start = time.perf_counter()
+    outcome = "error"
+    with metrics.generations_in_flight.track(mode=mode):
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            metrics.generation_seconds.observe(time.perf_counter() - start, outcome=outcome)
+
+
+async def _run_pipeline(url: str, on_stage: Optional[StageCallback] = None) -> QuizResponse:
+    """
+    Scrape the article, generate the quiz and store it.
+
+    Uses its own database session because the run is shared by every
+    request waiting on the same URL and may outlive any one of them.
+
+    Args:
+        url: Wikipedia article URL
+        on_stage: Awaited with "scraping", "generating" and "saving"
+
+    Returns:
+        The stored quiz
+    """
+    with _generation_metrics("generate"):
+        # 1. Scrape Wikipedia
+        await _report(on_stage, "scraping")
+        async with stage_limits.scrape_slot():
+            logger.info(f"Scraping Wikipedia: {url}")
+            scraped_data = await scrape_wikipedia_async(url)
+
+        # 2. Generate quiz with LLM (queued behind the provider's limits)
+        await _report(on_stage, "generating")
+        logger.info("Generating quiz with LLM...")
+        llm_output = await generate_quiz_with_llm(
+            scraped_data["title"],
+            scraped_data["content"],
+            scraped_data.get("links", ()),
+            scraped_data.get("passages", ()),
+        )
+
+        # 3. Save to database
+        await _report(on_stage, "saving")
+        return await asyncio.to_thread(_save_quiz, url, scraped_data, llm_output)
+
+
+def _key_entities(scraped_data: Dict[str, Any], generated: Dict[str, Any]) -> Dict[str, Any]:
+    """Entities extracted from the page (LOCAL_ENTITIES) if any were found, else the generated ones."""
+    extracted = scraped_data.get("key_entities")
+    if extracted and any(extracted.values()):
+        return extracted
+    return generated.get("key_entities") or {}
+
+
+def _save_quiz(url: str, scraped_data: Dict[str, Any], llm_output: Dict[str, Any]) -> QuizResponse:
+    logger.info("Saving quiz to database...")
+    with SessionLocal() as db, metrics.stage_seconds.time(stage="persist"):
+        db_quiz = crud.create_quiz(
+            db=db,
+            url=url,
+            title=scraped_data["title"],
+            summary=llm_output["summary"],
+            key_entities=_key_entities(scraped_data, llm_output),
+            sections=llm_output["sections"] or scraped_data.get("sections", []),
+            related_topics=llm_output["related_topics"],
+            questions=llm_output["quiz"],
+            raw_html=scraped_data.get("raw_html"),
+            fetched_at=scraped_data.get("fetched_at"),
+        )
+    with metrics.stage_seconds.time(stage="serialize"):
+        return QuizResponse.model_validate(db_quiz)
+
+
+def _stored_quiz(url: str) -> Optional[QuizResponse]:
+    with SessionLocal() as db:
+        existing = crud.get_quiz_by_url(db, url)
+        return QuizResponse.model_validate(existing) if existing else None
+
+
+async def _generate_once(url: str, on_stage: Optional[StageCallback]) -> QuizResponse:
+    """Run the pipeline for `url` unless a quiz for it is already stored."""
+    # Callers check the cache with the URL they were given; a resolved
+    # redirect target may already have a quiz under its own URL
+    existing = await asyncio.to_thread(_stored_quiz, url)
+    if existing:
+        logger.info(f"Quiz already exists for URL: {url}")
+        return existing
+    if settings.SINGLE_FLIGHT_MODE != "advisory":
+        return await _run_pipeline(url, on_stage)
+
+    async with advisory_lock(url, timeout=settings.GENERATION_LOCK_TIMEOUT):
+        # The previous lock holder may have just finished this URL
+        existing = await asyncio.to_thread(_stored_quiz, url)
+        if existing:
+            logger.info(f"Quiz generated by another worker for URL: {url}")
+            return existing
+        return await _run_pipeline(url, on_stage)
+
+
+async def generate_quiz_for_url(url: str, on_stage: Optional[StageCallback] = None) -> QuizResponse:
+    """
+    Generate and store a quiz for `url`, coalescing concurrent calls.
+
+    The URL is canonicalized (and, with RESOLVE_WIKIPEDIA_REDIRECTS,
+    resolved) first, so every spelling of it shares one cached quiz.
+    Concurrent callers for the same URL share one scrape and one LLM call.
+    With SINGLE_FLIGHT_MODE=advisory, workers also serialize on a database
+    advisory lock so only one of them generates each URL.
+
+    Args:
+        url: Wikipedia article URL
+        on_stage: Progress callback; only the caller that starts the run
+            receives stage updates
+
+    Returns:
+        The stored quiz, serialized once and shared by all waiting callers
+    """
+    url = await resolve_url(url)
+    return await generation_flights.do(url, lambda: _generate_once(url, on_stage))
+
+
+# ("article", {"url", "title"}), ("summary", text), ("question", question)
+# per question, then ("quiz", QuizResponse)
+PipelineEvent = Tuple[str, Any]
+
+
+def _quiz_events(quiz: QuizResponse):
+    yield "article", {"url": quiz.url, "title": quiz.title}
+    yield "summary", quiz.summary
+    for question in quiz.questions:
+        yield "question", question.model_dump()
+    yield "quiz", quiz
+
+
+@asynccontextmanager
+async def _generation_lock(url: str):
+    if settings.SINGLE_FLIGHT_MODE == "advisory":
+        async with advisory_lock(url, timeout=settings.GENERATION_LOCK_TIMEOUT):
+            yield
+    else:
+        yield
+
+
+async def stream_quiz_for_url(url: str) -> AsyncIterator[PipelineEvent]:
+    """
+    Generate and store a quiz for `url`, yielding its parts as they are ready.
+
+    The summary and each question are yielded while the LLM is still
+    writing the rest, and the stored quiz comes last. A quiz that is
+    already stored, or being generated by another request in this
+    process, is yielded from that result instead of generating it again.
+    A streaming run is not joined by concurrent callers of
+    `generate_quiz_for_url`; if both generate the same URL, the unique
+    URL hash keeps one quiz.
+
+    Args:
+        url: Wikipedia article URL
+
+    Yields:
+        ("article", {"url", "title"}) once the article is scraped,
+        ("summary", str), ("question", dict) per question, and finally
+        ("quiz", QuizResponse)
+    """
+    url = await resolve_url(url)
+    existing = await asyncio.to_thread(_stored_quiz, url)
+    if existing is None and generation_flights.running(url):
+        existing = await generation_flights.do(url, lambda: _generate_once(url, None))
+    if existing is not None:
+        for event in _quiz_events(existing):
+            yield event
+        return
+
+    async with _generation_lock(url):
+        if settings.SINGLE_FLIGHT_MODE == "advisory":
+            # The previous lock holder may have just finished this URL
+            existing = await asyncio.to_thread(_stored_quiz, url)
+            if existing is not None:
+                for event in _quiz_events(existing):
+                    yield event
+                return
+
+        with _generation_metrics("stream"):
+            async with stage_limits.scrape_slot():
+                logger.info(f"Scraping Wikipedia: {url}")
+                scraped_data = await scrape_wikipedia_async(url)
+            yield "article", {"url": url, "title": scraped_data["title"]}
+
+            logger.info("Streaming quiz from LLM...")
+            llm_output = None
+            async for kind, value in stream_quiz_with_llm(
+                scraped_data["title"], scraped_data["content"],
+                scraped_data.get("links", ()), scraped_data.get("passages", ()),
+            ):
+                if kind == "result":
+                    llm_output = value
+                else:
+                    yield kind, value
+
+            quiz = await asyncio.to_thread(_save_quiz, url, scraped_data, llm_output)
+        yield "quiz", quiz
+
+
+async def preview_quiz_for_url(url: str) -> Dict[str, Any]:
+    """
+    A quiz for `url` right away, without waiting for the LLM.
+
+    Returns the stored quiz if there is one; otherwise scrapes the article
+    and builds a rule-based quiz (offline_quiz.py), which is not stored.
+
+    Args:
+        url: Wikipedia article URL
+
+    Returns:
+        Preview fields (see schemas.QuizPreviewResponse)
+    """
+    url = await resolve_url(url)
+    existing = await asyncio.to_thread(_stored_quiz, url)
+    if existing is not None:
+        return {**existing.model_dump(), "source": "stored"}
+
+    async with stage_limits.scrape_slot():
+        scraped_data = await scrape_wikipedia_async(url)
+    quiz = generate_offline_quiz(
+        scraped_data["title"], scraped_data["content"],
+        scraped_data.get("links", ()), scraped_data.get("passages", ()),
+    )
+    return {
+        "url": url,
+        "title": scraped_data["title"],
+        "source": "offline",
+        "summary": quiz["summary"],
+        "key_entities": _key_entities(scraped_data, quiz),
+        "sections": quiz["sections"] or scraped_data.get("sections", []),
+        "related_topics": quiz["related_topics"],
+        "questions": quiz["quiz"],
+    }
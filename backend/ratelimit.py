@@ -0,0 +1,59 @@
+"""
+Async rate limiting for outbound provider calls.
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Token bucket: at most `rate` acquisitions per `per` seconds, with bursts
+    of up to `capacity` (defaults to `rate`).
+
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, capacity: Optional[float] = None):
+        self.rate = rate
+        self.per = per
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        # One lock per event loop, so a module-level limiter works across
+        # asyncio.run() calls (CLI) and test clients
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """
+        Wait until `tokens` are available and take them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) * self.per / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation.
 """
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from typing import List, Dict, Optional
 from datetime import datetime
 
@@ -15,6 +15,7 @@ class KeyEntities(BaseModel):
 
 class QuestionSchema(BaseModel):
     """Question schema for quiz."""
+    id: Optional[int] = None  # Stored questions only; answers are submitted by id
     question: str
     options: List[str]
     answer: str
@@ -46,6 +47,19 @@ class QuizResponse(BaseModel):
         from_attributes = True
 
 
+class QuizPreviewResponse(BaseModel):
+    """Quick quiz for first paint: the stored quiz, or a rule-based one."""
+    id: Optional[int] = None
+    url: str
+    title: str
+    source: str  # "stored" or "offline"
+    summary: str
+    key_entities: KeyEntities
+    sections: List[str]
+    related_topics: List[str]
+    questions: List[QuestionSchema]
+
+
 class QuizListResponse(BaseModel):
     """Quiz list item response."""
     id: int
@@ -58,6 +72,91 @@ class QuizListResponse(BaseModel):
         from_attributes = True
 
 
+class QuizSearchResult(BaseModel):
+    """Quiz search hit, best first."""
+    id: int
+    url: str
+    title: str
+    created_at: datetime
+    score: float  # Higher is better; comparable within one search only
+    snippet: str  # HTML-escaped, matched words in <mark> tags
+
+
+class JobResponse(BaseModel):
+    """Background generation job status."""
+    id: str
+    url: str
+    batch_id: Optional[str] = None
+    status: str
+    stage: Optional[str] = None
+    quiz_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class BulkGenerateRequest(BaseModel):
+    """Request to generate quizzes for many Wikipedia URLs."""
+    urls: List[HttpUrl] = Field(..., min_length=1)
+
+
+class BatchResponse(BaseModel):
+    """Progress of a bulk generation batch."""
+    batch_id: str
+    total: int
+    queued: int
+    running: int
+    succeeded: int
+    failed: int
+    created_at: datetime
+    updated_at: datetime
+    articles_per_minute: float
+
+
+class AnswerSubmission(BaseModel):
+    """Answer to one question of a quiz."""
+    question_id: int
+    selected: str = Field(..., max_length=500)
+    time_ms: Optional[int] = Field(None, ge=0)
+
+
+class AttemptRequest(BaseModel):
+    """Answers submitted for a quiz."""
+    user_id: Optional[str] = Field(None, max_length=255)
+    answers: List[AnswerSubmission] = Field(..., min_length=1)
+    duration_ms: Optional[int] = Field(None, ge=0)
+
+
+class AnswerResult(BaseModel):
+    """Grading of one submitted answer."""
+    question_id: int
+    selected: str
+    correct: bool
+    answer: str
+
+
+class AttemptResponse(BaseModel):
+    """Graded attempt; it is stored by the next write-behind flush."""
+    id: str
+    quiz_id: int
+    score: int
+    total: int
+    submitted_at: datetime
+    results: List[AnswerResult]
+
+
+class QuestionStatsResponse(BaseModel):
+    """Answer counts of one question over all stored attempts."""
+    question_id: int
+    answers: int
+    correct: int
+    correct_rate: float
+    average_time_ms: Optional[float] = None
+
+
 class LLMQuizOutput(BaseModel):
     """Expected output structure from LLM."""
     summary: str
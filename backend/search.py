@@ -0,0 +1,286 @@
+"""
+Full-text search over stored quizzes.
+
+Each quiz has one row in `quiz_search` holding its title, summary,
+questions (with their options) and explanations, weighted in that order:
+
+- PostgreSQL: a weighted `tsvector` column with a GIN index, ranked with
+  `ts_rank_cd`; snippets come from `ts_headline`
+- SQLite: an FTS5 table (porter stemming) keyed by the quiz id, ranked
+  with `bm25`; snippets come from `snippet`
+
+The index is written in the same transaction as the quiz
+(`crud.create_quiz`) and removed with it, so it never needs a rebuild.
+`migrate.py` indexes quizzes stored before it existed. Other databases
+fall back to a LIKE match on title and summary.
+"""
+import html
+import re
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import event, literal, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from models import Quiz, Question
+
+SEARCH_DIALECTS = {"postgresql", "sqlite"}
+MAX_QUERY_TERMS = 16
+SNIPPET_WORDS = 16
+# Relative weight of title, summary, questions and explanations (SQLite;
+# PostgreSQL uses its A-D weights in the same order)
+BM25_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# Highlight markers; the snippet is HTML-escaped and these become <mark> tags
+_START, _STOP = "\x02", "\x03"
+_TERM = re.compile(r"\w+")
+
+_POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS quiz_search (
+        quiz_id INTEGER PRIMARY KEY REFERENCES quizzes (id) ON DELETE CASCADE,
+        body TEXT NOT NULL,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_quiz_search_document ON quiz_search USING GIN (document)",
+]
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS quiz_search USING fts5(
+        title, summary, questions, explanations,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+_POSTGRES_INSERT = text("""
+    INSERT INTO quiz_search (quiz_id, body, document)
+    VALUES (
+        :quiz_id,
+        :questions || ' ' || :explanations,
+        setweight(to_tsvector('english', :title), 'A')
+        || setweight(to_tsvector('english', :summary), 'B')
+        || setweight(to_tsvector('english', :questions), 'C')
+        || setweight(to_tsvector('english', :explanations), 'D')
+    )
+    ON CONFLICT (quiz_id) DO NOTHING
+""")
+_SQLITE_INSERT = text("""
+    INSERT INTO quiz_search (rowid, title, summary, questions, explanations)
+    VALUES (:quiz_id, :title, :summary, :questions, :explanations)
+""")
+
+# Matches are ranked newest first up to this many; scoring every match of
+# a word found in most quizzes would dominate the query time, and such
+# words barely affect the ranking anyway
+MAX_CANDIDATES = 5000
+
+# Only the page's rows get a headline; ts_headline re-parses the text
+_POSTGRES_SEARCH = text("""
+    WITH q AS (SELECT plainto_tsquery('english', :query) AS query),
+    candidates AS (
+        SELECT s.quiz_id, s.document FROM quiz_search s, q
+        WHERE s.document @@ q.query
+        ORDER BY s.quiz_id DESC
+        LIMIT :candidates
+    ),
+    ranked AS (
+        SELECT c.quiz_id, ts_rank_cd(c.document, q.query) AS score FROM candidates c, q
+        ORDER BY score DESC, c.quiz_id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT z.id, z.url, z.title, z.created_at, r.score,
+           ts_headline('english', z.summary || ' ' || s.body, q.query, :options) AS snippet
+    FROM ranked r
+    JOIN quiz_search s ON s.quiz_id = r.quiz_id
+    JOIN quizzes z ON z.id = r.quiz_id
+    CROSS JOIN q
+    ORDER BY r.score DESC, r.quiz_id DESC
+""")
+_BM25 = "bm25(quiz_search, {})".format(", ".join(str(w) for w in BM25_WEIGHTS))
+# snippet() needs the MATCH in its own query, so the page is joined back
+# to the FTS table by rowid
+_SQLITE_SEARCH = text(f"""
+    SELECT z.id, z.url, z.title, z.created_at, -r.score AS score,
+           snippet(quiz_search, -1, :start, :stop, '…', {SNIPPET_WORDS}) AS snippet
+    FROM (
+        SELECT id, score FROM (
+            SELECT rowid AS id, {_BM25} AS score FROM quiz_search
+            WHERE quiz_search MATCH :query
+            ORDER BY rowid DESC
+            LIMIT :candidates
+        )
+        ORDER BY score, id DESC
+        LIMIT :limit OFFSET :offset
+    ) r
+    JOIN quiz_search ON quiz_search.rowid = r.id AND quiz_search MATCH :query
+    JOIN quizzes z ON z.id = r.id
+    ORDER BY r.score, r.id DESC
+""")
+
+
+def create_search_index(connection: Connection) -> None:
+    """Create the search table and index if the database supports them."""
+    dialect = connection.dialect.name
+    if dialect not in SEARCH_DIALECTS:
+        return
+    for statement in _POSTGRES_DDL if dialect == "postgresql" else _SQLITE_DDL:
+        connection.execute(text(statement))
+
+
+@event.listens_for(Quiz.__table__, "after_create")
+def _create_with_quizzes(target, connection: Connection, **kw) -> None:
+    """Create the search index whenever `init_db` creates the quizzes table."""
+    create_search_index(connection)
+
+
+def _document(
+    quiz_id: int,
+    title: str,
+    summary: str,
+    questions: Sequence[Dict[str, Any]],
+) -> Dict[str, Any]:
+    return {
+        "quiz_id": quiz_id,
+        "title": title,
+        "summary": summary,
+        "questions": "\n".join(
+            " ".join([q["question"], *q.get("options", [])]) for q in questions
+        ),
+        "explanations": "\n".join(q.get("explanation", "") for q in questions),
+    }
+
+
+def index_quiz(
+    db: Session,
+    quiz_id: int,
+    title: str,
+    summary: str,
+    questions: Sequence[Dict[str, Any]],
+) -> None:
+    """
+    Add a quiz to the search index (1 statement), in the caller's
+    transaction. Does nothing on databases without full-text search.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in SEARCH_DIALECTS:
+        return
+    statement = _POSTGRES_INSERT if dialect == "postgresql" else _SQLITE_INSERT
+    db.execute(statement, _document(quiz_id, title, summary, questions))
+
+
+def remove_quiz(db: Session, quiz_id: int) -> None:
+    """
+    Remove a quiz from the search index, in the caller's transaction.
+
+    PostgreSQL would cascade the quiz's deletion; the SQLite FTS5 table has
+    no foreign keys.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text("DELETE FROM quiz_search WHERE rowid = :quiz_id"), {"quiz_id": quiz_id})
+
+
+def index_missing_quizzes(engine: Engine, batch_size: int = 100) -> int:
+    """Index stored quizzes that have no search row yet; returns how many were added."""
+    if engine.dialect.name not in SEARCH_DIALECTS:
+        return 0
+    key = "quiz_id" if engine.dialect.name == "postgresql" else "rowid"
+    indexed = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            quizzes = conn.execute(
+                text(
+                    "SELECT q.id, q.title, q.summary FROM quizzes q WHERE q.id > :last_id "
+                    f"AND NOT EXISTS (SELECT 1 FROM quiz_search s WHERE s.{key} = q.id) "
+                    "ORDER BY q.id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": batch_size},
+            ).fetchall()
+            if not quizzes:
+                break
+            questions: Dict[int, List[Dict[str, Any]]] = {quiz.id: [] for quiz in quizzes}
+            rows = conn.execute(
+                select(Question.quiz_id, Question.question, Question.options, Question.explanation)
+                .where(Question.quiz_id.in_(list(questions)))
+                .order_by(Question.id)
+            ).fetchall()
+            for row in rows:
+                questions[row.quiz_id].append(
+                    {"question": row.question, "options": row.options, "explanation": row.explanation}
+                )
+            statement = _POSTGRES_INSERT if engine.dialect.name == "postgresql" else _SQLITE_INSERT
+            conn.execute(
+                statement,
+                [_document(quiz.id, quiz.title, quiz.summary, questions[quiz.id]) for quiz in quizzes],
+            )
+        indexed += len(quizzes)
+        last_id = quizzes[-1].id
+    return indexed
+
+
+def _terms(query: str) -> List[str]:
+    terms = _TERM.findall(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("Search query has no words")
+    return terms
+
+
+def _highlight(snippet: str) -> str:
+    return html.escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def search_quizzes(db: Session, query: str, limit: int = 20, skip: int = 0) -> List[Dict[str, Any]]:
+    """
+    Quizzes matching every word of `query`, best first (1 query).
+
+    Only the newest MAX_CANDIDATES matches are ranked.
+
+    Returns:
+        Dictionaries with id, url, title, created_at, score (higher is
+        better; comparable within one search only) and snippet, HTML
+        with the matched words in <mark> tags
+
+    Raises:
+        ValueError: If the query has no searchable words
+    """
+    terms = _terms(query)
+    dialect = db.get_bind().dialect.name
+    params = {"limit": limit, "offset": skip, "candidates": MAX_CANDIDATES}
+    if dialect == "postgresql":
+        params.update(
+            query=" ".join(terms),
+            options=f"StartSel={_START}, StopSel={_STOP}, MaxFragments=2, "
+                    f"MaxWords={SNIPPET_WORDS}, MinWords=5, FragmentDelimiter=…",
+        )
+        rows = db.execute(_POSTGRES_SEARCH, params).fetchall()
+    elif dialect == "sqlite":
+        # Quoted terms are matched literally (no FTS5 operators), all required
+        params.update(query=" ".join(f'"{term}"' for term in terms), start=_START, stop=_STOP)
+        rows = db.execute(_SQLITE_SEARCH, params).fetchall()
+    else:
+        rows = _like_search(db, terms, limit, skip)
+    return [
+        {
+            "id": row.id,
+            "url": row.url,
+            "title": row.title,
+            "created_at": row.created_at,
+            "score": float(row.score),
+            "snippet": _highlight(row.snippet),
+        }
+        for row in rows
+    ]
+
+
+def _like_search(db: Session, terms: List[str], limit: int, skip: int):
+    """Unranked fallback: every term in the title or summary, newest first."""
+    query = db.query(
+        Quiz.id, Quiz.url, Quiz.title, Quiz.created_at,
+        literal(0.0).label("score"), Quiz.summary.label("snippet"),
+    )
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(Quiz.title.ilike(pattern) | Quiz.summary.ilike(pattern))
+    return query.order_by(Quiz.created_at.desc(), Quiz.id.desc()).offset(skip).limit(limit).all()
@@ -0,0 +1,98 @@
+"""
+Request coalescing for expensive per-key work (quiz generation by URL).
+"""
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from sqlalchemy import text
+
+from database import engine
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a separate task; callers
+    arriving while it runs await the same task instead of repeating it.
+    Running the work as its own task means a disconnecting client cannot
+    cancel the generation the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn` for `key`, or join the run already in flight.
+
+        Args:
+            key: Coalescing key
+            fn: Coroutine factory doing the actual work
+
+        Returns:
+            The result of the (shared) call
+        """
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(task)
+
+    def running(self, key: str) -> bool:
+        """Whether work for `key` is in flight."""
+        return key in self._flights
+
+    def in_flight(self) -> int:
+        """Number of keys currently being worked on."""
+        return len(self._flights)
+
+
+def _advisory_lock_id(key: str) -> int:
+    """Map a key to a signed 64-bit Postgres advisory lock id."""
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def advisory_lock(key: str, timeout: float):
+    """
+    Hold a Postgres session-level advisory lock for `key`.
+
+    Serializes work on the same key across uvicorn workers and hosts.
+    On databases without advisory locks (SQLite in local runs) this is a
+    no-op and only the in-process coalescing applies.
+
+    Args:
+        key: Lock key
+        timeout: Seconds to wait for the lock before giving up
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+
+    lock_id = _advisory_lock_id(key)
+    conn = await asyncio.to_thread(engine.connect)
+    try:
+        await asyncio.to_thread(
+            conn.execute,
+            text("SELECT set_config('lock_timeout', :timeout, true)"),
+            {"timeout": f"{int(timeout * 1000)}ms"},
+        )
+        await asyncio.to_thread(
+            conn.execute, text("SELECT pg_advisory_lock(:id)"), {"id": lock_id}
+        )
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(
+                conn.execute, text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id}
+            )
+    finally:
+        # Closing rolls back the transaction, which also resets lock_timeout
+        await asyncio.to_thread(conn.close)
@@ -0,0 +1,66 @@
+"""
+Compression and hashing for stored article HTML snapshots.
+"""
+import gzip
+import hashlib
+import threading
+from typing import Tuple
+
+# zstd compresses Wikipedia HTML better and faster than gzip; optional
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Compressor and decompressor objects are not thread-safe, and quizzes are
+# saved from request, job and write-behind threads: one pair per thread
+_zstd = threading.local()
+
+
+def _zstd_compressor() -> "zstandard.ZstdCompressor":
+    compressor = getattr(_zstd, "compressor", None)
+    if compressor is None:
+        compressor = _zstd.compressor = zstandard.ZstdCompressor(level=10)
+    return compressor
+
+
+def _zstd_decompressor() -> "zstandard.ZstdDecompressor":
+    decompressor = getattr(_zstd, "decompressor", None)
+    if decompressor is None:
+        decompressor = _zstd.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+
+def content_hash(html: str) -> str:
+    """SHA-256 hex digest of the uncompressed HTML."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def compress_html(html: str) -> Tuple[bytes, str]:
+    """
+    Compress HTML for storage.
+
+    Returns:
+        Tuple of (compressed bytes, encoding name)
+    """
+    data = html.encode("utf-8")
+    if ZSTD_AVAILABLE:
+        return _zstd_compressor().compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def decompress_html(data: bytes, encoding: str) -> str:
+    """
+    Decompress stored HTML.
+
+    Raises:
+        ValueError: If the encoding is unknown or unavailable
+    """
+    if encoding == "gzip":
+        return gzip.decompress(data).decode("utf-8")
+    if encoding == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstandard is required to read zstd snapshots")
+        return _zstd_decompressor().decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown snapshot encoding: {encoding}")
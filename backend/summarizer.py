@@ -0,0 +1,310 @@
+"""
+Extractive digest of an article for the LLM prompt.
+
+Instead of the first MAX_CONTENT_CHARS of the article (the lead and early
+history, for most biographies), the prompt gets sentences from every
+section, chosen to fit a token budget:
+
+1. Sentences are ranked with TextRank over TF-IDF cosine similarity,
+   computed with NumPy on a sparse term matrix, plus a small bonus for the lead section and for
+   the first sentence of each section.
+2. The budget is split across sections in proportion to the square root
+   of their length, so long sections get more room without crowding out
+   short ones, and every section gets at least its best sentence.
+3. Within a section the best sentences are taken unless they repeat one
+   already chosen; budget left over goes to the best remaining sentences.
+4. The chosen sentences are emitted in article order under their section
+   headings.
+"""
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Reference markers and maintenance tags left in the paragraph text
+_CITATION = re.compile(r"\[(?:\d+|[a-z]|note \d+|citation needed|clarification needed)\]")
+# Split after ., ! or ? (optionally followed by a closing quote or bracket)
+# when the next sentence starts with a capital, digit or opening quote
+_SENTENCE_BREAK = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[A-Z0-9\"'(\[])")
+# A piece ending like this is an abbreviation or initial, not a sentence
+_ABBREVIATION = re.compile(
+    r"(?:\b[A-Z]|\b(?:Mr|Mrs|Ms|Dr|St|Jr|Sr|Prof|Gen|Col|Lt|Sgt|Capt|No|vs|etc|ca|c|approx|e\.g|i\.e|U\.S))\.$"
+)
+_TERM = re.compile(r"[a-z0-9]+")
+# Rough size of text in tokens without a tokenizer, from BPE averages
+_WORD_OR_SYMBOL = re.compile(r"\w+|[^\w\s]")
+_CHARS_PER_WORD_TOKEN = 5
+
+STOPWORDS = frozenset("""
+a about after also an and are as at be been before but by can could did do
+during for from had has have he her his however i if in into is it its more
+most not of on one or other over she so some such than that the their them
+then there these they this those through to two under up was were which while
+who whom will with would
+""".split())
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+LEAD_BONUS = 0.15
+SECTION_START_BONUS = 0.1
+# Sentences this similar to an already chosen one are skipped
+REDUNDANCY_THRESHOLD = 0.7
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens in `text`: exact with tiktoken (cl100k_base) when installed,
+    otherwise estimated from words and symbols.
+    """
+    global _encoding
+    if TIKTOKEN_AVAILABLE and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # The encoding file could not be downloaded
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return sum(
+        max(1, math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN))
+        for piece in _WORD_OR_SYMBOL.findall(text)
+    )
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    """Split a paragraph into sentences, keeping abbreviations and initials together."""
+    paragraph = _CITATION.sub("", paragraph).strip()
+    sentences: List[str] = []
+    for piece in _SENTENCE_BREAK.split(paragraph):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and _ABBREVIATION.search(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+class _Sentence:
+    __slots__ = ("text", "section", "paragraph", "tokens")
+
+    def __init__(self, text: str, section: int, paragraph: int):
+        self.text = text
+        self.section = section
+        self.paragraph = paragraph
+        self.tokens = count_tokens(text)
+
+
+class _TermMatrix:
+    """
+    Sparse sentence x term matrix of L2-normalized TF-IDF weights, as
+    (row, column, value) arrays.
+
+    Sentence similarity is the product of the matrix with its transpose;
+    it is applied through `bincount` over the entries instead of being
+    built, so memory grows with the article's term occurrences rather than
+    with sentences x terms or sentences x sentences.
+    """
+
+    def __init__(self, n: int, m: int, rows: np.ndarray, cols: np.ndarray, values: np.ndarray):
+        self.n, self.m = n, m
+        self.rows, self.cols, self.values = rows, cols, values
+        # Each sentence's similarity to itself, left out of the graph
+        self.self_similarity = np.bincount(rows, weights=values ** 2, minlength=n)
+
+    def similar(self, v: np.ndarray) -> np.ndarray:
+        """Similarity matrix (without its diagonal) times `v`."""
+        per_term = np.bincount(self.cols, weights=self.values * v[self.rows], minlength=self.m)
+        product = np.bincount(self.rows, weights=self.values * per_term[self.cols], minlength=self.n)
+        return product - self.self_similarity * v
+
+    def similarity_to(self, i: int) -> np.ndarray:
+        """Similarity of every sentence to sentence `i` (0 to itself)."""
+        entries = self.rows == i
+        vector = np.zeros(self.m)
+        vector[self.cols[entries]] = self.values[entries]
+        similarity = np.bincount(self.rows, weights=self.values * vector[self.cols], minlength=self.n)
+        similarity[i] = 0.0
+        return similarity
+
+
+def _tfidf(sentences: List[_Sentence]) -> _TermMatrix:
+    """The sentences' TF-IDF vectors, for cosine similarity."""
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for term in _TERM.findall(sentence.text.lower()):
+            if len(term) > 1 and term not in STOPWORDS:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+    n = len(sentences)
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return _TermMatrix(n, 0, empty, empty, np.zeros(0))
+
+    # Term counts per (sentence, term) pair
+    pairs, counts = np.unique(
+        np.array(rows, dtype=np.int64) * len(vocabulary) + np.array(cols, dtype=np.int64),
+        return_counts=True,
+    )
+    rows, cols = pairs // len(vocabulary), pairs % len(vocabulary)
+    df = np.bincount(cols, minlength=len(vocabulary))
+    weights = (1 + np.log(counts)) * np.log((1 + n) / (1 + df[cols]))
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n))
+    norms[norms == 0] = 1.0
+
+    # Terms that occur in one sentence only count towards its norm but can't
+    # make two sentences similar, so they are left out of the matrix
+    shared = df >= 2
+    keep = shared[cols]
+    columns = np.cumsum(shared) - 1
+    return _TermMatrix(
+        n, int(shared.sum()), rows[keep], columns[cols[keep]], weights[keep] / norms[rows[keep]],
+    )
+
+
+def _textrank(matrix: _TermMatrix) -> np.ndarray:
+    """PageRank over the sentence similarity graph."""
+    n = matrix.n
+    out_weight = matrix.similar(np.ones(n))
+    # Sentences without similar ones (up to rounding) link to every
+    # sentence equally
+    linked = out_weight > 1e-12
+    divisor = np.where(linked, out_weight, 1.0)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        spread = matrix.similar(np.where(linked, rank / divisor, 0.0)) + rank[~linked].sum() / n
+        updated = (1 - DAMPING) / n + DAMPING * spread
+        if np.abs(updated - rank).sum() < TOLERANCE:
+            return updated
+        rank = updated
+    return rank
+
+
+def build_digest(passages: Sequence[Tuple[str, str]], token_budget: int) -> str:
+    """
+    Condense an article to about `token_budget` tokens.
+
+    Args:
+        passages: (section heading, paragraph) pairs in article order; the
+            lead section's heading is ""
+        token_budget: Maximum tokens of the digest
+
+    Returns:
+        Chosen sentences in article order, one line per paragraph, each
+        section after a "## <heading>" line. The whole article, in the same
+        layout, if it fits the budget.
+    """
+    headings: List[str] = []
+    sentences: List[_Sentence] = []
+    for paragraph, (heading, text) in enumerate(passages):
+        if not headings or heading != headings[-1]:
+            headings.append(heading)
+        for sentence in split_sentences(text):
+            sentences.append(_Sentence(sentence, len(headings) - 1, paragraph))
+    if not sentences:
+        return ""
+
+    heading_tokens = [count_tokens(f"## {heading}") if heading else 0 for heading in headings]
+    total = sum(s.tokens for s in sentences) + sum(heading_tokens)
+    if total <= token_budget:
+        return _render(sentences, headings, range(len(sentences)))
+
+    matrix = _tfidf(sentences)
+    rank = _textrank(matrix)
+    scores = rank / rank.max()
+    section_ids = np.array([s.section for s in sentences])
+    starts = np.r_[True, section_ids[1:] != section_ids[:-1]]
+    scores += SECTION_START_BONUS * starts
+    scores += LEAD_BONUS * np.array([headings[s.section] == "" for s in sentences])
+
+    chosen = _select(sentences, headings, heading_tokens, scores, matrix, token_budget)
+    return _render(sentences, headings, sorted(chosen))
+
+
+def _select(
+    sentences: List[_Sentence],
+    headings: List[str],
+    heading_tokens: List[int],
+    scores: np.ndarray,
+    matrix: _TermMatrix,
+    token_budget: int,
+) -> List[int]:
+    """Section-balanced, redundancy-aware choice of sentence indexes."""
+    section_tokens = np.zeros(len(headings))
+    for s in sentences:
+        section_tokens[s.section] += s.tokens
+    shares = np.sqrt(section_tokens)
+    quotas = token_budget * shares / shares.sum()
+
+    chosen: List[int] = []
+    taken = set()
+    used = 0
+    # Highest similarity of every sentence to any chosen one
+    closest = np.zeros(len(sentences))
+    opened = set()
+
+    def take(i: int) -> bool:
+        nonlocal used, closest
+        section = sentences[i].section
+        cost = sentences[i].tokens + (heading_tokens[section] if section not in opened else 0)
+        if i in taken or used + cost > token_budget or closest[i] > REDUNDANCY_THRESHOLD:
+            return False
+        chosen.append(i)
+        taken.add(i)
+        opened.add(section)
+        used += cost
+        closest = np.maximum(closest, matrix.similarity_to(i))
+        return True
+
+    ranked = [int(i) for i in np.argsort(-scores, kind="stable")]
+    by_section: Dict[int, List[int]] = {}
+    for i in ranked:
+        by_section.setdefault(sentences[i].section, []).append(i)
+
+    # 1. The best sentence of every section
+    for section_ranked in by_section.values():
+        for i in section_ranked:
+            if take(i):
+                break
+
+    # 2. More of each section's best sentences, up to its quota
+    for section, section_ranked in by_section.items():
+        section_used = sum(sentences[i].tokens for i in chosen if sentences[i].section == section)
+        for i in section_ranked:
+            if section_used + sentences[i].tokens <= quotas[section] and take(i):
+                section_used += sentences[i].tokens
+
+    # 3. The best remaining sentences, in whatever budget is left
+    for i in ranked:
+        take(i)
+    return chosen
+
+
+def _render(sentences: List[_Sentence], headings: List[str], indexes) -> str:
+    lines: List[str] = []
+    section: Optional[int] = None
+    paragraph: Optional[int] = None
+    for i in indexes:
+        sentence = sentences[i]
+        if sentence.section != section:
+            section = sentence.section
+            if headings[section]:
+                lines.append(f"## {headings[section]}")
+            paragraph = None
+        if sentence.paragraph == paragraph:
+            lines[-1] = f"{lines[-1]} {sentence.text}"
+        else:
+            lines.append(sentence.text)
+            paragraph = sentence.paragraph
+    return "\n".join(lines)
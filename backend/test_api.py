@@ -145,7 +145,7 @@ def test_generate_quiz(url: str) -> bool:
             return False
     except requests.Timeout:
         print_error("Request timeout (30 seconds) - LLM might be slow or API key invalid")
-        print_info("This is normal if using dummy data without API keys")
+        print_info("This is normal with the offline generator (no API keys)")
         return False
     except Exception as e:
         print_error(f"Failed: {str(e)}")
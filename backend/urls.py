@@ -0,0 +1,140 @@
+"""
+Wikipedia URL canonicalization and hashing.
+
+Different spellings of the same article URL (mobile host, `%20` vs `_`,
+fragments, tracking query strings, `index.php?title=`) must map to one
+cached quiz. `canonicalize_url` does that without the network;
+`resolve_url` can additionally follow redirects through the MediaWiki API.
+"""
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qs, quote, unquote, urlsplit, urlunsplit
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Characters MediaWiki leaves unescaped in article paths (wfUrlencode)
+_TITLE_SAFE = ";:@$!*(),/~"
+
+_WIKIPEDIA_HOST = re.compile(r"^(?P<lang>[a-z0-9-]+)(?:\.m)?\.wikipedia\.org$")
+
+# canonical URL -> resolved URL, for resolve_url
+_RESOLVED: "OrderedDict[str, str]" = OrderedDict()
+_RESOLVED_MAX_SIZE = 4096
+
+
+def _normalize_title(title: str, capitalize: bool) -> str:
+    """Decode, use underscores for spaces and re-encode the way MediaWiki does."""
+    title = unquote(title).replace(" ", "_")
+    title = re.sub(r"_+", "_", title).strip("_")
+    if capitalize and title:
+        # Wikipedia titles are case-insensitive in their first character only
+        title = title[0].upper() + title[1:]
+    return quote(title, safe=_TITLE_SAFE)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize an article URL without network access.
+
+    - scheme and host are lowercased; Wikipedia hosts use https and the
+      desktop host (`en.m.wikipedia.org` -> `en.wikipedia.org`)
+    - `/wiki/<title>` titles are percent-decoded, spaces become underscores,
+      the first letter is capitalized (Wikipedia only) and the title is
+      re-encoded consistently
+    - `/w/index.php?title=<title>` becomes `/wiki/<title>`
+    - fragments and query strings are dropped, except `curid` on index.php,
+      which `resolve_url` can turn into a title
+
+    Other hosts (mirrors, test servers) keep their scheme, and their path is
+    only normalized under `/wiki/`.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    match = _WIKIPEDIA_HOST.match(host)
+    is_wikipedia = match is not None
+    if is_wikipedia:
+        scheme = "https"
+        host = f"{match.group('lang')}.wikipedia.org"
+
+    path = parts.path or "/"
+    query = ""
+    if path.startswith("/wiki/"):
+        path = "/wiki/" + _normalize_title(path[len("/wiki/"):], capitalize=is_wikipedia)
+    elif path in ("/w/index.php", "/index.php"):
+        params = parse_qs(parts.query)
+        if "title" in params:
+            path = "/wiki/" + _normalize_title(params["title"][0], capitalize=is_wikipedia)
+        elif "curid" in params and params["curid"][0].isdigit():
+            query = f"curid={params['curid'][0]}"
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_hash(url: str) -> str:
+    """Fixed-width lookup key for a URL: SHA-256 hex of its canonical form."""
+    return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+
+async def resolve_url(url: str) -> str:
+    """
+    Canonicalize `url` and, with RESOLVE_WIKIPEDIA_REDIRECTS, follow
+    Wikipedia redirects and page ids to the target article's URL.
+
+    Resolution is best effort: any API failure returns the offline
+    canonical form. Results are cached in-process.
+    """
+    canonical = canonicalize_url(url)
+    if not settings.RESOLVE_WIKIPEDIA_REDIRECTS:
+        return canonical
+    parts = urlsplit(canonical)
+    if not _WIKIPEDIA_HOST.match(parts.netloc):
+        return canonical
+
+    cached = _RESOLVED.get(canonical)
+    if cached is not None:
+        _RESOLVED.move_to_end(canonical)
+        return cached
+
+    resolved = await _query_canonical_title(parts.netloc, parts.path, parts.query)
+    if resolved is None:
+        return canonical
+    _RESOLVED[canonical] = resolved
+    while len(_RESOLVED) > _RESOLVED_MAX_SIZE:
+        _RESOLVED.popitem(last=False)
+    return resolved
+
+
+async def _query_canonical_title(host: str, path: str, query: str) -> Optional[str]:
+    """Ask the MediaWiki API for the title a page or redirect resolves to."""
+    # Imported here: utils pulls in the LLM SDKs, which URL handling doesn't need
+    from utils import get_http_client
+
+    params = {"action": "query", "redirects": "1", "format": "json", "formatversion": "2"}
+    if path.startswith("/wiki/"):
+        params["titles"] = unquote(path[len("/wiki/"):])
+    elif query.startswith("curid="):
+        params["pageids"] = query[len("curid="):]
+    else:
+        return None
+
+    try:
+        response = await get_http_client().get(f"https://{host}/w/api.php", params=params)
+        response.raise_for_status()
+        pages = response.json().get("query", {}).get("pages", [])
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"Redirect resolution failed for {host}{path}: {e}")
+        return None
+    if not pages or pages[0].get("missing") or "title" not in pages[0]:
+        return None
+    return canonicalize_url(f"https://{host}/wiki/{pages[0]['title']}")
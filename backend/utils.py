@@ -1,27 +1,128 @@
 """
 Utility functions for scraping, LLM integration, and data processing.
 """
+import asyncio
+import hashlib
 import json
+import logging
+import time
+from datetime import datetime
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Sequence, Tuple
 from config import settings
+from extractors import get_extractor, BeautifulSoupExtractor, MAX_ARTICLE_CHARS, MAX_CONTENT_CHARS
+from json_stream import IncrementalObjectParser
+import llm_cache
+from summarizer import build_digest
+from entities import extract_entities
+from offline_quiz import generate_offline_quiz
+from llm_clients import get_provider
+from schemas import LLMQuizOutput
+import metrics
 
-# Try importing Gemini API, fall back to OpenAI
+logger = logging.getLogger(__name__)
+
+# HTTP/2 support for the async client needs the optional `h2` package
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
-except (ImportError, Exception):
-    GEMINI_AVAILABLE = False
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+WIKIPEDIA_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+# Shared async HTTP client, created lazily once per process
+_http_client: Optional[httpx.AsyncClient] = None
 
-from openai import OpenAI
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide pooled HTTP client.
+    
+    The client keeps connections alive between requests and negotiates
+    HTTP/2 when the optional `h2` package is installed.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            headers=WIKIPEDIA_HEADERS,
+            timeout=settings.HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _parse_wikipedia_html(raw_html: str, fetched_at: datetime) -> Dict[str, Any]:
+    """
+    Parse a downloaded Wikipedia page.
+    
+    Uses the configured extraction backend (settings.HTML_EXTRACTOR) and
+    falls back to BeautifulSoup if the fast backend chokes on the page.
+    With LLM_CONTENT_MODE=digest the whole article is read and `content`
+    is its digest of at most LLM_CONTENT_TOKENS tokens; otherwise it is
+    the first MAX_CONTENT_CHARS characters. With LOCAL_ENTITIES,
+    `key_entities` is filled from the page (entities.py).
+    
+    Args:
+        raw_html: Decoded response text, stored alongside the quiz
+        fetched_at: When the page was downloaded (UTC)
+        
+    Returns:
+        Dictionary with title, content, sections, key entities (with
+        LOCAL_ENTITIES), raw HTML and fetch time
+    """
+    with metrics.stage_seconds.time(stage="parse"):
+        return _parse_article(raw_html, fetched_at)
+
+
+def _parse_article(raw_html: str, fetched_at: datetime) -> Dict[str, Any]:
+    digest = settings.LLM_CONTENT_MODE == "digest"
+    max_chars = MAX_ARTICLE_CHARS if digest else MAX_CONTENT_CHARS
+    extractor = get_extractor()
+    try:
+        article = extractor.extract(raw_html, max_chars=max_chars)
+    except ValueError:
+        raise
+    except Exception as e:
+        if isinstance(extractor, BeautifulSoupExtractor):
+            raise
+        logger.warning(f"{extractor.name} extraction failed: {e}, using BeautifulSoup")
+        article = BeautifulSoupExtractor().extract(raw_html, max_chars=max_chars)
+    
+    if settings.LOCAL_ENTITIES:
+        article["key_entities"] = extract_entities(article)
+    if digest:
+        article["content"] = build_digest(article["passages"], settings.LLM_CONTENT_TOKENS)
+    article["raw_html"] = raw_html  # Store raw HTML (bonus feature)
+    article["fetched_at"] = fetched_at
+    return article
 
 
 def scrape_wikipedia(url: str) -> Dict[str, Any]:
     """
     Scrape Wikipedia article content.
     
+    Blocking variant kept for scripts; request handlers should use
+    `scrape_wikipedia_async` instead.
+    
     Args:
         url: Wikipedia article URL
         
@@ -29,48 +130,9 @@ def scrape_wikipedia(url: str) -> Dict[str, Any]:
         Dictionary with title, content, and sections
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=WIKIPEDIA_HEADERS, timeout=settings.HTTP_TIMEOUT)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Extract title
-        title_elem = soup.find("h1", class_="firstHeading")
-        title = title_elem.text.strip() if title_elem else "Unknown"
-        
-        # Extract main content
-        content_div = soup.find("div", id="mw-content-text")
-        if not content_div:
-            raise ValueError("Could not find article content")
-        
-        # Get all paragraphs
-        paragraphs = content_div.find_all("p")
-        content = "\n".join([p.get_text().strip() for p in paragraphs])
-        
-        # Limit content size for LLM processing
-        content = content[:15000]
-        
-        # Extract sections
-        sections = []
-        for heading in content_div.find_all(["h2", "h3"]):
-            section_text = heading.get_text().strip()
-            # Remove [edit] links
-            section_text = section_text.replace("[edit]", "").strip()
-            if section_text:
-                sections.append(section_text)
-        
-        # Store raw HTML (bonus feature)
-        raw_html = response.text
-        
-        return {
-            "title": title,
-            "content": content,
-            "sections": sections[:10],  # Limit to first 10 sections
-            "raw_html": raw_html,
-        }
+        return _parse_wikipedia_html(response.text, datetime.utcnow())
         
     except requests.RequestException as e:
         raise ValueError(f"Failed to fetch URL: {str(e)}")
@@ -78,18 +140,45 @@ def scrape_wikipedia(url: str) -> Dict[str, Any]:
         raise ValueError(f"Error scraping Wikipedia: {str(e)}")
 
 
-def generate_quiz_with_llm(title: str, content: str) -> Dict[str, Any]:
+async def scrape_wikipedia_async(url: str) -> Dict[str, Any]:
     """
-    Generate quiz using LLM (Gemini or OpenAI).
+    Scrape Wikipedia article content without blocking the event loop.
+    
+    The download goes through the shared pooled client and the CPU-bound
+    HTML parsing runs in a worker thread.
     
     Args:
-        title: Article title
-        content: Article content
+        url: Wikipedia article URL
         
     Returns:
-        Dictionary with quiz, summary, entities, and related topics
+        Dictionary with title, content, and sections
     """
-    prompt = f"""You are an expert quiz generator. Based on the following Wikipedia article, generate a comprehensive quiz.
+    try:
+        with metrics.stage_seconds.time(stage="fetch"):
+            response = await get_http_client().get(url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise ValueError(f"Failed to fetch URL: {str(e)}")
+    
+    try:
+        return await asyncio.to_thread(
+            _parse_wikipedia_html, response.text, datetime.utcnow()
+        )
+    except Exception as e:
+        raise ValueError(f"Error scraping Wikipedia: {str(e)}")
+
+
+# Part of the response schema left out with LOCAL_ENTITIES, which fills
+# key_entities from the page instead
+_KEY_ENTITIES_SCHEMA = """  "key_entities": {{
+    "people": ["list", "of", "key", "people"],
+    "organizations": ["list", "of", "organizations"],
+    "locations": ["list", "of", "locations"]
+  }},
+"""
+
+# Prompt for quiz generation; filled in with str.format(title=..., content=...)
+QUIZ_PROMPT_TEMPLATE = """You are an expert quiz generator. Based on the following Wikipedia article, generate a comprehensive quiz.
 
 ARTICLE TITLE: {title}
 
@@ -99,12 +188,7 @@ ARTICLE CONTENT:
 TASK: Generate a JSON response with the following structure:
 {{
   "summary": "A 2-3 sentence summary of the article",
-  "key_entities": {{
-    "people": ["list", "of", "key", "people"],
-    "organizations": ["list", "of", "organizations"],
-    "locations": ["list", "of", "locations"]
-  }},
-  "sections": ["main", "sections", "from", "article"],
+""" + ("" if settings.LOCAL_ENTITIES else _KEY_ENTITIES_SCHEMA) + """  "sections": ["main", "sections", "from", "article"],
   "related_topics": ["related", "topic", "1", "topic", "2", "topic", "3"],
   "quiz": [
     {{
@@ -127,60 +211,153 @@ REQUIREMENTS:
 
 Generate the quiz now:"""
 
+# Part of every LLM cache key. Bump the number for changes that affect
+# output without touching the template (e.g. response parsing); template
+# edits change the hash on their own.
+PROMPT_VERSION = "1-" + hashlib.sha256(QUIZ_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+async def generate_quiz_with_llm(
+    title: str,
+    content: str,
+    links: Sequence[str] = (),
+    passages: Sequence[Tuple[str, str]] = (),
+) -> Dict[str, Any]:
+    """
+    Generate quiz using LLM (Gemini or OpenAI).
+    
+    Uses the process-wide provider client (see llm_clients.py), which
+    queues the call behind the provider's concurrency and rate limits.
+    Results are memoized in the LLM cache (see llm_cache.py), keyed by
+    prompt version, model and article text. Without an LLM, or when the
+    call fails or returns output that doesn't match `LLMQuizOutput`, the
+    rule-based generator in offline_quiz.py is used; its results are
+    never cached.
+    
+    Args:
+        title: Article title
+        content: Article content
+        links: Link texts from the article, for the offline generator
+        passages: (section, paragraph) pairs from the scraper, for the
+            offline generator
+        
+    Returns:
+        Dictionary with quiz, summary, entities, and related topics
+    """
+    provider = get_provider()
+    if provider is None:
+        return generate_offline_quiz(title, content, links, passages)
+    
+    key = llm_cache.cache_key(PROMPT_VERSION, provider.model, title, content)
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None and is_valid_llm_output(cached):
+        return cached
+    
+    with metrics.stage_seconds.time(stage="prompt"):
+        prompt = QUIZ_PROMPT_TEMPLATE.format(title=title, content=content)
     try:
-        if GEMINI_AVAILABLE and settings.GOOGLE_API_KEY:
-            return _generate_with_gemini(prompt)
-        elif settings.OPENAI_API_KEY:
-            return _generate_with_openai(prompt)
-        else:
-            return _generate_dummy_quiz(title, content)
+        response_text = await provider.complete(prompt)
+        with metrics.stage_seconds.time(stage="json_parse"):
+            result = validate_llm_output(parse_llm_json(response_text))
     except Exception as e:
-        print(f"LLM generation failed: {e}, using dummy data")
-        return _generate_dummy_quiz(title, content)
+        logger.warning(f"LLM generation failed: {e}, using offline generator")
+        metrics.llm_fallbacks.inc(provider=provider.name)
+        return generate_offline_quiz(title, content, links, passages)
+    
+    await asyncio.to_thread(llm_cache.put, key, provider.model, PROMPT_VERSION, result)
+    return result
+
 
+# ("summary", text), ("question", question) as each is complete, then
+# ("result", full LLM output)
+QuizEvent = Tuple[str, Any]
 
-def _generate_with_gemini(prompt: str) -> Dict[str, Any]:
-    """Generate quiz using Google Gemini API."""
-    model = genai.GenerativeModel("gemini-pro")
-    response = model.generate_content(prompt)
+
+async def stream_quiz_with_llm(
+    title: str,
+    content: str,
+    links: Sequence[str] = (),
+    passages: Sequence[Tuple[str, str]] = (),
+) -> AsyncIterator[QuizEvent]:
+    """
+    Generate a quiz like `generate_quiz_with_llm`, yielding its parts as
+    the LLM writes them.
     
-    # Extract JSON from response
-    response_text = response.text
+    The response is streamed from the provider and parsed incrementally,
+    so the summary and each question are yielded as soon as they are
+    complete. Cached and offline results are yielded in the same order.
+    A failure before anything was yielded falls back to the offline
+    generator; a failure after that raises, since the caller has already
+    shown part of the quiz. Output that doesn't match `LLMQuizOutput` is a
+    failure and is never cached.
     
-    # Try to parse JSON
-    if "```json" in response_text:
-        json_str = response_text.split("```json")[1].split("```")[0].strip()
-    elif "```" in response_text:
-        json_str = response_text.split("```")[1].split("```")[0].strip()
-    else:
-        json_str = response_text
+    Args:
+        title: Article title
+        content: Article content
+        links: Link texts from the article, for the offline generator
+        passages: (section, paragraph) pairs from the scraper, for the
+            offline generator
+        
+    Yields:
+        ("summary", str), one ("question", dict) per question, and finally
+        ("result", dict) with the same structure `generate_quiz_with_llm`
+        returns
+    """
+    provider = get_provider()
+    if provider is None:
+        for event in _result_events(generate_offline_quiz(title, content, links, passages)):
+            yield event
+        return
     
-    return json.loads(json_str)
+    key = llm_cache.cache_key(PROMPT_VERSION, provider.model, title, content)
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None and is_valid_llm_output(cached):
+        for event in _result_events(cached):
+            yield event
+        return
+    
+    with metrics.stage_seconds.time(stage="prompt"):
+        prompt = QUIZ_PROMPT_TEMPLATE.format(title=title, content=content)
+    parser = IncrementalObjectParser()
+    emitted = False
+    parse_seconds = 0.0  # Parsing is spread over the chunks; observed once
+    try:
+        async for chunk in provider.stream(prompt):
+            start = time.perf_counter()
+            events = parser.feed(chunk)
+            parse_seconds += time.perf_counter() - start
+            for kind, field, value in events:
+                if kind == "field" and field == "summary":
+                    emitted = True
+                    yield "summary", value
+                elif kind == "item" and field == "quiz":
+                    emitted = True
+                    yield "question", value
+        start = time.perf_counter()
+        result = validate_llm_output(parser.result())
+        metrics.stage_seconds.observe(parse_seconds + time.perf_counter() - start, stage="json_parse")
+    except Exception as e:
+        if emitted:
+            raise
+        logger.warning(f"LLM generation failed: {e}, using offline generator")
+        metrics.llm_fallbacks.inc(provider=provider.name)
+        for event in _result_events(generate_offline_quiz(title, content, links, passages)):
+            yield event
+        return
+    
+    await asyncio.to_thread(llm_cache.put, key, provider.model, PROMPT_VERSION, result)
+    yield "result", result
 
 
-def _generate_with_openai(prompt: str) -> Dict[str, Any]:
-    """Generate quiz using OpenAI API."""
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a JSON generator. Return only valid JSON."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0.7,
-        max_tokens=3000,
-    )
-    
-    response_text = response.choices[0].message.content
-    
-    # Try to extract JSON if it's wrapped
+def _result_events(result: Dict[str, Any]):
+    """The events `stream_quiz_with_llm` yields for an already complete result."""
+    yield "summary", result["summary"]
+    for question in result["quiz"]:
+        yield "question", question
+    yield "result", result
+
+
+def parse_llm_json(response_text: str) -> Dict[str, Any]:
+    """Parse the JSON in an LLM response, with or without a markdown fence."""
     if "```json" in response_text:
         json_str = response_text.split("```json")[1].split("```")[0].strip()
     elif "```" in response_text:
@@ -191,34 +368,22 @@ def _generate_with_openai(prompt: str) -> Dict[str, Any]:
     return json.loads(json_str)
 
 
-def _generate_dummy_quiz(title: str, content: str) -> Dict[str, Any]:
+def validate_llm_output(result: Any) -> Dict[str, Any]:
     """
-    Generate dummy quiz data for demo/testing purposes.
-    Used when no LLM API is available.
+    Check parsed LLM output against `LLMQuizOutput` before it is cached or
+    stored, so a truncated or malformed reply isn't pinned in the cache.
+    
+    Raises:
+        ValueError: If a field is missing or has the wrong type
     """
-    return {
-        "summary": f"{title} is an important topic in history and culture.",
-        "key_entities": {
-            "people": ["Key Figure 1", "Key Figure 2"],
-            "organizations": ["Important Organization"],
-            "locations": ["Location 1", "Location 2"]
-        },
-        "sections": ["Introduction", "History", "Legacy"],
-        "related_topics": ["Related Topic 1", "Related Topic 2", "Related Topic 3"],
-        "quiz": [
-            {
-                "question": f"What is {title} known for?",
-                "options": ["Option A", "Option B", "Option C", "Option D"],
-                "answer": "Option B",
-                "difficulty": "easy",
-                "explanation": "This is based on the article content."
-            },
-            {
-                "question": f"Which organization is associated with {title}?",
-                "options": ["Org 1", "Org 2", "Org 3", "Org 4"],
-                "answer": "Org 2",
-                "difficulty": "medium",
-                "explanation": "The article mentions this organization."
-            }
-        ]
-    }
+    LLMQuizOutput.model_validate(result)
+    return result
+
+
+def is_valid_llm_output(result: Any) -> bool:
+    """Whether `validate_llm_output` accepts a result (e.g. a cache entry)."""
+    try:
+        validate_llm_output(result)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,191 @@
+"""
+Write-behind buffer for quiz attempts.
+
+Submitting an attempt grades it and appends it to an in-memory buffer; the
+request never waits for the database. A background task writes what is
+buffered with `crud.save_attempts` in one transaction per batch:
+
+- as soon as ATTEMPT_FLUSH_ROWS rows (attempts plus answers) are waiting
+- otherwise every ATTEMPT_FLUSH_INTERVAL_MS
+
+Stopping the buffer (application shutdown) writes everything still
+buffered, so a graceful restart loses nothing; a crash loses at most the
+attempts of the last interval. If the database is unavailable, batches
+stay buffered and are retried; once ATTEMPT_BUFFER_MAX_ROWS rows are
+waiting, new attempts are refused instead of growing memory without bound.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from config import settings
+from database import SessionLocal
+import crud
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFullError(Exception):
+    """Raised when the write-behind buffer is at capacity."""
+
+
+def _rows(attempt: Dict[str, Any]) -> int:
+    return 1 + len(attempt["answers"])
+
+
+class AttemptBuffer:
+    """
+    Buffers graded attempts and writes them in batches.
+
+    `add` may be called from any thread; flushes run on a worker thread so
+    the event loop keeps serving requests while a batch is written.
+    """
+
+    def __init__(self, flush_rows: int, flush_interval_ms: int, max_rows: int, session_factory=SessionLocal):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One batch in flight at a time
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._pending_rows = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_attempts = 0
+        self.flushed_batches = 0
+        self.failed_flushes = 0
+        self.dropped_attempts = 0
+
+    def add(self, attempt: Dict[str, Any]) -> None:
+        """
+        Buffer a graded attempt (`crud.save_attempts` format).
+
+        Raises:
+            BufferFullError: If ATTEMPT_BUFFER_MAX_ROWS rows are already waiting
+        """
+        with self._lock:
+            if self._pending_rows + _rows(attempt) > self.max_rows:
+                raise BufferFullError("Too many unsaved attempts, try again later")
+            self._pending.append(attempt)
+            self._pending_rows += _rows(attempt)
+            full = self._pending_rows >= self.flush_rows
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def start(self) -> None:
+        """Start the background flush task."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._loop = None
+        await asyncio.to_thread(self.flush)
+        if self._pending:
+            logger.error(f"Shut down with {len(self._pending)} attempts unsaved")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending:
+                await asyncio.to_thread(self.flush)
+
+    def flush(self) -> int:
+        """
+        Write everything buffered, one batch of up to ATTEMPT_FLUSH_ROWS rows
+        at a time; returns how many attempts were stored.
+
+        A batch that fails on a database error goes back to the front of the
+        buffer for the next flush. One rejected by a constraint (its quiz
+        was deleted meanwhile) is retried attempt by attempt, and only the
+        offending attempts are dropped.
+        """
+        stored = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return stored
+                try:
+                    stored += self._write(batch)
+                except SQLAlchemyError as e:
+                    logger.error(f"Failed to write {len(batch)} attempts, will retry: {e}")
+                    self.failed_flushes += 1
+                    with self._lock:
+                        self._pending.extendleft(reversed(batch))
+                        self._pending_rows += sum(_rows(attempt) for attempt in batch)
+                    return stored
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            batch, rows = [], 0
+            while self._pending and (not batch or rows + _rows(self._pending[0]) <= self.flush_rows):
+                attempt = self._pending.popleft()
+                batch.append(attempt)
+                rows += _rows(attempt)
+            self._pending_rows -= rows
+            return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        with self._session_factory() as db:
+            try:
+                crud.save_attempts(db, batch)
+                stored = len(batch)
+            except IntegrityError:
+                db.rollback()
+                stored = 0
+                for attempt in batch:
+                    try:
+                        crud.save_attempts(db, [attempt])
+                        stored += 1
+                    except IntegrityError as e:
+                        db.rollback()
+                        self.dropped_attempts += 1
+                        logger.warning(f"Dropped attempt {attempt['id']}: {e.orig}")
+        self.flushed_attempts += stored
+        self.flushed_batches += 1
+        return stored
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer size and flush counters for this process."""
+        return {
+            "pending_attempts": len(self._pending),
+            "pending_rows": self._pending_rows,
+            "flushed_attempts": self.flushed_attempts,
+            "flushed_batches": self.flushed_batches,
+            "failed_flushes": self.failed_flushes,
+            "dropped_attempts": self.dropped_attempts,
+        }
+
+
+attempt_buffer = AttemptBuffer(
+    flush_rows=settings.ATTEMPT_FLUSH_ROWS,
+    flush_interval_ms=settings.ATTEMPT_FLUSH_INTERVAL_MS,
+    max_rows=settings.ATTEMPT_BUFFER_MAX_ROWS,
+)
+
+
+@metrics.registry.collector("wikiquiz_attempt_buffer_pending_rows", "Attempt and answer rows waiting to be written.")
+def _pending_metrics():
+    return [({}, attempt_buffer.stats()["pending_rows"])]
+
+
+@metrics.registry.collector("wikiquiz_attempts_flushed_total", "Attempts written by the write-behind buffer.", "counter")
+def _flushed_metrics():
+    return [({}, attempt_buffer.flushed_attempts)]